@@ -1,13 +1,15 @@
+import os
 from flask import Flask, jsonify
-from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config import Config
+from app.utils.db_routing import RoutingSQLAlchemy
 from datetime import datetime
 
 # Initialize extensions
-db = SQLAlchemy()
+db = RoutingSQLAlchemy()
 migrate = Migrate()
 jwt = JWTManager()
 
@@ -15,11 +17,39 @@ def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
+    if app.config.get('TRUSTED_PROXY_COUNT'):
+        # Take the client address from X-Forwarded-For so per-IP limits see real clients
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXY_COUNT'])
+
+    from app.utils.serializers import FastJSONEncoder
+    app.json_encoder = FastJSONEncoder
+
     # Initialize extensions with app
     db.init_app(app)
-    migrate.init_app(app, db)
+    migrate.init_app(app, db, directory=os.path.join(os.path.dirname(app.root_path), 'migrations'))
     jwt.init_app(app)
 
+    from app.utils.paper_cache import paper_cache
+    paper_cache.init_app(app)
+
+    from app.utils.otp import init_otp_store
+    init_otp_store(app)
+
+    from app.utils.rate_limit import init_rate_limiter
+    init_rate_limiter(app)
+
+    from app.utils.answer_buffer import answer_buffer
+    answer_buffer.init_app(app)
+
+    from app.utils.sms import sms_queue
+    sms_queue.init_app(app)
+
+    from app.utils.request_metrics import request_metrics
+    request_metrics.init_app(app)
+
+    from app.utils.compression import compression
+    compression.init_app(app)
+
     # Configure CORS to allow requests from any origin
     CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True, allow_headers=["Content-Type", "Authorization"])
 
@@ -1,5 +1,10 @@
-from flask import Blueprint
+from flask import Blueprint, jsonify
+from app.utils.pagination import PaginationError
 
 bp = Blueprint('api', __name__)
 
+@bp.errorhandler(PaginationError)
+def handle_pagination_error(error):
+    return jsonify({'error': str(error)}), 400
+
 from app.api import exams, subjects, questions, user_progress
@@ -1,33 +1,32 @@
-from flask import request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import request, jsonify, abort
 from app import db
 from app.api import bp
 from app.models.exam import ExamCategory, Subject
-from app.models.user import User
+from app.auth.decorators import admin_required
+from app.utils.catalog_version import catalog_version, catalog_etag
+from app.utils.db_routing import use_replica
 
 @bp.route('/exam-categories', methods=['GET'])
+@use_replica
+@catalog_etag
 def get_exam_categories():
     """Get all exam categories"""
-    categories = ExamCategory.query.all()
-    return jsonify([category.to_dict() for category in categories])
+    return jsonify(ExamCategory.load_catalog())
 
 @bp.route('/exam-categories/<int:id>', methods=['GET'])
+@use_replica
+@catalog_etag
 def get_exam_category(id):
     """Get a specific exam category by ID"""
-    category = ExamCategory.query.get_or_404(id)
-    return jsonify(category.to_dict())
+    catalog = ExamCategory.load_catalog(category_id=id)
+    if not catalog:
+        abort(404)
+    return jsonify(catalog[0])
 
 @bp.route('/exam-categories', methods=['POST'])
-@jwt_required()
+@admin_required
 def create_exam_category():
     """Create a new exam category (admin only)"""
-    # Check if user is admin
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-    
-    if not user or not user.is_admin():
-        return jsonify({'error': 'Admin privileges required'}), 403
-    
     data = request.get_json() or {}
     
     if 'name' not in data:
@@ -44,21 +43,16 @@ def create_exam_category():
     )
     
     db.session.add(category)
+    catalog_version.bump()
     db.session.commit()
+    catalog_version.expire()
     
     return jsonify(category.to_dict()), 201
 
 @bp.route('/exam-categories/<int:id>', methods=['PUT'])
-@jwt_required()
+@admin_required
 def update_exam_category(id):
     """Update an exam category (admin only)"""
-    # Check if user is admin
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-    
-    if not user or not user.is_admin():
-        return jsonify({'error': 'Admin privileges required'}), 403
-    
     category = ExamCategory.query.get_or_404(id)
     data = request.get_json() or {}
     
@@ -74,21 +68,16 @@ def update_exam_category(id):
     if 'icon' in data:
         category.icon = data['icon']
     
+    catalog_version.bump()
     db.session.commit()
+    catalog_version.expire()
     
     return jsonify(category.to_dict())
 
 @bp.route('/exam-categories/<int:id>', methods=['DELETE'])
-@jwt_required()
+@admin_required
 def delete_exam_category(id):
     """Delete an exam category (admin only)"""
-    # Check if user is admin
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-    
-    if not user or not user.is_admin():
-        return jsonify({'error': 'Admin privileges required'}), 403
-    
     category = ExamCategory.query.get_or_404(id)
     
     # Check if category has subjects
@@ -96,6 +85,8 @@ def delete_exam_category(id):
         return jsonify({'error': 'Cannot delete category with subjects'}), 400
     
     db.session.delete(category)
+    catalog_version.bump()
     db.session.commit()
+    catalog_version.expire()
     
     return jsonify({'message': 'Exam category deleted successfully'})
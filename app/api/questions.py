@@ -1,24 +1,40 @@
 from flask import request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from app import db
 from app.api import bp
 from app.models.exam import Subject, Question, Option
-from app.models.user import User
+from app.models.id_sequence import IdSequence
+from app.auth.decorators import admin_required
+from app.utils.paper_cache import paper_cache, get_paper
+from app.utils.pagination import get_page_args, paginated_response
+from app.utils.compression import cached_payload_response
+from app.utils.serializers import question_query, serialize_questions
+from app.utils.question_import import import_questions, detect_format, ImportFormatError
+from app.utils.db_routing import use_replica
 
 @bp.route('/questions', methods=['GET'])
+@use_replica
 @jwt_required()
 def get_questions():
-    """Get questions, optionally filtered by subject"""
+    """Get questions, optionally filtered by subject (keyset paginated with cursor/limit)"""
     subject_id = request.args.get('subject_id', type=int)
     
+    # A subject's full question list is its cached paper, sent with a precompressed body
+    if subject_id and get_page_args() is None:
+        subject = Subject.query.get(subject_id)
+        if subject:
+            paper = get_paper(subject)
+            return cached_payload_response(paper.body, f'paper-{paper.subject_id}-{paper.version}',
+                                           lambda encoding: paper_cache.encoded(paper, encoding))
+    
+    questions = question_query()
     if subject_id:
-        questions = Question.query.filter_by(subject_id=subject_id).all()
-    else:
-        questions = Question.query.all()
+        questions = questions.filter(Question.subject_id == subject_id)
     
-    return jsonify([question.to_dict() for question in questions])
+    return paginated_response(questions, Question.id, serialize_questions)
 
 @bp.route('/questions/<int:id>', methods=['GET'])
+@use_replica
 @jwt_required()
 def get_question(id):
     """Get a specific question by ID"""
@@ -26,16 +42,9 @@ def get_question(id):
     return jsonify(question.to_dict())
 
 @bp.route('/questions', methods=['POST'])
-@jwt_required()
+@admin_required
 def create_question():
     """Create a new question with options (admin only)"""
-    # Check if user is admin
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-    
-    if not user or not user.is_admin():
-        return jsonify({'error': 'Admin privileges required'}), 403
-    
     data = request.get_json() or {}
     
     required_fields = ['text', 'subject_id', 'options']
@@ -56,8 +65,9 @@ def create_question():
     if not any(option.get('is_correct', False) for option in options):
         return jsonify({'error': 'At least one option must be correct'}), 400
     
-    # Create question
+    # Create question, with an id from the same counter bulk imports reserve their blocks from
     question = Question(
+        id=IdSequence.reserve(Question.__table__),
         text=data['text'],
         subject_id=data['subject_id'],
         difficulty=data.get('difficulty', 'medium'),
@@ -66,7 +76,7 @@ def create_question():
     )
     
     db.session.add(question)
-    db.session.flush()  # Get the question ID without committing
+    db.session.flush()
     
     # Create options
     for option_data in options:
@@ -77,23 +87,39 @@ def create_question():
         )
         db.session.add(option)
     
+    Subject.bump_content_version(question.subject_id)
     db.session.commit()
+    paper_cache.invalidate(question.subject_id)
     
     return jsonify(question.to_dict()), 201
 
+@bp.route('/questions/bulk', methods=['POST'])
+@admin_required
+def bulk_import_questions():
+    """Import questions from a JSONL or CSV upload (admin only)"""
+    upload = request.files.get('file')
+    try:
+        if upload:
+            fmt = detect_format(upload.filename, upload.mimetype, request.args.get('format'))
+            stream = upload.stream
+        else:
+            fmt = detect_format(content_type=request.mimetype, fmt=request.args.get('format'))
+            stream = request.stream
+    except ImportFormatError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    chunk_size = min(request.args.get('chunk_size', 500, type=int), 5000)
+    report = import_questions(stream, fmt, chunk_size=max(chunk_size, 1))
+    
+    return jsonify(report), 201 if report['imported'] else 400
+
 @bp.route('/questions/<int:id>', methods=['PUT'])
-@jwt_required()
+@admin_required
 def update_question(id):
     """Update a question (admin only)"""
-    # Check if user is admin
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-    
-    if not user or not user.is_admin():
-        return jsonify({'error': 'Admin privileges required'}), 403
-    
     question = Question.query.get_or_404(id)
     data = request.get_json() or {}
+    previous_subject_id = question.subject_id
     
     if 'text' in data:
         question.text = data['text']
@@ -137,27 +163,31 @@ def update_question(id):
             )
             db.session.add(option)
     
+    Subject.bump_content_version(previous_subject_id, question.subject_id)
     db.session.commit()
+    paper_cache.invalidate(previous_subject_id, question.subject_id)
     
     return jsonify(question.to_dict())
 
 @bp.route('/questions/<int:id>', methods=['DELETE'])
-@jwt_required()
+@admin_required
 def delete_question(id):
     """Delete a question (admin only)"""
-    # Check if user is admin
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-    
-    if not user or not user.is_admin():
-        return jsonify({'error': 'Admin privileges required'}), 403
-    
     question = Question.query.get_or_404(id)
     
     # Delete associated options first
     Option.query.filter_by(question_id=question.id).delete()
     
+    subject_id = question.subject_id
     db.session.delete(question)
+    Subject.bump_content_version(subject_id)
     db.session.commit()
+    paper_cache.invalidate(subject_id)
     
     return jsonify({'message': 'Question deleted successfully'})
+
+@bp.route('/questions/paper-cache', methods=['GET'])
+@admin_required
+def get_paper_cache_stats():
+    """Get exam paper cache hit/miss counters (admin only)"""
+    return jsonify(paper_cache.stats())
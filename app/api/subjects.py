@@ -1,39 +1,87 @@
 from flask import request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.api import bp
+from flask_jwt_extended import jwt_required
 from app.models.exam import ExamCategory, Subject
 from app.models.user import User
+from app.models.user_progress import UserExam, ExamAttempt
+from app.auth.decorators import admin_required
+from app.utils.catalog_version import catalog_version, catalog_etag
+from app.utils.db_routing import use_replica
+from app.utils.score_distribution import score_distributions
 
 @bp.route('/subjects', methods=['GET'])
+@use_replica
+@catalog_etag
 def get_subjects():
     """Get all subjects, optionally filtered by category"""
     category_id = request.args.get('category_id', type=int)
     
+    subjects = Subject.with_category()
     if category_id:
-        subjects = Subject.query.filter_by(category_id=category_id).all()
-    else:
-        subjects = Subject.query.all()
+        subjects = subjects.filter_by(category_id=category_id)
+    subjects = subjects.order_by(Subject.id).all()
     
     return jsonify([subject.to_dict() for subject in subjects])
 
 @bp.route('/subjects/<int:id>', methods=['GET'])
+@use_replica
+@catalog_etag
 def get_subject(id):
     """Get a specific subject by ID"""
-    subject = Subject.query.get_or_404(id)
+    subject = Subject.with_category().get_or_404(id)
     return jsonify(subject.to_dict())
 
-@bp.route('/subjects', methods=['POST'])
+@bp.route('/subjects/<int:id>/leaderboard', methods=['GET'])
+@use_replica
 @jwt_required()
+def get_subject_leaderboard(id):
+    """Score distribution and best attempts of a subject; pass score to get its percentile and rank"""
+    Subject.query.get_or_404(id)
+    limit = max(1, min(request.args.get('limit', 10, type=int), 100))
+    distribution = score_distributions.get(id)
+
+    result = distribution.summary()
+    result['histogram'] = distribution.histogram()
+
+    # The histogram gives the score cut-off for the top N, so only those attempts are read
+    threshold = distribution.threshold_for_top(limit)
+    top = []
+    if threshold is not None:
+        top = db.session.query(
+            ExamAttempt.id, ExamAttempt.score, ExamAttempt.completed_at, User.id, User.name
+        ).join(
+            UserExam, UserExam.id == ExamAttempt.user_exam_id
+        ).join(
+            User, User.id == ExamAttempt.user_id
+        ).filter(
+            UserExam.subject_id == id,
+            ExamAttempt.completed_at.isnot(None),
+            ExamAttempt.score >= threshold
+        ).order_by(ExamAttempt.score.desc(), ExamAttempt.completed_at).limit(limit).all()
+
+    result['top'] = [
+        {
+            'rank': distribution.rank(score),
+            'attempt_id': attempt_id,
+            'user_id': user_id,
+            'name': name,
+            'score': score,
+            'completed_at': completed_at.isoformat() if completed_at else None
+        }
+        for attempt_id, score, completed_at, user_id, name in top
+    ]
+
+    score = request.args.get('score', type=int)
+    if score is not None:
+        result['standing'] = dict(score_distributions.standing(id, score), score=score)
+
+    return jsonify(result)
+
+@bp.route('/subjects', methods=['POST'])
+@admin_required
 def create_subject():
     """Create a new subject (admin only)"""
-    # Check if user is admin
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-    
-    if not user or not user.is_admin():
-        return jsonify({'error': 'Admin privileges required'}), 403
-    
     data = request.get_json() or {}
     
     required_fields = ['name', 'category_id']
@@ -60,21 +108,16 @@ def create_subject():
     )
     
     db.session.add(subject)
+    catalog_version.bump()
     db.session.commit()
+    catalog_version.expire()
     
     return jsonify(subject.to_dict()), 201
 
 @bp.route('/subjects/<int:id>', methods=['PUT'])
-@jwt_required()
+@admin_required
 def update_subject(id):
     """Update a subject (admin only)"""
-    # Check if user is admin
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-    
-    if not user or not user.is_admin():
-        return jsonify({'error': 'Admin privileges required'}), 403
-    
     subject = Subject.query.get_or_404(id)
     data = request.get_json() or {}
     
@@ -106,21 +149,16 @@ def update_subject(id):
             return jsonify({'error': 'Category not found'}), 404
         subject.category_id = data['category_id']
     
+    catalog_version.bump()
     db.session.commit()
+    catalog_version.expire()
     
     return jsonify(subject.to_dict())
 
 @bp.route('/subjects/<int:id>', methods=['DELETE'])
-@jwt_required()
+@admin_required
 def delete_subject(id):
     """Delete a subject (admin only)"""
-    # Check if user is admin
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-    
-    if not user or not user.is_admin():
-        return jsonify({'error': 'Admin privileges required'}), 403
-    
     subject = Subject.query.get_or_404(id)
     
     # Check if subject has questions
@@ -128,6 +166,8 @@ def delete_subject(id):
         return jsonify({'error': 'Cannot delete subject with questions'}), 400
     
     db.session.delete(subject)
+    catalog_version.bump()
     db.session.commit()
+    catalog_version.expire()
     
     return jsonify({'message': 'Subject deleted successfully'})
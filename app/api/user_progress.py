@@ -3,18 +3,44 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.api import bp
 from app.models.user import User
-from app.models.exam import Subject, Question
-from app.models.user_progress import UserExam, ExamAttempt
+from app.models.exam import Subject
+from app.models.user_progress import UserExam, ExamAttempt, AttemptAnswer, UserSubjectStats
+from app.utils.answer_buffer import answer_buffer, answer_row, upsert_answers
+from app.utils.score_distribution import score_distributions
+from app.utils.scoring import score_answers, parse_answer_updates, ScoringError
+from app.utils.paper_cache import get_paper
+from app.utils.paper_generator import generate_paper, seen_question_ids, source_subjects, find_option_ids, review_paper
+from app.utils.pagination import paginated_response
+from app.utils.serializers import EXAM_ATTEMPT_SCHEMA
+from app.utils.db_routing import use_replica
 from datetime import datetime
 
 @bp.route('/user/exams', methods=['GET'])
+@use_replica
 @jwt_required()
 def get_user_exams():
-    """Get all exams purchased by the current user"""
+    """Get all exams purchased by the current user (pass include=attempts for full attempt lists)"""
     current_user_id = get_jwt_identity()
+    include_attempts = 'attempts' in request.args.get('include', '').split(',')
 
-    user_exams = UserExam.query.filter_by(user_id=current_user_id).all()
-    return jsonify([exam.to_dict() for exam in user_exams])
+    user_exams = UserExam.summaries(current_user_id)
+    return paginated_response(
+        user_exams,
+        UserExam.id,
+        lambda rows: UserExam.serialize_summaries(rows, include_attempts=include_attempts)
+    )
+
+@bp.route('/user/progress', methods=['GET'])
+@use_replica
+@jwt_required()
+def get_user_progress():
+    """Per-subject progress of the current user from the materialized stats"""
+    current_user_id = get_jwt_identity()
+
+    return jsonify([
+        stats.to_dict(subject_name=subject_name, category_name=category_name)
+        for stats, subject_name, category_name in UserSubjectStats.for_user(current_user_id)
+    ])
 
 @bp.route('/user/exams/<int:subject_id>/purchase', methods=['POST'])
 @jwt_required()
@@ -23,38 +49,20 @@ def purchase_exam(subject_id):
     current_user_id = get_jwt_identity()
 
     # Check if subject exists
-    subject = Subject.query.get_or_404(subject_id)
+    Subject.query.get_or_404(subject_id)
 
-    # Check if user has already purchased this exam
-    existing = UserExam.query.filter_by(
-        user_id=current_user_id,
-        subject_id=subject_id
-    ).first()
-
-    if existing:
-        # User has already purchased this exam, increment the purchase count
-        existing.purchase_count += 1
-        existing.last_purchased_at = datetime.utcnow()
-        # Reset retakes for new purchase
-        existing.retakes_used = 0
-        db.session.commit()
-        return jsonify(existing.to_dict()), 200
-    else:
-        # First time purchase
-        user_exam = UserExam(
-            user_id=current_user_id,
-            subject_id=subject_id,
-            purchase_count=1,
-            purchased_at=datetime.utcnow(),
-            last_purchased_at=datetime.utcnow(),
-            max_retakes=3,
-            retakes_used=0
-        )
-
-        db.session.add(user_exam)
-        db.session.commit()
-
-        return jsonify(user_exam.to_dict()), 201
+    # First purchase inserts the row; repurchases bump purchase_count and reset retakes in the same statement
+    user_exam = UserExam.purchase(current_user_id, subject_id)
+    db.session.commit()
+
+    return jsonify(user_exam.to_dict()), 201 if user_exam.purchase_count == 1 else 200
+
+def retake_limit_response(user_exam):
+    return jsonify({
+        'error': 'Maximum retakes limit reached for this exam',
+        'retakes_used': user_exam.retakes_used,
+        'max_retakes': user_exam.max_retakes
+    }), 400
 
 @bp.route('/user/exams/<int:user_exam_id>/start', methods=['POST'])
 @jwt_required()
@@ -68,29 +76,25 @@ def start_exam_attempt(user_exam_id):
     if user_exam.user_id != current_user_id:
         return jsonify({'error': 'Unauthorized access to this exam'}), 403
 
-    # Check if user has retakes remaining
+    # Cheap early exit; the conditional UPDATE below is what enforces the limit
     if user_exam.retakes_used >= user_exam.max_retakes:
-        return jsonify({
-            'error': 'Maximum retakes limit reached for this exam',
-            'retakes_used': user_exam.retakes_used,
-            'max_retakes': user_exam.max_retakes
-        }), 400
+        return retake_limit_response(user_exam)
 
-    # Get subject to determine question count
     subject = Subject.query.get(user_exam.subject_id)
 
-    # Get questions for this subject
-    questions = Question.query.filter_by(subject_id=user_exam.subject_id).all()
+    # Sample this attempt's paper from the cached question banks, avoiding earlier attempts' questions
+    questions = generate_paper(subject, avoid=seen_question_ids(user_exam.id))
     total_questions = len(questions)
 
     if total_questions == 0:
         return jsonify({'error': 'No questions available for this exam'}), 400
 
-    # Calculate attempt number (previous attempts count + 1)
-    attempt_number = user_exam.attempts.count() + 1
-
-    # Increment retakes used
-    user_exam.retakes_used += 1
+    # Use a retake and number the attempt in one statement, right before the insert and commit
+    attempt_number = UserExam.use_retake(user_exam_id, current_user_id)
+    if attempt_number is None:
+        # A concurrent start used the last retake
+        db.session.rollback()
+        return retake_limit_response(user_exam)
 
     # Create new exam attempt
     attempt = ExamAttempt(
@@ -98,6 +102,7 @@ def start_exam_attempt(user_exam_id):
         user_exam_id=user_exam_id,
         attempt_number=attempt_number,
         total_questions=total_questions,
+        question_ids=','.join(str(question['id']) for question in questions),
         started_at=datetime.utcnow()
     )
 
@@ -107,17 +112,23 @@ def start_exam_attempt(user_exam_id):
     # Return attempt details and questions
     return jsonify({
         'attempt': attempt.to_dict(),
-        'questions': [q.to_dict() for q in questions]
+        'questions': questions
     })
 
-@bp.route('/user/attempts/<int:attempt_id>/submit', methods=['POST'])
+@bp.route('/user/attempts/<int:attempt_id>/answers', methods=['PATCH'])
 @jwt_required()
-def submit_exam_attempt(attempt_id):
-    """Submit an exam attempt with answers"""
+def save_attempt_answers(attempt_id):
+    """Save some answers of an in-progress attempt; they are written to the database in batches"""
     current_user_id = get_jwt_identity()
 
-    # Check if attempt exists and belongs to the current user
-    attempt = ExamAttempt.query.get_or_404(attempt_id)
+    row = db.session.query(ExamAttempt, Subject).join(
+        UserExam, UserExam.id == ExamAttempt.user_exam_id
+    ).join(
+        Subject, Subject.id == UserExam.subject_id
+    ).filter(ExamAttempt.id == attempt_id).first()
+    if not row:
+        return jsonify({'error': 'Attempt not found'}), 404
+    attempt, subject = row
 
     if attempt.user_id != current_user_id:
         return jsonify({'error': 'Unauthorized access to this attempt'}), 403
@@ -130,62 +141,138 @@ def submit_exam_attempt(attempt_id):
     if 'answers' not in data:
         return jsonify({'error': 'Answers are required'}), 400
 
-    answers = data['answers']  # Format: {question_id: option_id}
-    time_taken = data.get('time_taken_seconds', 0)
-
-    # Calculate score
-    correct_answers = 0
-    wrong_answers = 0
+    try:
+        answers, time_spent = parse_answer_updates(data['answers'], data.get('time_spent'))
+    except ScoringError as e:
+        return jsonify({'error': str(e)}), 400
 
+    # Validate against the attempt's paper so that submit never meets a foreign question
+    paper_question_ids = attempt.paper_question_ids()
+    paper_question_ids = set(paper_question_ids) if paper_question_ids is not None else None
+    papers = [get_paper(source) for source in source_subjects(subject)]
+    invalid = []
     for question_id, option_id in answers.items():
-        # Get the question and check if the option is correct
-        question = Question.query.get(int(question_id))
-        if not question:
-            continue
-
-        option = next((o for o in question.options if o.id == int(option_id)), None)
-        if not option:
-            continue
-
-        if option.is_correct:
-            correct_answers += 1
-        else:
-            wrong_answers += 1
-
-    # Calculate score
-    score = (correct_answers * 4) - (wrong_answers * 1)  # +4 for correct, -1 for wrong
-    unattempted = attempt.total_questions - (correct_answers + wrong_answers)
-
-    # Update attempt
-    attempt.score = score
-    attempt.correct_answers = correct_answers
-    attempt.wrong_answers = wrong_answers
-    attempt.unattempted = unattempted
-    attempt.time_taken_seconds = time_taken
-    attempt.completed_at = datetime.utcnow()
+        option_ids = find_option_ids(papers, question_id)
+        if (option_ids is None or (paper_question_ids is not None and question_id not in paper_question_ids)
+                or (option_id is not None and option_id not in option_ids)):
+            invalid.append(question_id)
+    if invalid:
+        return jsonify({'error': 'Answers contain questions or options that are not part of this exam',
+                        'question_ids': sorted(invalid)}), 400
 
+    answer_buffer.add(attempt.id, answers, time_spent)
+
+    return jsonify({'attempt_id': attempt.id, 'saved': len(answers)}), 202
+
+@bp.route('/user/attempts/<int:attempt_id>/submit', methods=['POST'])
+@jwt_required()
+def submit_exam_attempt(attempt_id):
+    """Submit an exam attempt, scoring the saved answers together with any sent in the payload"""
+    current_user_id = get_jwt_identity()
+
+    # Check if attempt exists and belongs to the current user
+    attempt = ExamAttempt.query.get_or_404(attempt_id)
+
+    if attempt.user_id != current_user_id:
+        return jsonify({'error': 'Unauthorized access to this attempt'}), 403
+
+    if attempt.completed_at:
+        return jsonify({'error': 'This attempt has already been submitted'}), 400
+
+    # Write the attempt's pending saves, from every worker sharing the buffer, then end this
+    # session's read snapshot so the rows written through the buffer's own connection are visible
+    answer_buffer.flush(attempt_id)
+    db.session.rollback()
+
+    data = request.get_json() or {}
+    time_taken = data.get('time_taken_seconds', 0)
+
+    # Saved answers, overridden by any sent with the submit (older clients send the full sheet here)
+    answers = AttemptAnswer.answers_for(attempt.id)
+    time_spent = {}
+    if data.get('answers'):
+        try:
+            updates, time_spent = parse_answer_updates(data['answers'], data.get('time_spent'))
+        except ScoringError as e:
+            return jsonify({'error': str(e)}), 400
+        answers.update(updates)
+
+    # Sampled attempts are checked against their own paper; older ones against the subject's banks
+    question_ids = attempt.paper_question_ids()
+    subject_ids = None
+    if question_ids is None:
+        subject_ids = [source.id for source in source_subjects(attempt.user_exam.subject)]
+
+    # Resolve all answers against the answer key in one query; answers to questions deleted since are dropped
+    try:
+        result = score_answers(answers, subject_ids, question_ids, skip_missing=True)
+    except ScoringError as e:
+        return jsonify({'error': str(e), 'question_ids': e.question_ids}), 400
+    for question_id in result['missing']:
+        del answers[question_id]
+
+    # Complete the attempt in one conditional UPDATE; of concurrent submits only the first gets past it
+    now = datetime.utcnow()
+    score = result['score']
+    completed = ExamAttempt.complete(
+        attempt,
+        score=score,
+        correct_answers=result['correct_answers'],
+        wrong_answers=result['wrong_answers'],
+        unattempted=attempt.total_questions - result['answered'],
+        time_taken_seconds=time_taken,
+        completed_at=now
+    )
+    if not completed:
+        db.session.rollback()
+        return jsonify({'error': 'This attempt has already been submitted'}), 400
+
+    # Store every answer with its result in one multi-row statement
+    if answers:
+        upsert_answers(db.session.connection(), [
+            answer_row(attempt.id, question_id, option_id, time_spent.get(question_id), now,
+                       correct=result['results'].get(question_id))
+            for question_id, option_id in answers.items()
+        ])
+
+    subject_id = attempt.user_exam.subject_id
+    score_distributions.record(subject_id, score)
+    UserSubjectStats.record_attempt(attempt, subject_id)
     db.session.commit()
+    score_distributions.expire(subject_id)
 
-    return jsonify(attempt.to_dict())
+    return jsonify(dict(attempt.to_dict(), **score_distributions.standing(subject_id, score)))
 
 @bp.route('/user/attempts', methods=['GET'])
+@use_replica
 @jwt_required()
 def get_user_attempts():
     """Get all exam attempts by the current user"""
     current_user_id = get_jwt_identity()
 
-    attempts = ExamAttempt.query.filter_by(user_id=current_user_id).all()
-    return jsonify([attempt.to_dict() for attempt in attempts])
+    attempts = EXAM_ATTEMPT_SCHEMA.query().filter(ExamAttempt.user_id == current_user_id)
+    return paginated_response(attempts, ExamAttempt.id, EXAM_ATTEMPT_SCHEMA.dump_rows)
 
 @bp.route('/user/attempts/<int:attempt_id>', methods=['GET'])
+@use_replica
 @jwt_required()
 def get_attempt_details(attempt_id):
-    """Get details of a specific exam attempt"""
+    """Get details of a specific exam attempt (pass include=review for the per-question answer review)"""
     current_user_id = get_jwt_identity()
+    include_review = 'review' in request.args.get('include', '').split(',')
 
     attempt = ExamAttempt.query.get_or_404(attempt_id)
 
     if attempt.user_id != current_user_id:
         return jsonify({'error': 'Unauthorized access to this attempt'}), 403
 
-    return jsonify(attempt.to_dict())
+    if include_review and not attempt.completed_at:
+        return jsonify({'error': 'Review is available once the attempt is submitted'}), 400
+
+    result = attempt.to_dict()
+    if attempt.completed_at:
+        result.update(score_distributions.standing(attempt.user_exam.subject_id, attempt.score))
+    if include_review:
+        result['review'] = review_paper(attempt, attempt.user_exam.subject, AttemptAnswer.for_attempt(attempt.id))
+
+    return jsonify(result)
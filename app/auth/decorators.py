@@ -0,0 +1,76 @@
+import threading
+import time
+from functools import wraps
+from flask import current_app, jsonify
+from flask_jwt_extended import get_jwt, get_jwt_identity, verify_jwt_in_request
+from app import db
+from app.models.user import User
+
+class TokenVersionCache:
+    """
+    Per-process cache of (token_version, role) by user id.
+
+    Admin checks trust the role claim and only go to the database when the token's
+    version is not known to be current, i.e. on a cache miss, after the entry's TTL
+    has expired, or when the claim does not match the cached version.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id, ttl_seconds):
+        entry = self._entries.get(user_id)
+        if entry is None or time.monotonic() - entry[2] > ttl_seconds:
+            return None
+        return entry[0], entry[1]
+
+    def set(self, user_id, token_version, role):
+        with self._lock:
+            self._entries[user_id] = (token_version, role, time.monotonic())
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+token_versions = TokenVersionCache()
+
+def token_is_current(user_id, claims):
+    """Check that the token's role and version claims still match the user"""
+    if 'tv' not in claims:
+        # Token issued before version claims existed
+        return False
+
+    cached = token_versions.get(user_id, current_app.config['JWT_TOKEN_VERSION_TTL_SECONDS'])
+    if cached == (claims['tv'], claims.get('role')):
+        return True
+
+    row = db.session.query(User.token_version, User.role).filter_by(id=user_id).first()
+    if not row:
+        token_versions.invalidate(user_id)
+        return False
+
+    token_versions.set(user_id, row.token_version, row.role)
+    return (row.token_version, row.role) == (claims['tv'], claims.get('role'))
+
+def admin_required(fn):
+    """Require a valid access token carrying the admin role claim"""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        verify_jwt_in_request()
+        claims = get_jwt()
+        user_id = get_jwt_identity()
+
+        if 'role' in claims:
+            authorized = claims['role'] == 'admin' and token_is_current(user_id, claims)
+        else:
+            # Legacy token without role claims, fall back to the database
+            user = User.query.get(user_id)
+            authorized = user is not None and user.is_admin()
+
+        if not authorized:
+            return jsonify({'error': 'Admin privileges required'}), 403
+
+        return fn(*args, **kwargs)
+
+    return wrapper
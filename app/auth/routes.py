@@ -1,15 +1,14 @@
 from flask import request, jsonify
-from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity, get_jwt
 from app import db
 from app.auth import bp
 from app.models.user import User
-from app.utils.otp import generate_otp, verify_otp, send_otp
-import random  # For mock OTP generation
-
-# Store OTPs temporarily (in production, use Redis or another persistent store)
-otp_store = {}
+from app.utils.otp import generate_otp, send_otp, clear_otp, verify_otp as check_otp
+from app.utils.rate_limit import rate_limit, client_ip, json_field
 
 @bp.route('/request-otp', methods=['POST'])
+@rate_limit(('otp-request-ip', 'OTP_REQUEST_RATE_PER_IP', client_ip),
+            ('otp-request-mobile', 'OTP_REQUEST_RATE_PER_MOBILE', json_field('mobile_number')))
 def request_otp():
     data = request.get_json() or {}
 
@@ -24,12 +23,10 @@ def request_otp():
     # TODO: Replace with actual OTP generation and SMS sending in production
     otp = '123456'
 
-    # Store OTP with expiry (in a real app, use Redis with TTL)
-    otp_store[mobile_number] = otp
-
-    # In a real app, send the OTP via SMS
-    # For development, just return it in the response
-    print(f"OTP for {mobile_number}: {otp}")
+    # Store OTP with expiry in the configured OTP store and queue the SMS
+    # For development, also return it in the response
+    if not send_otp(mobile_number, otp):
+        return jsonify({'error': 'Too many OTP requests right now, please try again shortly'}), 503
 
     return jsonify({
         'message': 'OTP sent successfully',
@@ -37,6 +34,8 @@ def request_otp():
     })
 
 @bp.route('/verify-otp', methods=['POST'])
+@rate_limit(('otp-verify-ip', 'OTP_VERIFY_RATE_PER_IP', client_ip),
+            ('otp-verify-mobile', 'OTP_VERIFY_RATE_PER_MOBILE', json_field('mobile_number')))
 def verify_otp():
     data = request.get_json() or {}
 
@@ -46,19 +45,13 @@ def verify_otp():
     mobile_number = data['mobile_number']
     otp = data['otp']
 
-    # Verify OTP
-    stored_otp = otp_store.get(mobile_number)
-
     # For development, always accept '123456' as a valid OTP
     # TODO: Remove this in production!
     if otp == '123456':
-        pass  # Accept hardcoded OTP
-    elif not stored_otp or stored_otp != otp:
+        clear_otp(mobile_number)  # Accept hardcoded OTP
+    elif not check_otp(mobile_number, otp):  # Consumes the OTP when it matches
         return jsonify({'error': 'Invalid OTP'}), 401
 
-    # OTP is valid, clear it from store
-    otp_store.pop(mobile_number, None)
-
     # Check if user exists, create if not
     user = User.get_by_mobile(mobile_number)
     print(user)
@@ -78,9 +71,9 @@ def verify_otp():
         db.session.commit()
         is_new_user = True
 
-    # Generate tokens
-    access_token = create_access_token(identity=user.id)
-    refresh_token = create_refresh_token(identity=user.id)
+    # Generate tokens carrying the role and token version so admin checks can skip the database
+    access_token = create_access_token(identity=user.id, additional_claims=user.token_claims())
+    refresh_token = create_refresh_token(identity=user.id, additional_claims=user.token_claims())
 
     return jsonify({
         'access_token': access_token,
@@ -100,7 +93,17 @@ def verify_otp():
 @jwt_required(refresh=True)
 def refresh():
     current_user_id = get_jwt_identity()
-    access_token = create_access_token(identity=current_user_id)
+    user = User.query.get(current_user_id)
+
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+
+    # Refresh tokens issued before a revocation are no longer accepted
+    claims = get_jwt()
+    if 'tv' in claims and claims['tv'] != user.token_version:
+        return jsonify({'error': 'Token has been revoked'}), 401
+
+    access_token = create_access_token(identity=user.id, additional_claims=user.token_claims())
 
     return jsonify({'access_token': access_token})
 
@@ -1,4 +1,7 @@
 # Import models to make them available when importing the package
 from app.models.user import User
 from app.models.exam import ExamCategory, Subject, Question, Option
-from app.models.user_progress import UserExam, ExamAttempt
+from app.models.user_progress import UserExam, ExamAttempt, AttemptAnswer, UserSubjectStats
+from app.models.content_version import ContentVersion
+from app.models.score_histogram import ScoreHistogram
+from app.models.id_sequence import IdSequence
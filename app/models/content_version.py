@@ -0,0 +1,23 @@
+from app import db
+from datetime import datetime
+
+class ContentVersion(db.Model):
+    __tablename__ = 'content_versions'
+
+    name = db.Column(db.String(50), primary_key=True)  # e.g. 'catalog'
+    version = db.Column(db.Integer, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ContentVersion {self.name} v{self.version}>'
+
+    @staticmethod
+    def bump(name):
+        """Increment a named version as part of the current transaction"""
+        now = datetime.utcnow()
+        updated = ContentVersion.query.filter_by(name=name).update(
+            {ContentVersion.version: ContentVersion.version + 1, ContentVersion.updated_at: now},
+            synchronize_session=False
+        )
+        if not updated:
+            db.session.add(ContentVersion(name=name, version=1, updated_at=now))
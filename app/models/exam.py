@@ -1,5 +1,7 @@
 from app import db
+from collections import defaultdict
 from datetime import datetime
+from sqlalchemy.orm import joinedload
 
 class ExamCategory(db.Model):
     __tablename__ = 'exam_categories'
@@ -16,17 +18,42 @@ class ExamCategory(db.Model):
     def __repr__(self):
         return f'<ExamCategory {self.name}>'
     
-    def to_dict(self):
+    def to_dict(self, subjects=None):
+        if subjects is None:
+            subjects = self.subjects
         return {
             'id': self.id,
             'name': self.name,
             'description': self.description,
             'icon': self.icon,
-            'subjects': [subject.to_dict() for subject in self.subjects]
+            'subjects': [subject.to_dict(category=self) for subject in subjects]
         }
 
+    @staticmethod
+    def load_catalog(category_id=None):
+        """Serialize categories with their subjects using two queries in total"""
+        categories = ExamCategory.query
+        subjects = Subject.query
+        if category_id is not None:
+            categories = categories.filter_by(id=category_id)
+            subjects = subjects.filter_by(category_id=category_id)
+
+        categories = categories.order_by(ExamCategory.id).all()
+        if not categories:
+            return []
+
+        # Group the flat subject list in Python instead of hitting the dynamic relationship per category
+        subjects_by_category = defaultdict(list)
+        for subject in subjects.order_by(Subject.id):
+            subjects_by_category[subject.category_id].append(subject)
+
+        return [category.to_dict(subjects=subjects_by_category[category.id]) for category in categories]
+
 class Subject(db.Model):
     __tablename__ = 'subjects'
+    __table_args__ = (
+        db.Index('ix_subjects_category_name', 'category_id', 'name'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False)
@@ -35,6 +62,7 @@ class Subject(db.Model):
     is_full_mock = db.Column(db.Boolean, default=False)
     duration_minutes = db.Column(db.Integer, default=60)
     category_id = db.Column(db.Integer, db.ForeignKey('exam_categories.id'), nullable=False)
+    content_version = db.Column(db.Integer, nullable=False, default=1, server_default='1')  # Bumped whenever the question bank changes
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -44,7 +72,9 @@ class Subject(db.Model):
     def __repr__(self):
         return f'<Subject {self.name} ({self.category.name})>'
     
-    def to_dict(self):
+    def to_dict(self, category=None):
+        if category is None:
+            category = self.category
         return {
             'id': self.id,
             'name': self.name,
@@ -53,11 +83,31 @@ class Subject(db.Model):
             'is_full_mock': self.is_full_mock,
             'duration_minutes': self.duration_minutes,
             'category_id': self.category_id,
-            'category_name': self.category.name if self.category else None
+            'category_name': category.name if category else None
         }
 
+    @staticmethod
+    def with_category():
+        """Subject query that loads the parent category in the same statement"""
+        return Subject.query.options(joinedload(Subject.category))
+
+    @staticmethod
+    def bump_content_version(*subject_ids):
+        """Invalidate cached papers for the given subjects as part of the current transaction"""
+        subject_ids = {subject_id for subject_id in subject_ids if subject_id is not None}
+        if not subject_ids:
+            return
+        Subject.query.filter(Subject.id.in_(subject_ids)).update(
+            {Subject.content_version: Subject.content_version + 1},
+            synchronize_session=False
+        )
+
 class Question(db.Model):
     __tablename__ = 'questions'
+    __table_args__ = (
+        # Papers and question pages read a subject's questions in id order
+        db.Index('ix_questions_subject_id', 'subject_id', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     text = db.Column(db.Text, nullable=False)
@@ -66,6 +116,11 @@ class Question(db.Model):
     marks = db.Column(db.Integer, default=4)  # Default marks for correct answer
     negative_marks = db.Column(db.Integer, default=1)  # Default negative marks for wrong answer
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Calibrated from submitted answers by calibrate_items.py
+    p_value = db.Column(db.Float)  # Share of answers that were correct
+    discrimination = db.Column(db.Float)  # Point-biserial correlation with the rest of the attempt
+    response_count = db.Column(db.Integer)
+    calibrated_at = db.Column(db.DateTime)
     
     # Relationships
     subject = db.relationship('Subject', back_populates='questions')
@@ -74,7 +129,9 @@ class Question(db.Model):
     def __repr__(self):
         return f'<Question {self.id}>'
     
-    def to_dict(self):
+    def to_dict(self, options=None):
+        if options is None:
+            options = self.options
         return {
             'id': self.id,
             'text': self.text,
@@ -82,11 +139,14 @@ class Question(db.Model):
             'difficulty': self.difficulty,
             'marks': self.marks,
             'negative_marks': self.negative_marks,
-            'options': [option.to_dict() for option in self.options]
+            'options': [option.to_dict() for option in options]
         }
 
 class Option(db.Model):
     __tablename__ = 'options'
+    __table_args__ = (
+        db.Index('ix_options_question_id', 'question_id', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     text = db.Column(db.Text, nullable=False)
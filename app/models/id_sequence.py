@@ -0,0 +1,49 @@
+from app import db
+from sqlalchemy import func, select
+from sqlalchemy.dialects import mysql, sqlite
+
+class IdSequence(db.Model):
+    """Next free id of a table whose ids are handed out in blocks, e.g. by bulk imports"""
+    __tablename__ = 'id_sequences'
+
+    name = db.Column(db.String(50), primary_key=True)  # Table name, e.g. 'questions'
+    next_id = db.Column(db.Integer, nullable=False, default=1)
+
+    def __repr__(self):
+        return f'<IdSequence {self.name} next:{self.next_id}>'
+
+    @staticmethod
+    def reserve(table, count=1):
+        """
+        Reserve count consecutive ids of table in the current transaction and return the first.
+
+        One UPDATE bumps the counter, so concurrent reservations never overlap: the counter
+        row stays locked until commit and a rollback returns the block. The counter never
+        falls behind the table's largest id, so rows inserted with explicit ids elsewhere
+        (seed scripts, init_db.py) are skipped over.
+        """
+        sequences = IdSequence.__table__
+        dialect = db.engine.dialect.name
+        greatest = func.max if dialect == 'sqlite' else func.greatest  # Scalar max() with two arguments in SQLite
+        after_table = select(func.coalesce(func.max(table.c.id), 0) + 1).scalar_subquery()
+
+        for _ in range(2):
+            updated = db.session.execute(sequences.update().where(sequences.c.name == table.name).values(
+                next_id=greatest(sequences.c.next_id, after_table) + count
+            )).rowcount
+            if updated:
+                # The UPDATE holds the row until commit, so this reads back our own increment
+                next_id = db.session.query(IdSequence.next_id).filter_by(name=table.name).scalar()
+                return next_id - count
+
+            # First reservation for this table; a concurrent one may create the row first
+            values = {'name': table.name, 'next_id': 1}
+            if dialect == 'mysql':
+                stmt = mysql.insert(sequences).values(**values).prefix_with('IGNORE')
+            elif dialect == 'sqlite':
+                stmt = sqlite.insert(sequences).values(**values).on_conflict_do_nothing()
+            else:
+                stmt = sequences.insert().values(**values)
+            db.session.execute(stmt)
+
+        raise RuntimeError(f'Could not reserve ids for {table.name}')
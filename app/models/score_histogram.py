@@ -0,0 +1,45 @@
+from app import db
+from sqlalchemy.dialects import mysql, sqlite
+
+class ScoreHistogram(db.Model):
+    """Number of completed attempts per (subject, score); the score distribution of a subject"""
+    __tablename__ = 'score_histograms'
+
+    subject_id = db.Column(db.Integer, db.ForeignKey('subjects.id'), primary_key=True)
+    score = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ScoreHistogram Subject:{self.subject_id} Score:{self.score} Count:{self.count}>'
+
+    @staticmethod
+    def record(subject_id, score):
+        """Count one more attempt with this score as part of the current transaction"""
+        table = ScoreHistogram.__table__
+        values = {'subject_id': subject_id, 'score': score, 'count': 1}
+        dialect = db.engine.dialect.name
+
+        if dialect == 'mysql':
+            stmt = mysql.insert(table).values(**values).on_duplicate_key_update(count=table.c.count + 1)
+        elif dialect == 'sqlite':
+            stmt = sqlite.insert(table).values(**values).on_conflict_do_update(
+                index_elements=[table.c.subject_id, table.c.score],
+                set_={'count': table.c.count + 1}
+            )
+        else:
+            updated = db.session.execute(table.update().where(
+                (table.c.subject_id == subject_id) & (table.c.score == score)
+            ).values(count=table.c.count + 1)).rowcount
+            if updated:
+                return
+            stmt = table.insert().values(**values)
+
+        db.session.execute(stmt)
+
+    @staticmethod
+    def distribution(subject_id):
+        """Return [(score, count), ...] for a subject in ascending score order"""
+        return db.session.query(ScoreHistogram.score, ScoreHistogram.count).filter(
+            ScoreHistogram.subject_id == subject_id,
+            ScoreHistogram.count > 0
+        ).order_by(ScoreHistogram.score).all()
@@ -13,6 +13,7 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_login = db.Column(db.DateTime)
     is_profile_complete = db.Column(db.Boolean, default=False)  # Flag to check if username and avatar are set
+    token_version = db.Column(db.Integer, nullable=False, default=1, server_default='1')  # Bump to revoke issued tokens
 
     # Relationships
     exams = db.relationship('UserExam', back_populates='user', lazy='dynamic')
@@ -27,3 +28,11 @@ class User(db.Model):
 
     def is_admin(self):
         return self.role == 'admin'
+
+    def token_claims(self):
+        """Additional JWT claims that let endpoints authorize without loading the user"""
+        return {'role': self.role, 'tv': self.token_version}
+
+    def revoke_tokens(self):
+        """Invalidate every token issued to this user (takes effect on the next commit)"""
+        self.token_version = (self.token_version or 1) + 1
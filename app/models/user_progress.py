@@ -1,8 +1,18 @@
 from app import db
+from app.models.exam import ExamCategory, Subject
+from collections import defaultdict
 from datetime import datetime
+from sqlalchemy import case, func, literal_column, or_
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.orm.attributes import set_committed_value
 
 class UserExam(db.Model):
     __tablename__ = 'user_exams'
+    __table_args__ = (
+        # One purchase row per user and subject; repurchases update it in place
+        db.Index('uq_user_exams_user_subject', 'user_id', 'subject_id', unique=True),
+        db.Index('ix_user_exams_subject', 'subject_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -12,6 +22,7 @@ class UserExam(db.Model):
     last_purchased_at = db.Column(db.DateTime, default=datetime.utcnow)
     max_retakes = db.Column(db.Integer, default=3)  # Maximum number of retakes allowed per purchase
     retakes_used = db.Column(db.Integer, default=0)  # Number of retakes used so far
+    attempts_started = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Numbers attempts across purchases
 
     # Relationships
     user = db.relationship('User', back_populates='exams')
@@ -22,6 +33,7 @@ class UserExam(db.Model):
         return f'<UserExam {self.id} User:{self.user_id} Subject:{self.subject_id}>'
 
     def to_dict(self):
+        attempts = self.attempts.all()
         return {
             'id': self.id,
             'user_id': self.user_id,
@@ -34,12 +46,149 @@ class UserExam(db.Model):
             'max_retakes': self.max_retakes,
             'retakes_used': self.retakes_used,
             'retakes_remaining': self.max_retakes - self.retakes_used,
-            'attempts': [attempt.to_dict() for attempt in self.attempts],
-            'attempt_count': self.attempts.count()
+            'attempts': [attempt.to_dict() for attempt in attempts],
+            'attempt_count': len(attempts)
         }
 
+    @staticmethod
+    def purchase(user_id, subject_id, max_retakes=3):
+        """
+        Record a purchase with one upsert in the current transaction: the first purchase inserts
+        the row, later ones bump purchase_count and reset retakes_used in place. Returns the row.
+        """
+        now = datetime.utcnow()
+        table = UserExam.__table__
+        values = {'user_id': user_id, 'subject_id': subject_id, 'purchased_at': now, 'last_purchased_at': now,
+                  'purchase_count': 1, 'max_retakes': max_retakes, 'retakes_used': 0, 'attempts_started': 0}
+        dialect = db.engine.dialect.name
+
+        if dialect == 'mysql':
+            stmt = mysql.insert(table).values(**values)
+            stmt = stmt.on_duplicate_key_update(
+                purchase_count=table.c.purchase_count + 1,
+                last_purchased_at=stmt.inserted.last_purchased_at,
+                retakes_used=0
+            )
+        elif dialect == 'sqlite':
+            stmt = sqlite.insert(table).values(**values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.user_id, table.c.subject_id],
+                set_={'purchase_count': table.c.purchase_count + 1,
+                      'last_purchased_at': stmt.excluded.last_purchased_at,
+                      'retakes_used': 0}
+            )
+        else:
+            updated = db.session.execute(table.update().where(
+                (table.c.user_id == user_id) & (table.c.subject_id == subject_id)
+            ).values(purchase_count=table.c.purchase_count + 1, last_purchased_at=now, retakes_used=0))
+            stmt = table.insert().values(**values) if not updated.rowcount else None
+
+        if stmt is not None:
+            db.session.execute(stmt)
+        return UserExam.query.filter_by(user_id=user_id, subject_id=subject_id).populate_existing().one()
+
+    @staticmethod
+    def use_retake(user_exam_id, user_id):
+        """
+        Use one retake of a user's purchase with a single conditional UPDATE, so concurrent starts
+        can neither exceed max_retakes nor share an attempt number. Returns the new attempt's
+        number, or None if the purchase has no retakes left or is not the user's.
+        """
+        updated = UserExam.query.filter(
+            UserExam.id == user_exam_id,
+            UserExam.user_id == user_id,
+            UserExam.retakes_used < UserExam.max_retakes
+        ).update({
+            UserExam.retakes_used: UserExam.retakes_used + 1,
+            UserExam.attempts_started: UserExam.attempts_started + 1
+        }, synchronize_session=False)
+        if not updated:
+            return None
+        # The UPDATE holds the row until commit, so this reads back our own increment
+        return db.session.query(UserExam.attempts_started).filter_by(id=user_exam_id).scalar()
+
+    @staticmethod
+    def summaries(user_id):
+        """
+        Column query for a user's exams with attempt aggregates and subject/category names.
+        Attempt counts, best score and last attempt come from one grouped subquery.
+        """
+        stats = db.session.query(
+            ExamAttempt.user_exam_id.label('user_exam_id'),
+            func.count(ExamAttempt.id).label('attempt_count'),
+            func.max(case([(ExamAttempt.completed_at.isnot(None), ExamAttempt.score)])).label('best_score'),
+            func.max(ExamAttempt.started_at).label('last_attempt_at')
+        ).filter(
+            ExamAttempt.user_id == user_id
+        ).group_by(ExamAttempt.user_exam_id).subquery()
+
+        return db.session.query(
+            UserExam.id,
+            UserExam.user_id,
+            UserExam.subject_id,
+            UserExam.purchased_at,
+            UserExam.purchase_count,
+            UserExam.last_purchased_at,
+            UserExam.max_retakes,
+            UserExam.retakes_used,
+            Subject.name.label('subject_name'),
+            ExamCategory.name.label('category_name'),
+            func.coalesce(stats.c.attempt_count, 0).label('attempt_count'),
+            stats.c.best_score,
+            stats.c.last_attempt_at
+        ).join(
+            Subject, Subject.id == UserExam.subject_id
+        ).join(
+            ExamCategory, ExamCategory.id == Subject.category_id
+        ).outerjoin(
+            stats, stats.c.user_exam_id == UserExam.id
+        ).filter(
+            UserExam.user_id == user_id
+        )
+
+    @staticmethod
+    def serialize_summaries(rows, include_attempts=False):
+        """Serialize rows from summaries(), optionally with attempts loaded in one query"""
+        attempts_by_exam = defaultdict(list)
+        if include_attempts and rows:
+            attempts = ExamAttempt.query.filter(
+                ExamAttempt.user_exam_id.in_([row.id for row in rows])
+            ).order_by(ExamAttempt.id)
+            for attempt in attempts:
+                attempts_by_exam[attempt.user_exam_id].append(attempt.to_dict())
+
+        summaries = []
+        for row in rows:
+            summary = {
+                'id': row.id,
+                'user_id': row.user_id,
+                'subject_id': row.subject_id,
+                'subject_name': row.subject_name,
+                'category_name': row.category_name,
+                'purchased_at': row.purchased_at.isoformat() if row.purchased_at else None,
+                'purchase_count': row.purchase_count,
+                'last_purchased_at': row.last_purchased_at.isoformat() if row.last_purchased_at else None,
+                'max_retakes': row.max_retakes,
+                'retakes_used': row.retakes_used,
+                'retakes_remaining': row.max_retakes - row.retakes_used,
+                'attempt_count': row.attempt_count,
+                'best_score': row.best_score,
+                'last_attempt_at': row.last_attempt_at.isoformat() if row.last_attempt_at else None
+            }
+            if include_attempts:
+                summary['attempts'] = attempts_by_exam[row.id]
+            summaries.append(summary)
+
+        return summaries
+
 class ExamAttempt(db.Model):
     __tablename__ = 'exam_attempts'
+    __table_args__ = (
+        db.Index('ix_exam_attempts_user_exam', 'user_id', 'user_exam_id'),
+        db.Index('ix_exam_attempts_user_exam_id', 'user_exam_id', 'id'),
+        # Leaderboards read the attempts at or above a score cut-off
+        db.Index('ix_exam_attempts_score', 'score', 'completed_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -53,6 +202,7 @@ class ExamAttempt(db.Model):
     time_taken_seconds = db.Column(db.Integer)
     started_at = db.Column(db.DateTime, default=datetime.utcnow)
     completed_at = db.Column(db.DateTime)
+    question_ids = db.Column(db.Text)  # Comma-separated ids of the sampled paper
 
     # Relationships
     user = db.relationship('User', back_populates='attempts')
@@ -61,6 +211,30 @@ class ExamAttempt(db.Model):
     def __repr__(self):
         return f'<ExamAttempt {self.id} User:{self.user_id} Score:{self.score}/{self.total_questions}>'
 
+    @staticmethod
+    def complete(attempt, **results):
+        """
+        Store an attempt's results and mark it submitted with one conditional UPDATE, in the
+        current transaction. Returns False if the attempt was already submitted, including by
+        a concurrent submit that committed first; the attempt is then left unchanged.
+        """
+        updated = ExamAttempt.query.filter(
+            ExamAttempt.id == attempt.id,
+            ExamAttempt.completed_at.is_(None)
+        ).update(dict(results), synchronize_session=False)
+        if updated != 1:
+            return False
+        # Reflect the stored results on the loaded attempt without issuing a second UPDATE
+        for key, value in results.items():
+            set_committed_value(attempt, key, value)
+        return True
+
+    def paper_question_ids(self):
+        """Question ids of the attempt's paper, or None for attempts that predate sampled papers"""
+        if not self.question_ids:
+            return None
+        return [int(question_id) for question_id in self.question_ids.split(',')]
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -76,3 +250,164 @@ class ExamAttempt(db.Model):
             'started_at': self.started_at.isoformat() if self.started_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None
         }
+
+class AttemptAnswer(db.Model):
+    """
+    Latest saved answer for one question of an attempt, and whether it was correct once submitted.
+
+    The (attempt_id, question_id) primary key clusters an attempt's answers together for
+    review and rescoring; the question index covers per-question aggregation.
+    """
+    __tablename__ = 'attempt_answers'
+    __table_args__ = (
+        db.Index('ix_attempt_answers_question', 'question_id', 'correct', 'option_id'),
+    )
+
+    attempt_id = db.Column(db.Integer, db.ForeignKey('exam_attempts.id'), primary_key=True)
+    # No foreign keys on questions/options: admins replace options on edit and answers must survive it
+    question_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    option_id = db.Column(db.Integer)  # None when the answer was cleared
+    correct = db.Column(db.Boolean)  # None until the attempt is submitted, or for unscored answers
+    time_spent = db.Column(db.SmallInteger)  # Seconds spent on the question
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<AttemptAnswer Attempt:{self.attempt_id} Question:{self.question_id} Option:{self.option_id}>'
+
+    def to_dict(self):
+        return {
+            'question_id': self.question_id,
+            'option_id': self.option_id,
+            'correct': self.correct,
+            'time_spent': self.time_spent
+        }
+
+    @staticmethod
+    def for_attempt(attempt_id):
+        """All saved answers of an attempt, read as one range of the primary key"""
+        return AttemptAnswer.query.filter_by(attempt_id=attempt_id).order_by(AttemptAnswer.question_id).all()
+
+    @staticmethod
+    def answers_for(attempt_id):
+        """Return the saved {question_id: option_id} map of an attempt, skipping cleared answers"""
+        rows = db.session.query(AttemptAnswer.question_id, AttemptAnswer.option_id).filter(
+            AttemptAnswer.attempt_id == attempt_id,
+            AttemptAnswer.option_id.isnot(None)
+        )
+        return {question_id: option_id for question_id, option_id in rows}
+
+class UserSubjectStats(db.Model):
+    """
+    Running totals of a user's completed attempts per subject, updated in the submit transaction.
+    The primary key leads with user_id, so a user's dashboard is one index range read.
+    """
+    __tablename__ = 'user_subject_stats'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subjects.id'), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    best_score = db.Column(db.Integer)
+    total_score = db.Column(db.Integer, nullable=False, default=0)
+    last_score = db.Column(db.Integer)
+    correct_answers = db.Column(db.Integer, nullable=False, default=0)
+    wrong_answers = db.Column(db.Integer, nullable=False, default=0)
+    total_questions = db.Column(db.Integer, nullable=False, default=0)
+    total_time_seconds = db.Column(db.Integer, nullable=False, default=0)
+    last_attempt_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<UserSubjectStats User:{self.user_id} Subject:{self.subject_id} Attempts:{self.attempts}>'
+
+    def to_dict(self, subject_name=None, category_name=None):
+        answered = self.correct_answers + self.wrong_answers
+        return {
+            'subject_id': self.subject_id,
+            'subject_name': subject_name,
+            'category_name': category_name,
+            'attempts': self.attempts,
+            'best_score': self.best_score,
+            'mean_score': round(self.total_score / self.attempts, 2) if self.attempts else None,
+            'last_score': self.last_score,
+            'accuracy': round(self.correct_answers / answered, 4) if answered else None,
+            'correct_answers': self.correct_answers,
+            'wrong_answers': self.wrong_answers,
+            'total_questions': self.total_questions,
+            'average_time_seconds': round(self.total_time_seconds / self.attempts, 1) if self.attempts else None,
+            'last_attempt_at': self.last_attempt_at.isoformat() if self.last_attempt_at else None
+        }
+
+    @staticmethod
+    def row_for(attempt, subject_id):
+        """Stats row values for a single completed attempt"""
+        return {
+            'user_id': attempt.user_id,
+            'subject_id': subject_id,
+            'attempts': 1,
+            'best_score': attempt.score,
+            'total_score': attempt.score or 0,
+            'last_score': attempt.score,
+            'correct_answers': attempt.correct_answers or 0,
+            'wrong_answers': attempt.wrong_answers or 0,
+            'total_questions': attempt.total_questions or 0,
+            'total_time_seconds': attempt.time_taken_seconds or 0,
+            'last_attempt_at': attempt.completed_at
+        }
+
+    @staticmethod
+    def record_attempt(attempt, subject_id):
+        """Fold a completed attempt into the user's stats for the subject, in the current transaction"""
+        table = UserSubjectStats.__table__
+        values = UserSubjectStats.row_for(attempt, subject_id)
+        dialect = db.engine.dialect.name
+        sums = ('attempts', 'total_score', 'correct_answers', 'wrong_answers', 'total_questions', 'total_time_seconds')
+
+        if dialect in ('mysql', 'sqlite'):
+            if dialect == 'mysql':
+                stmt = mysql.insert(table).values(**values)
+                incoming = {column: literal_column(f'VALUES({column})') for column in values}
+                greatest = func.greatest
+            else:
+                stmt = sqlite.insert(table).values(**values)
+                incoming = {column: stmt.excluded[column] for column in values}
+                greatest = func.max  # Scalar max() with two arguments in SQLite
+
+            is_latest = or_(table.c.last_attempt_at.is_(None), incoming['last_attempt_at'] >= table.c.last_attempt_at)
+            updates = [(column, table.c[column] + incoming[column]) for column in sums]
+            updates += [
+                ('best_score', greatest(func.coalesce(table.c.best_score, incoming['best_score']),
+                                        func.coalesce(incoming['best_score'], table.c.best_score))),
+                ('last_score', case((is_latest, incoming['last_score']), else_=table.c.last_score)),
+                # Assigned last: MySQL evaluates later assignments against already updated columns
+                ('last_attempt_at', case((is_latest, incoming['last_attempt_at']), else_=table.c.last_attempt_at))
+            ]
+            if dialect == 'mysql':
+                stmt = stmt.on_duplicate_key_update(updates)
+            else:
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[table.c.user_id, table.c.subject_id], set_=dict(updates)
+                )
+            db.session.execute(stmt)
+            return
+
+        stats = UserSubjectStats.query.filter_by(user_id=attempt.user_id, subject_id=subject_id).with_for_update().first()
+        if stats is None:
+            db.session.add(UserSubjectStats(**values))
+            return
+        for column in sums:
+            setattr(stats, column, getattr(stats, column) + values[column])
+        scores = [score for score in (stats.best_score, values['best_score']) if score is not None]
+        stats.best_score = max(scores) if scores else None
+        if stats.last_attempt_at is None or values['last_attempt_at'] >= stats.last_attempt_at:
+            stats.last_score = values['last_score']
+            stats.last_attempt_at = values['last_attempt_at']
+
+    @staticmethod
+    def for_user(user_id):
+        """A user's stats with subject and category names, in one query over the primary key"""
+        return db.session.query(UserSubjectStats, Subject.name, ExamCategory.name).join(
+            Subject, Subject.id == UserSubjectStats.subject_id
+        ).join(
+            ExamCategory, ExamCategory.id == Subject.category_id
+        ).filter(
+            UserSubjectStats.user_id == user_id
+        ).order_by(UserSubjectStats.subject_id).all()
@@ -0,0 +1,426 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import case, func, literal_column, select
+from sqlalchemy.dialects import mysql, sqlite
+from app import db
+from app.models.user_progress import AttemptAnswer, ExamAttempt
+
+class PendingAnswerStore:
+    """
+    Interface for the answer saves that are waiting to be written to attempt_answers.
+
+    Entries are (option_id, time_spent, updated_at) per attempt and question. add() keeps
+    the newer of two saves and the earlier time_spent when a save has none. peek() reads
+    without removing, and remove() deletes only entries that have not changed since they
+    were peeked, so a save that arrives during a flush stays pending.
+    """
+
+    def add(self, attempt_id, answers):
+        """Merge {question_id: (option_id, time_spent, updated_at)} into an attempt's pending saves"""
+        raise NotImplementedError
+
+    def peek(self, attempt_id=None):
+        """Return {attempt_id: {question_id: (option_id, time_spent, updated_at)}}, for one attempt or all"""
+        raise NotImplementedError
+
+    def remove(self, batch):
+        """Remove the entries of a peeked batch that are still unchanged"""
+        raise NotImplementedError
+
+    def count(self):
+        """Return (pending attempts, pending rows)"""
+        raise NotImplementedError
+
+    def after_fork(self):
+        """Drop connections inherited from the parent process"""
+
+class MemoryPendingAnswers(PendingAnswerStore):
+    """Pending saves kept in this process. Only suitable for a single worker process."""
+
+    def __init__(self):
+        self._pending = {}  # attempt_id -> {question_id: (option_id, time_spent, updated_at)}
+        self._lock = threading.Lock()
+
+    def add(self, attempt_id, answers):
+        with self._lock:
+            pending = self._pending.setdefault(attempt_id, {})
+            for question_id, (option_id, seconds, updated_at) in answers.items():
+                current = pending.get(question_id)
+                if current is not None:
+                    if current[2] > updated_at:
+                        continue
+                    if seconds is None:
+                        seconds = current[1]
+                pending[question_id] = (option_id, seconds, updated_at)
+
+    def peek(self, attempt_id=None):
+        with self._lock:
+            if attempt_id is None:
+                return {attempt: dict(answers) for attempt, answers in self._pending.items()}
+            return {attempt_id: dict(self._pending[attempt_id])} if attempt_id in self._pending else {}
+
+    def remove(self, batch):
+        with self._lock:
+            for attempt_id, answers in batch.items():
+                pending = self._pending.get(attempt_id)
+                if pending is None:
+                    continue
+                for question_id, answer in answers.items():
+                    if pending.get(question_id) == answer:
+                        del pending[question_id]
+                if not pending:
+                    del self._pending[attempt_id]
+
+    def count(self):
+        with self._lock:
+            return len(self._pending), sum(len(answers) for answers in self._pending.values())
+
+def encode_answer(option_id, seconds, updated_at):
+    """'option_id,time_spent,updated_at' with empty fields for None; timestamps sort as strings"""
+    return '{},{},{}'.format('' if option_id is None else option_id, '' if seconds is None else seconds,
+                             updated_at.isoformat(timespec='microseconds'))
+
+def decode_answer(value):
+    option_id, seconds, updated_at = value.split(',')
+    return (int(option_id) if option_id else None, int(seconds) if seconds else None,
+            datetime.fromisoformat(updated_at))
+
+class RedisPendingAnswers(PendingAnswerStore):
+    """
+    Pending saves shared by worker processes through the Redis protocol: one hash per
+    attempt of encoded answers, plus a set of the attempts that have any. Merging and
+    removal run as scripts, so they are atomic per attempt.
+    """
+
+    # ARGV: attempt_id, then question_id and encoded answer pairs
+    ADD_SCRIPT = """
+    for i = 2, #ARGV, 2 do
+        local option, seconds, updated = string.match(ARGV[i + 1], '^([^,]*),([^,]*),(.*)$')
+        local current = redis.call('HGET', KEYS[1], ARGV[i])
+        local keep = false
+        if current then
+            local _, current_seconds, current_updated = string.match(current, '^([^,]*),([^,]*),(.*)$')
+            keep = current_updated > updated
+            if seconds == '' then
+                seconds = current_seconds
+            end
+        end
+        if not keep then
+            redis.call('HSET', KEYS[1], ARGV[i], option .. ',' .. seconds .. ',' .. updated)
+        end
+    end
+    redis.call('SADD', KEYS[2], ARGV[1])
+    return 1
+    """
+
+    # Delete fields whose value is still the peeked one; forget the attempt once it has none
+    REMOVE_SCRIPT = """
+    for i = 2, #ARGV, 2 do
+        if redis.call('HGET', KEYS[1], ARGV[i]) == ARGV[i + 1] then
+            redis.call('HDEL', KEYS[1], ARGV[i])
+        end
+    end
+    if redis.call('HLEN', KEYS[1]) == 0 then
+        redis.call('SREM', KEYS[2], ARGV[1])
+    end
+    return 1
+    """
+
+    def __init__(self, client, prefix='answers:'):
+        self.client = client
+        self.prefix = prefix
+        self.index_key = f'{prefix}pending'
+        self._add = client.register_script(self.ADD_SCRIPT)
+        self._remove = client.register_script(self.REMOVE_SCRIPT)
+
+    def _key(self, attempt_id):
+        return f'{self.prefix}{attempt_id}'
+
+    def add(self, attempt_id, answers):
+        args = [attempt_id]
+        for question_id, answer in answers.items():
+            args.extend((question_id, encode_answer(*answer)))
+        self._add(keys=[self._key(attempt_id), self.index_key], args=args)
+
+    def peek(self, attempt_id=None):
+        if attempt_id is None:
+            attempt_ids = sorted(int(member) for member in self.client.smembers(self.index_key))
+        else:
+            attempt_ids = [attempt_id]
+        pipe = self.client.pipeline(transaction=False)
+        for attempt in attempt_ids:
+            pipe.hgetall(self._key(attempt))
+        batch = {}
+        for attempt, fields in zip(attempt_ids, pipe.execute()):
+            if fields:
+                batch[attempt] = {int(question_id): decode_answer(value.decode() if isinstance(value, bytes) else value)
+                                  for question_id, value in fields.items()}
+        return batch
+
+    def remove(self, batch):
+        for attempt_id, answers in batch.items():
+            args = [attempt_id]
+            for question_id, answer in answers.items():
+                args.extend((question_id, encode_answer(*answer)))
+            self._remove(keys=[self._key(attempt_id), self.index_key], args=args)
+
+    def count(self):
+        attempt_ids = list(self.client.smembers(self.index_key))
+        pipe = self.client.pipeline(transaction=False)
+        for attempt in attempt_ids:
+            pipe.hlen(self._key(int(attempt)))
+        return len(attempt_ids), sum(pipe.execute()) if attempt_ids else 0
+
+class SQLitePendingAnswers(PendingAnswerStore):
+    """Pending saves shared by worker processes on one host through a SQLite file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connect().execute(
+            'CREATE TABLE IF NOT EXISTS pending_answers (attempt_id INTEGER NOT NULL, question_id INTEGER NOT NULL, '
+            'option_id INTEGER, time_spent INTEGER, updated_at TEXT NOT NULL, PRIMARY KEY (attempt_id, question_id))'
+        )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def add(self, attempt_id, answers):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT INTO pending_answers (attempt_id, question_id, option_id, time_spent, updated_at) '
+                'VALUES (?, ?, ?, ?, ?) ON CONFLICT (attempt_id, question_id) DO UPDATE SET '
+                'option_id = excluded.option_id, time_spent = COALESCE(excluded.time_spent, time_spent), '
+                'updated_at = excluded.updated_at WHERE excluded.updated_at >= updated_at',
+                [(attempt_id, question_id, option_id, seconds, updated_at.isoformat(timespec='microseconds'))
+                 for question_id, (option_id, seconds, updated_at) in answers.items()]
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def peek(self, attempt_id=None):
+        sql = 'SELECT attempt_id, question_id, option_id, time_spent, updated_at FROM pending_answers'
+        rows = self._connect().execute(*((sql + ' WHERE attempt_id = ?', (attempt_id,)) if attempt_id is not None
+                                         else (sql,)))
+        batch = {}
+        for attempt, question_id, option_id, seconds, updated_at in rows:
+            batch.setdefault(attempt, {})[question_id] = (option_id, seconds, datetime.fromisoformat(updated_at))
+        return batch
+
+    def remove(self, batch):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'DELETE FROM pending_answers WHERE attempt_id = ? AND question_id = ? AND updated_at = ?',
+                [(attempt_id, question_id, updated_at.isoformat(timespec='microseconds'))
+                 for attempt_id, answers in batch.items()
+                 for question_id, (_, _, updated_at) in answers.items()]
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def count(self):
+        return tuple(self._connect().execute(
+            'SELECT COUNT(DISTINCT attempt_id), COUNT(*) FROM pending_answers'
+        ).fetchone())
+
+    def after_fork(self):
+        # SQLite connections must not be used across a fork; reconnect lazily
+        self._local = threading.local()
+
+def create_pending_answer_store(url):
+    """Create a pending answer store from a URL: memory://, redis://host:port/db or sqlite:///path/to/file"""
+    if url.startswith('memory://'):
+        return MemoryPendingAnswers()
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        import redis  # Optional dependency, only needed for the shared Redis backend
+        return RedisPendingAnswers(redis.Redis.from_url(url))
+    if url.startswith('sqlite:///'):
+        return SQLitePendingAnswers(os.path.abspath(url[len('sqlite:///'):]))
+    raise ValueError(f'Unsupported answer buffer URL: {url}')
+
+class AnswerBuffer:
+    """
+    Write-behind buffer for incremental answer saves.
+
+    Saves are merged per attempt in the store selected by ANSWER_BUFFER_URL (the latest
+    answer per question wins) and upserted into attempt_answers in batches by a
+    background thread, every flush_interval seconds or once this worker has added
+    max_rows answers. Each row carries the time it was received, and the upsert never
+    replaces a newer row, so batches flushed late cannot overwrite a later answer.
+
+    A flush writes pending saves before removing them from the store, so they are always
+    in one place or the other. With a shared store, the worker that receives a submit
+    writes the attempt's saves from every worker. Saves for attempts that are already
+    submitted are dropped.
+    """
+
+    def __init__(self, store=None, flush_interval=2.0, max_rows=1000):
+        self.store = store or MemoryPendingAnswers()
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+        self.app = None
+        self._added = 0  # Rows added by this worker since its last full flush
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.dropped_rows = 0
+        self.failures = 0
+
+    def init_app(self, app):
+        self.app = app
+        self.store = create_pending_answer_store(app.config.get('ANSWER_BUFFER_URL', 'memory://'))
+        self.flush_interval = app.config.get('ANSWER_FLUSH_INTERVAL_SECONDS', self.flush_interval)
+        self.max_rows = app.config.get('ANSWER_FLUSH_MAX_ROWS', self.max_rows)
+        app.extensions['answer_buffer'] = self
+        atexit.register(self.flush)
+
+    def add(self, attempt_id, answers, time_spent=None):
+        """Buffer {question_id: option_id or None} for an attempt, with optional {question_id: seconds}"""
+        now = datetime.utcnow()
+        time_spent = time_spent or {}
+        self.store.add(attempt_id, {
+            question_id: (option_id, time_spent.get(question_id), now) for question_id, option_id in answers.items()
+        })
+        with self._lock:
+            self._added += len(answers)
+            full = self._added >= self.max_rows
+        self._ensure_thread()
+        if full:
+            self._wakeup.set()
+
+    def flush(self, attempt_id=None):
+        """Write pending answers, for one attempt or all of them, and return the number of rows written"""
+        if attempt_id is None:
+            with self._lock:
+                self._added = 0
+        batch = self.store.peek(attempt_id)
+        if not batch:
+            return 0
+
+        try:
+            # Own engine connection: pushing an app context here would tear down the request's session
+            with db.get_engine(self.app).begin() as conn:
+                # Share-lock the attempts so a submit cannot complete one until this batch commits
+                open_attempts = {attempt for attempt, completed_at in conn.execute(
+                    select(ExamAttempt.id, ExamAttempt.completed_at).where(
+                        ExamAttempt.id.in_(list(batch))
+                    ).with_for_update(read=True)
+                ) if completed_at is None}
+                rows = [
+                    answer_row(attempt, question_id, option_id, seconds, updated_at)
+                    for attempt, answers in batch.items() if attempt in open_attempts
+                    for question_id, (option_id, seconds, updated_at) in answers.items()
+                ]
+                if rows:
+                    upsert_answers(conn, rows)
+        except Exception:
+            self.failures += 1
+            raise
+
+        # Removed only once written; saves that changed in the meantime stay pending
+        self.store.remove(batch)
+        self.flushes += 1
+        self.flushed_rows += len(rows)
+        self.dropped_rows += sum(len(answers) for answers in batch.values()) - len(rows)
+        return len(rows)
+
+    def stats(self):
+        pending_attempts, pending_rows = self.store.count()
+        return {
+            'pending_attempts': pending_attempts,
+            'pending_rows': pending_rows,
+            'flushes': self.flushes,
+            'flushed_rows': self.flushed_rows,
+            'dropped_rows': self.dropped_rows,
+            'failures': self.failures
+        }
+
+    def after_fork(self):
+        self.store.after_fork()
+
+    def _ensure_thread(self):
+        # Started lazily so every forked worker gets its own flusher
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='answer-buffer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                self.app.logger.exception('Flushing buffered answers failed, retrying next interval')
+                time.sleep(self.flush_interval)
+
+def answer_row(attempt_id, question_id, option_id, time_spent=None, updated_at=None, correct=None):
+    return {'attempt_id': attempt_id, 'question_id': question_id, 'option_id': option_id, 'correct': correct,
+            'time_spent': time_spent, 'updated_at': updated_at or datetime.utcnow()}
+
+def upsert_answers(conn, rows):
+    """
+    Insert or update attempt_answers rows in one statement, keeping whichever row is newer.
+    A row without time_spent keeps the stored value.
+    """
+    table = AttemptAnswer.__table__
+    dialect = conn.dialect.name
+
+    if dialect == 'mysql':
+        # Spelled out as VALUES(col): SQLAlchemy misrenders stmt.inserted nested inside CASE
+        def inserted(name):
+            return literal_column(f'VALUES({name})')
+
+        newer = inserted('updated_at') >= table.c.updated_at
+        # MySQL applies assignments left to right, so updated_at must come last
+        stmt = mysql.insert(table).on_duplicate_key_update([
+            ('option_id', case((newer, inserted('option_id')), else_=table.c.option_id)),
+            ('correct', case((newer, inserted('correct')), else_=table.c.correct)),
+            ('time_spent', case((newer, func.coalesce(inserted('time_spent'), table.c.time_spent)),
+                                else_=table.c.time_spent)),
+            ('updated_at', case((newer, inserted('updated_at')), else_=table.c.updated_at))
+        ])
+    elif dialect == 'sqlite':
+        stmt = sqlite.insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.attempt_id, table.c.question_id],
+            set_={'option_id': stmt.excluded.option_id, 'correct': stmt.excluded.correct,
+                  'time_spent': func.coalesce(stmt.excluded.time_spent, table.c.time_spent),
+                  'updated_at': stmt.excluded.updated_at},
+            where=stmt.excluded.updated_at >= table.c.updated_at
+        )
+    else:
+        conn.execute(table.delete().where(
+            db.tuple_(table.c.attempt_id, table.c.question_id).in_(
+                [(row['attempt_id'], row['question_id']) for row in rows])
+        ))
+        stmt = table.insert()
+
+    conn.execute(stmt, rows)
+
+answer_buffer = AnswerBuffer()
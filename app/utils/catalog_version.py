@@ -0,0 +1,85 @@
+import threading
+import time
+from functools import wraps
+from flask import current_app, make_response, request
+from app import db
+from app.models.content_version import ContentVersion
+
+class CatalogVersion:
+    """
+    Version of the exam catalog (categories and subjects) used for HTTP validators.
+
+    The version row is re-read at most once every CATALOG_VERSION_TTL_SECONDS per
+    process, so conditional requests can be answered without touching the catalog
+    tables. Admin writes bump the row in their transaction and expire the local copy.
+    """
+
+    NAME = 'catalog'
+
+    def __init__(self):
+        self._version = None
+        self._updated_at = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    def current(self):
+        """Return (version, updated_at) for the catalog"""
+        ttl = current_app.config['CATALOG_VERSION_TTL_SECONDS']
+        with self._lock:
+            if self._version is not None and time.monotonic() - self._checked_at < ttl:
+                return self._version, self._updated_at
+
+        row = db.session.execute(
+            ContentVersion.__table__.select().where(ContentVersion.name == self.NAME)
+        ).first()
+        version, updated_at = (row.version, row.updated_at) if row else (0, None)
+
+        with self._lock:
+            self._version, self._updated_at = version, updated_at
+            self._checked_at = time.monotonic()
+        return version, updated_at
+
+    def bump(self):
+        """Bump the catalog version in the current transaction"""
+        ContentVersion.bump(self.NAME)
+
+    def expire(self):
+        """Forget the cached version so the next request reads the committed one"""
+        with self._lock:
+            self._version = None
+
+catalog_version = CatalogVersion()
+
+def catalog_etag(fn):
+    """
+    Serve a catalog GET with an ETag and Last-Modified from the catalog version.
+    Matching If-None-Match (or If-Modified-Since) requests get a 304 before the view runs.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        version, updated_at = catalog_version.current()
+        etag = f'catalog-{version}'
+        last_modified = updated_at.replace(microsecond=0) if updated_at else None
+
+        not_modified = False
+        if request.if_none_match:
+            # Weak comparison: compression turns the ETag weak on the way out
+            not_modified = request.if_none_match.contains_weak(etag)
+        elif last_modified and request.if_modified_since:
+            not_modified = last_modified <= request.if_modified_since.replace(tzinfo=None)
+
+        if not_modified:
+            response = make_response('', 304)
+        else:
+            response = make_response(fn(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+        response.set_etag(etag)
+        if last_modified:
+            response.last_modified = last_modified
+        # Clients may reuse the cached body but must revalidate it first
+        response.cache_control.no_cache = True
+        return response
+
+    return wrapper
@@ -0,0 +1,124 @@
+import gzip
+import zlib
+from functools import lru_cache
+from flask import Response, current_app, request
+
+@lru_cache(maxsize=None)
+def brotli_available():
+    try:
+        import brotli  # Optional dependency: pip install brotli
+    except ImportError:
+        return False
+    return True
+
+def compress(data, encoding, level):
+    """Compress bytes with 'gzip' or 'br' at the given level (brotli quality)"""
+    if encoding == 'gzip':
+        # A fixed mtime keeps the output identical for identical bodies
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    if encoding == 'br':
+        import brotli
+        return brotli.compress(data, quality=level)
+    raise ValueError(f'Unsupported content encoding: {encoding}')
+
+def negotiate_encoding():
+    """Best encoding the client accepts from Accept-Encoding, or None for identity"""
+    offered = ['br', 'gzip'] if brotli_available() else ['gzip']
+    return request.accept_encodings.best_match(offered)
+
+def dynamic_level(encoding):
+    config = current_app.config
+    return config['COMPRESS_GZIP_LEVEL'] if encoding == 'gzip' else config['COMPRESS_BROTLI_QUALITY']
+
+def compress_chunks(chunks, encoding, level):
+    """Compress a streamed body, flushing after every chunk so the client is not kept waiting"""
+    if encoding == 'gzip':
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        process, flush = compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+        finish = compressor.flush
+    else:
+        import brotli
+        compressor = brotli.Compressor(quality=level)
+        process, flush, finish = compressor.process, compressor.flush, compressor.finish
+
+    for chunk in chunks:
+        data = process(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
+
+def cached_payload_response(body, etag, encode, mimetype='application/json'):
+    """
+    Response for a serialized body that is cached server side.
+
+    encode(encoding) returns the body compressed with that encoding, so callers can keep
+    the compressed bytes next to the body instead of compressing on every request. The
+    weak ETag answers If-None-Match with a 304 whichever encoding the client holds.
+    """
+    response = Response(mimetype=mimetype)
+    response.vary.add('Accept-Encoding')
+    response.set_etag(etag, weak=True)
+    # Clients may reuse the cached body but must revalidate it first
+    response.cache_control.no_cache = True
+
+    encoding = negotiate_encoding() if len(body) >= current_app.config['COMPRESS_MIN_SIZE'] else None
+    if encoding:
+        response.set_data(encode(encoding))
+        response.content_encoding = encoding
+    else:
+        response.set_data(body)
+    return response.make_conditional(request)
+
+class Compression:
+    """
+    Compress responses with gzip or brotli, negotiated through Accept-Encoding.
+
+    Bodies smaller than COMPRESS_MIN_SIZE, non-text mimetypes and responses that already
+    carry a Content-Encoding are sent as they are. Streamed bodies are compressed chunk by
+    chunk. Brotli is offered only when the optional brotli package is installed.
+    """
+
+    def init_app(self, app):
+        app.extensions['compression'] = self
+        if app.config.get('COMPRESS_ENABLED', True):
+            app.after_request(self._after_request)
+
+    def _after_request(self, response):
+        config = current_app.config
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or response.direct_passthrough or 'Content-Encoding' in response.headers
+                or response.mimetype not in config['COMPRESS_MIMETYPES']
+                or 'no-transform' in response.headers.get('Cache-Control', '')):
+            return response
+
+        streamed = response.is_streamed
+        if not streamed and response.calculate_content_length() < config['COMPRESS_MIN_SIZE']:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate_encoding()
+        if not encoding:
+            return response
+
+        level = dynamic_level(encoding)
+        if streamed:
+            chunks = response.response
+            response.response = compress_chunks(response.iter_encoded(), encoding, level)
+            if hasattr(chunks, 'close'):
+                response.call_on_close(chunks.close)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            compressed = compress(data, encoding, level)
+            if len(compressed) >= len(data):
+                return response
+            response.set_data(compressed)
+
+        response.content_encoding = encoding
+        # The compressed body is no longer byte-identical to the uncompressed one
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+compression = Compression()
@@ -0,0 +1,75 @@
+from functools import wraps
+from flask import has_request_context, request
+from flask_sqlalchemy import SQLAlchemy, SignallingSession, get_state, _EngineConnector
+from sqlalchemy import orm
+
+REPLICA_BIND = 'replica'
+REPLICA_ENVIRON_KEY = 'app.use_replica'
+
+# Queue pool settings that SQLite's StaticPool/NullPool do not accept
+QUEUE_POOL_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout')
+
+class RoutingSession(SignallingSession):
+    """
+    Session that sends reads to the read replica inside views marked with use_replica.
+    Flushes and INSERT/UPDATE/DELETE statements always go to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None):
+        if self._use_replica(clause):
+            return get_state(self.app).db.get_engine(self.app, bind=REPLICA_BIND)
+        return super().get_bind(mapper, clause)
+
+    def _use_replica(self, clause):
+        if self._flushing or not has_request_context() or not request.environ.get(REPLICA_ENVIRON_KEY):
+            return False
+        if clause is not None and getattr(clause, 'is_dml', False):
+            return False
+        return REPLICA_BIND in (self.app.config.get('SQLALCHEMY_BINDS') or {})
+
+class RoutingEngineConnector(_EngineConnector):
+    def get_options(self, sa_url, echo):
+        sa_url, options = super().get_options(sa_url, echo)
+        if sa_url.drivername.startswith('sqlite'):
+            for option in QUEUE_POOL_OPTIONS:
+                options.pop(option, None)
+        return sa_url, options
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """
+    SQLAlchemy extension with read-replica routing and per-driver pool options.
+
+    SQLALCHEMY_ENGINE_OPTIONS apply to the primary and the replica engine alike; queue
+    pool sizing is dropped for SQLite, and MySQL engines get connect/read/write timeouts.
+    """
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def make_connector(self, app=None, bind=None):
+        return RoutingEngineConnector(self, self.get_app(app), bind)
+
+    def apply_driver_hacks(self, app, sa_url, options):
+        sa_url, options = super().apply_driver_hacks(app, sa_url, options)
+        if sa_url.drivername.startswith('mysql'):
+            connect_args = options.setdefault('connect_args', {})
+            connect_args.setdefault('connect_timeout', app.config.get('DB_CONNECT_TIMEOUT', 10))
+            connect_args.setdefault('read_timeout', app.config.get('DB_READ_TIMEOUT', 30))
+            connect_args.setdefault('write_timeout', app.config.get('DB_WRITE_TIMEOUT', 30))
+        return sa_url, options
+
+def dispose_engines(app):
+    """Drop pooled connections of the primary and every bind, e.g. around a worker fork"""
+    state = get_state(app)
+    for bind in [None] + list(app.config.get('SQLALCHEMY_BINDS') or {}):
+        state.db.get_engine(app, bind=bind).dispose()
+
+def use_replica(fn):
+    """Route the view's reads to the read replica when one is configured"""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        # Request scoped (not g) so it also covers streamed responses and nothing after them
+        request.environ[REPLICA_ENVIRON_KEY] = True
+        return fn(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,160 @@
+from datetime import datetime
+import numpy as np  # Optional dependency, only needed by the calibration job
+from sqlalchemy import bindparam, select
+from app import db
+from app.models.exam import Subject, Question
+from app.models.user_progress import ExamAttempt, AttemptAnswer
+from app.utils.pagination import iter_keyset
+from app.utils.paper_cache import paper_cache
+
+UPDATE_CHUNK = 1000
+
+class ItemStatistics:
+    """
+    Running per-question statistics over a stream of scored responses.
+
+    Each chunk is a sparse attempt x question matrix in coordinate form (attempt id,
+    question id, correct). Chunks hold whole attempts, so every response can be paired
+    with the attempt's rest score (share correct among its other answers). Only
+    per-question sums are kept between chunks, so memory is bounded by the number of
+    questions plus one chunk, however many responses are streamed.
+    """
+
+    def __init__(self, question_ids):
+        self.question_ids = np.asarray(sorted(question_ids), dtype=np.int64)
+        size = len(self.question_ids)
+        self.responses = np.zeros(size)
+        self.correct = np.zeros(size)
+        # Sums over responses whose attempt has other answers, for the point-biserial correlation
+        self.n = np.zeros(size)
+        self.sum_x = np.zeros(size)
+        self.sum_y = np.zeros(size)
+        self.sum_yy = np.zeros(size)
+        self.sum_xy = np.zeros(size)
+
+    def add_chunk(self, attempt_ids, question_ids, correct):
+        attempt_ids = np.asarray(attempt_ids, dtype=np.int64)
+        question_ids = np.asarray(question_ids, dtype=np.int64)
+        x = np.asarray(correct, dtype=np.float64)
+        if not len(x):
+            return
+
+        # Attempt totals include answers to questions that have since been deleted
+        _, rows = np.unique(attempt_ids, return_inverse=True)
+        answered = np.bincount(rows)
+        right = np.bincount(rows, weights=x)
+
+        columns = np.searchsorted(self.question_ids, question_ids)
+        known = columns < len(self.question_ids)
+        known[known] = self.question_ids[columns[known]] == question_ids[known]
+        columns, rows, x = columns[known], rows[known], x[known]
+
+        size = len(self.question_ids)
+        self.responses += np.bincount(columns, minlength=size)
+        self.correct += np.bincount(columns, weights=x, minlength=size)
+
+        others = answered[rows] - 1
+        paired = others > 0
+        columns, x = columns[paired], x[paired]
+        y = (right[rows[paired]] - x) / others[paired]
+        self.n += np.bincount(columns, minlength=size)
+        self.sum_x += np.bincount(columns, weights=x, minlength=size)
+        self.sum_y += np.bincount(columns, weights=y, minlength=size)
+        self.sum_yy += np.bincount(columns, weights=y * y, minlength=size)
+        self.sum_xy += np.bincount(columns, weights=x * y, minlength=size)
+
+    def results(self, min_responses=30):
+        """Yield (question_id, p_value, discrimination or None, responses) for items with enough data"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            p_values = self.correct / self.responses
+            # x is 0/1, so sum(x^2) == sum(x)
+            covariance = self.n * self.sum_xy - self.sum_x * self.sum_y
+            variance = (self.n * self.sum_x - self.sum_x ** 2) * (self.n * self.sum_yy - self.sum_y ** 2)
+            discrimination = covariance / np.sqrt(variance)
+
+        for index in np.flatnonzero(self.responses >= max(min_responses, 1)):
+            r = discrimination[index]
+            yield (
+                int(self.question_ids[index]),
+                round(float(p_values[index]), 4),
+                round(float(r), 4) if np.isfinite(r) else None,
+                int(self.responses[index])
+            )
+
+def iter_response_chunks(chunk_size=2000):
+    """Yield (attempt_ids, question_ids, correct) arrays for successive ranges of submitted attempts"""
+    attempts = db.session.query(ExamAttempt.id).filter(ExamAttempt.completed_at.isnot(None))
+    answers = AttemptAnswer.__table__
+    for batch in iter_keyset(attempts, ExamAttempt.id, chunk_size):
+        rows = db.session.execute(
+            select([answers.c.attempt_id, answers.c.question_id, answers.c.correct]).where(
+                answers.c.attempt_id.between(batch[0].id, batch[-1].id),
+                answers.c.correct.isnot(None)
+            )
+        ).fetchall()
+        db.session.expunge_all()
+        if rows:
+            attempt_ids, question_ids, correct = zip(*rows)
+            yield (np.fromiter(attempt_ids, dtype=np.int64, count=len(rows)),
+                   np.fromiter(question_ids, dtype=np.int64, count=len(rows)),
+                   np.fromiter(correct, dtype=np.float64, count=len(rows)))
+
+def difficulty_label(p_value, easy=0.7, hard=0.4):
+    if p_value >= easy:
+        return 'easy'
+    if p_value < hard:
+        return 'hard'
+    return 'medium'
+
+def calibrate(chunk_size=2000, min_responses=30, relabel=False, easy=0.7, hard=0.4, dry_run=False):
+    """
+    Fit p-value and point-biserial discrimination for every question from submitted answers
+    and write them back with bulk updates. With relabel, Question.difficulty is reset from
+    the p-value and the affected subjects' papers are invalidated.
+    """
+    questions = {question_id: (subject_id, difficulty) for question_id, subject_id, difficulty in
+                 db.session.query(Question.id, Question.subject_id, Question.difficulty)}
+    stats = ItemStatistics(questions)
+
+    responses = 0
+    for chunk in iter_response_chunks(chunk_size):
+        stats.add_chunk(*chunk)
+        responses += len(chunk[0])
+
+    now = datetime.utcnow()
+    rows = []
+    relabeled = []
+    for question_id, p_value, discrimination, count in stats.results(min_responses):
+        row = {'question_id': question_id, 'p_value': p_value, 'discrimination': discrimination,
+               'response_count': count, 'calibrated_at': now}
+        if relabel:
+            subject_id, difficulty = questions[question_id]
+            row['difficulty'] = difficulty_label(p_value, easy, hard)
+            if row['difficulty'] != difficulty:
+                relabeled.append(subject_id)
+        rows.append(row)
+
+    report = {'responses': responses, 'calibrated': len(rows), 'relabeled': len(relabeled)}
+    if dry_run or not rows:
+        return report
+
+    table = Question.__table__
+    values = {column: bindparam(column) for column in ('p_value', 'discrimination', 'response_count', 'calibrated_at')}
+    if relabel:
+        values['difficulty'] = bindparam('difficulty')
+    stmt = table.update().where(table.c.id == bindparam('question_id')).values(**values)
+
+    try:
+        for start in range(0, len(rows), UPDATE_CHUNK):
+            db.session.execute(stmt, rows[start:start + UPDATE_CHUNK])
+        if relabeled:
+            # Difficulty is part of the served paper, so new papers must be built
+            Subject.bump_content_version(*set(relabeled))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    if relabeled:
+        paper_cache.invalidate(*set(relabeled))
+    return report
@@ -1,50 +1,210 @@
+import heapq
+import os
 import random
+import sqlite3
+import threading
 import time
-from datetime import datetime, timedelta
 from flask import current_app
+from app.utils.sms import sms_queue
 
-# In a real application, use Redis or a database to store OTPs
-# For this example, we'll use an in-memory dictionary
-otp_store = {}
+class OTPStore:
+    """
+    Interface for OTP storage backends.
+
+    Every backend keeps at most one OTP per mobile number, expires it after the
+    given TTL and consumes it atomically on a successful verification.
+    """
+
+    def set(self, mobile_number, otp, ttl_seconds):
+        raise NotImplementedError
+
+    def verify(self, mobile_number, otp):
+        """Return True and delete the OTP if it matches and has not expired"""
+        raise NotImplementedError
+
+    def delete(self, mobile_number):
+        raise NotImplementedError
+
+    def after_fork(self):
+        """Drop connections inherited from the parent process"""
+
+class MemoryOTPStore(OTPStore):
+    """
+    Per-process OTP store with heap-ordered expiry and a size cap.
+
+    Expired entries are purged from the heap on every write, so memory stays bounded
+    even when OTPs are never verified. Only suitable for a single worker process.
+    """
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self._entries = {}  # mobile_number -> (otp, expires_at)
+        self._heap = []  # (expires_at, mobile_number), may contain superseded entries
+        self._lock = threading.Lock()
+
+    def set(self, mobile_number, otp, ttl_seconds):
+        now = time.monotonic()
+        expires_at = now + ttl_seconds
+        with self._lock:
+            self._purge(now)
+            if mobile_number not in self._entries:
+                while len(self._entries) >= self.max_entries:
+                    self._evict_one()
+            self._entries[mobile_number] = (otp, expires_at)
+            heapq.heappush(self._heap, (expires_at, mobile_number))
+            # Superseded heap entries are skipped lazily; rebuild when they dominate
+            if len(self._heap) > 2 * len(self._entries) + 64:
+                self._heap = [(expiry, key) for key, (_, expiry) in self._entries.items()]
+                heapq.heapify(self._heap)
+
+    def verify(self, mobile_number, otp):
+        with self._lock:
+            entry = self._entries.get(mobile_number)
+            if not entry or entry[1] <= time.monotonic() or entry[0] != otp:
+                return False
+            del self._entries[mobile_number]
+            return True
+
+    def delete(self, mobile_number):
+        with self._lock:
+            self._entries.pop(mobile_number, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _purge(self, now):
+        while self._heap and self._heap[0][0] <= now:
+            self._pop_heap()
+
+    def _evict_one(self):
+        # The entry closest to expiry is the cheapest one to lose
+        while self._heap:
+            if self._pop_heap():
+                return
+
+    def _pop_heap(self):
+        expires_at, mobile_number = heapq.heappop(self._heap)
+        entry = self._entries.get(mobile_number)
+        if entry and entry[1] == expires_at:
+            del self._entries[mobile_number]
+            return True
+        return False
+
+class RedisOTPStore(OTPStore):
+    """
+    OTP store shared across worker processes through the Redis protocol.
+    Accepts any client exposing the redis-py API, including local fakes.
+    """
+
+    # Compare-and-delete must be atomic so an OTP can only be used once
+    VERIFY_SCRIPT = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self, client, prefix='otp:'):
+        self.client = client
+        self.prefix = prefix
+
+    def set(self, mobile_number, otp, ttl_seconds):
+        self.client.set(f'{self.prefix}{mobile_number}', otp, ex=int(ttl_seconds))
+
+    def verify(self, mobile_number, otp):
+        return bool(self.client.eval(self.VERIFY_SCRIPT, 1, f'{self.prefix}{mobile_number}', otp))
+
+    def delete(self, mobile_number):
+        self.client.delete(f'{self.prefix}{mobile_number}')
+
+class SQLiteOTPStore(OTPStore):
+    """
+    OTP store shared across worker processes on one host through a SQLite file.
+    Expired rows are removed with an indexed delete on every write.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS otps (mobile_number TEXT PRIMARY KEY, otp TEXT NOT NULL, expires_at REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_otps_expires_at ON otps (expires_at)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def set(self, mobile_number, otp, ttl_seconds):
+        now = time.time()
+        conn = self._connect()
+        conn.execute('DELETE FROM otps WHERE expires_at <= ?', (now,))
+        conn.execute('INSERT OR REPLACE INTO otps (mobile_number, otp, expires_at) VALUES (?, ?, ?)',
+                     (mobile_number, otp, now + ttl_seconds))
+
+    def verify(self, mobile_number, otp):
+        cursor = self._connect().execute(
+            'DELETE FROM otps WHERE mobile_number = ? AND otp = ? AND expires_at > ?',
+            (mobile_number, otp, time.time())
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, mobile_number):
+        self._connect().execute('DELETE FROM otps WHERE mobile_number = ?', (mobile_number,))
+
+    def after_fork(self):
+        # SQLite connections must not be used across a fork; reconnect lazily
+        self._local = threading.local()
+
+def create_otp_store(url, max_entries=100000):
+    """Create an OTP store from a URL: memory://, redis://host:port/db or sqlite:///path/to/file"""
+    if url.startswith('memory://'):
+        return MemoryOTPStore(max_entries=max_entries)
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        import redis  # Optional dependency, only needed for the shared Redis backend
+        return RedisOTPStore(redis.Redis.from_url(url))
+    if url.startswith('sqlite:///'):
+        return SQLiteOTPStore(os.path.abspath(url[len('sqlite:///'):]))
+    raise ValueError(f'Unsupported OTP store URL: {url}')
+
+def init_otp_store(app):
+    app.extensions['otp_store'] = create_otp_store(
+        app.config['OTP_STORE_URL'],
+        max_entries=app.config['OTP_STORE_MAX_ENTRIES']
+    )
+
+def get_otp_store():
+    return current_app.extensions['otp_store']
 
 def generate_otp():
     """Generate a 6-digit OTP"""
     return ''.join([str(random.randint(0, 9)) for _ in range(6)])
 
+def otp_key(mobile_number):
+    """Normalize a mobile number from a request body (a JSON string or number) to the store key"""
+    return str(mobile_number).strip()
+
 def send_otp(mobile_number, otp):
     """
-    Send OTP to the user's mobile number
-    In a real application, this would integrate with an SMS gateway
-    """
-    # Mock implementation - in a real app, send SMS
-    print(f"Sending OTP {otp} to {mobile_number}")
-    
-    # Store OTP with expiry time
-    expiry = datetime.now() + timedelta(minutes=current_app.config['OTP_EXPIRY_MINUTES'])
-    otp_store[mobile_number] = {
-        'otp': otp,
-        'expiry': expiry
-    }
-    
-    return True
+    Store the OTP and queue the SMS that delivers it; the gateway is called in the background.
+    Returns False when the SMS queue is full.
+    """
+    mobile_number = otp_key(mobile_number)
+    expiry_minutes = current_app.config['OTP_EXPIRY_MINUTES']
+    get_otp_store().set(mobile_number, otp, expiry_minutes * 60)
+
+    return sms_queue.enqueue(
+        mobile_number,
+        f'{otp} is your Jishu verification code. It expires in {expiry_minutes} minutes.'
+    )
 
 def verify_otp(mobile_number, otp):
-    """Verify if the provided OTP is valid"""
-    if mobile_number not in otp_store:
-        return False
-    
-    stored_data = otp_store[mobile_number]
-    
-    # Check if OTP has expired
-    if datetime.now() > stored_data['expiry']:
-        # Clean up expired OTP
-        del otp_store[mobile_number]
-        return False
-    
-    # Check if OTP matches
-    if stored_data['otp'] != otp:
-        return False
-    
-    # OTP is valid, clean up
-    del otp_store[mobile_number]
-    return True
+    """Verify if the provided OTP is valid, consuming it on success"""
+    return get_otp_store().verify(otp_key(mobile_number), str(otp))
+
+def clear_otp(mobile_number):
+    """Remove any pending OTP for the mobile number"""
+    get_otp_store().delete(otp_key(mobile_number))
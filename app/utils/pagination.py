@@ -0,0 +1,82 @@
+from flask import Response, current_app, json, request, stream_with_context
+
+class PaginationError(ValueError):
+    """Raised when the cursor or limit query parameters are invalid"""
+
+def get_page_args():
+    """
+    Read keyset pagination arguments from the query string.
+    Returns (cursor, limit), or None when the client did not ask for a page.
+    """
+    if 'cursor' not in request.args and 'limit' not in request.args:
+        return None
+
+    try:
+        cursor = int(request.args.get('cursor', 0))
+    except ValueError:
+        raise PaginationError('cursor must be an integer id')
+    try:
+        limit = int(request.args.get('limit', current_app.config['PAGE_SIZE_DEFAULT']))
+    except ValueError:
+        raise PaginationError('limit must be an integer')
+    if cursor < 0:
+        raise PaginationError('cursor must be a non-negative id')
+    if limit < 1:
+        raise PaginationError('limit must be at least 1')
+
+    return cursor, min(limit, current_app.config['PAGE_SIZE_MAX'])
+
+def keyset_page(query, id_column, serialize, cursor, limit):
+    """Fetch one page of rows with id greater than cursor, ordered by id"""
+    rows = query.filter(id_column > cursor).order_by(id_column).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+        'items': serialize(rows),
+        'next_cursor': rows[-1].id if has_more else None,
+        'limit': limit
+    }
+
+def iter_keyset(query, id_column, batch_size):
+    """Yield successive batches of rows ordered by id without loading the whole result"""
+    cursor = None
+    while True:
+        batch = query
+        if cursor is not None:
+            batch = batch.filter(id_column > cursor)
+        batch = batch.order_by(id_column).limit(batch_size).all()
+        if not batch:
+            return
+        yield batch
+        if len(batch) < batch_size:
+            return
+        cursor = batch[-1].id
+
+def stream_json_array(query, id_column, serialize):
+    """
+    Stream a JSON array of serialized rows, encoding one batch at a time.
+    Only a single batch is held in memory, whatever the size of the table.
+    """
+    batch_size = current_app.config['STREAM_BATCH_SIZE']
+
+    def generate():
+        yield '['
+        first = True
+        for batch in iter_keyset(query, id_column, batch_size):
+            # One encoder call per batch; strip the brackets to splice it into the array
+            chunk = json.dumps(serialize(batch))[1:-1]
+            yield chunk if first else ',' + chunk
+            first = False
+        yield ']'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+def paginated_response(query, id_column, serialize):
+    """Return a keyset page when cursor/limit are given, otherwise stream the full list"""
+    page_args = get_page_args()
+    if page_args is None:
+        return stream_json_array(query, id_column, serialize)
+
+    cursor, limit = page_args
+    return json.jsonify(keyset_page(query, id_column, serialize, cursor, limit))
@@ -0,0 +1,172 @@
+import threading
+from array import array
+from collections import OrderedDict
+from app.models.exam import Question
+from app.utils.compression import compress
+from app.utils.serializers import dumps, question_query, serialize_questions
+
+class Paper:
+    """A fully serialized question paper for one version of a subject's question bank"""
+
+    __slots__ = ('subject_id', 'version', 'questions', 'body', 'encodings', 'nbytes',
+                 '_option_ids', '_by_id', '_by_difficulty')
+
+    def __init__(self, subject_id, version, questions):
+        self.subject_id = subject_id
+        self.version = version
+        self.questions = questions
+        # Encoded once so the cache can account for its real size
+        self.body = dumps(questions)
+        self.encodings = {}  # content encoding -> compressed body, added by PaperCache.encoded
+        self.nbytes = len(self.body)
+        self._option_ids = None
+        self._by_id = None
+        self._by_difficulty = None
+
+    def option_ids(self):
+        """Map of question_id to the set of its option ids, built on first use"""
+        if self._option_ids is None:
+            self._option_ids = {
+                question['id']: {option['id'] for option in question['options']}
+                for question in self.questions
+            }
+        return self._option_ids
+
+    def question(self, question_id):
+        """Serialized question by id, or None"""
+        if self._by_id is None:
+            self._by_id = {question['id']: question for question in self.questions}
+        return self._by_id.get(question_id)
+
+    def difficulty_ids(self):
+        """Map of difficulty to a compact array of question ids, built on first use"""
+        if self._by_difficulty is None:
+            by_difficulty = {}
+            for question in self.questions:
+                by_difficulty.setdefault(question['difficulty'], array('l')).append(question['id'])
+            self._by_difficulty = by_difficulty
+        return self._by_difficulty
+
+class PaperCache:
+    """
+    LRU cache of serialized papers keyed by (subject_id, content_version).
+
+    Entries are evicted least recently used first once the total encoded size, including
+    any compressed copies of the body, exceeds max_bytes. Bumping a subject's content_version makes its cached paper unreachable;
+    the stale entry is dropped as soon as the new version is cached in this process.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        # Compressed once and served many times, so worth a higher level than per-request compression
+        self.levels = {'gzip': 9, 'br': 9}
+        self._entries = OrderedDict()
+        self._versions = {}  # subject_id -> cached content_version
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def init_app(self, app):
+        self.max_bytes = app.config.get('PAPER_CACHE_MAX_BYTES', self.max_bytes)
+        self.levels = {'gzip': app.config.get('PAPER_CACHE_GZIP_LEVEL', self.levels['gzip']),
+                       'br': app.config.get('PAPER_CACHE_BROTLI_QUALITY', self.levels['br'])}
+        app.extensions['paper_cache'] = self
+
+    def get(self, subject_id, version):
+        with self._lock:
+            paper = self._entries.get((subject_id, version))
+            if paper is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((subject_id, version))
+            self.hits += 1
+            return paper
+
+    def put(self, paper):
+        with self._lock:
+            cached_version = self._versions.get(paper.subject_id)
+            if cached_version is not None and cached_version > paper.version:
+                return paper
+            self._discard(paper.subject_id)
+            if paper.nbytes > self.max_bytes:
+                return paper
+
+            self._entries[(paper.subject_id, paper.version)] = paper
+            self._versions[paper.subject_id] = paper.version
+            self.current_bytes += paper.nbytes
+            self._evict()
+            return paper
+
+    def get_or_load(self, subject_id, version, loader):
+        """Return the cached paper, building it from loader() on a miss"""
+        paper = self.get(subject_id, version)
+        if paper is None:
+            paper = self.put(Paper(subject_id, version, loader()))
+        return paper
+
+    def encoded(self, paper, encoding):
+        """Return the paper body compressed with encoding, compressing it once per paper"""
+        data = paper.encodings.get(encoding)
+        if data is not None:
+            return data
+
+        data = compress(paper.body, encoding, self.levels[encoding])
+        with self._lock:
+            if encoding in paper.encodings:
+                return paper.encodings[encoding]
+            paper.encodings[encoding] = data
+            paper.nbytes += len(data)
+            if self._entries.get((paper.subject_id, paper.version)) is paper:
+                self.current_bytes += len(data)
+                self._evict()
+        return data
+
+    def invalidate(self, *subject_ids):
+        with self._lock:
+            for subject_id in subject_ids:
+                self._discard(subject_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None
+            }
+
+    def _evict(self):
+        while self.current_bytes > self.max_bytes:
+            (subject_id, _), evicted = self._entries.popitem(last=False)
+            self._versions.pop(subject_id, None)
+            self.current_bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def _discard(self, subject_id):
+        version = self._versions.pop(subject_id, None)
+        if version is not None:
+            paper = self._entries.pop((subject_id, version), None)
+            if paper is not None:
+                self.current_bytes -= paper.nbytes
+
+paper_cache = PaperCache()
+
+def get_paper(subject):
+    """Return the cached paper for a subject, loading every question and option on a miss"""
+    def load():
+        rows = question_query().filter(Question.subject_id == subject.id).order_by(Question.id).all()
+        return serialize_questions(rows)
+
+    return paper_cache.get_or_load(subject.id, subject.content_version, load)
@@ -0,0 +1,170 @@
+import random
+from bisect import bisect_right
+from flask import current_app
+from app import db
+from app.models.exam import Subject
+from app.models.user_progress import ExamAttempt
+from app.utils.paper_cache import get_paper
+
+def parse_difficulty_mix(value):
+    """Parse 'easy:0.3,medium:0.5,hard:0.2' into {difficulty: share}, normalized to sum to 1"""
+    if isinstance(value, dict):
+        mix = {difficulty: float(share) for difficulty, share in value.items()}
+    else:
+        mix = {}
+        for part in (value or '').split(','):
+            if part.strip():
+                difficulty, share = part.split(':')
+                mix[difficulty.strip()] = float(share)
+
+    total = sum(share for share in mix.values() if share > 0)
+    if not total:
+        raise ValueError('Difficulty mix needs at least one positive share')
+    return {difficulty: share / total for difficulty, share in mix.items() if share > 0}
+
+def allocate(count, mix):
+    """Split count across difficulties by share, handing the rounding remainder to the largest fractions"""
+    exact = {difficulty: count * share for difficulty, share in mix.items()}
+    targets = {difficulty: int(value) for difficulty, value in exact.items()}
+    remainder = count - sum(targets.values())
+    for difficulty in sorted(exact, key=lambda d: exact[d] - targets[d], reverse=True)[:remainder]:
+        targets[difficulty] += 1
+    return targets
+
+def source_subjects(subject):
+    """Subjects whose question banks feed a paper: the subject itself, or a full mock's sectional siblings"""
+    if not subject.is_full_mock:
+        return [subject]
+    return Subject.query.filter(
+        Subject.category_id == subject.category_id,
+        Subject.is_full_mock.is_(False)
+    ).order_by(Subject.id).all()
+
+def sample_ids(pools, count, avoid, chosen, rng):
+    """
+    Draw up to count ids from a list of id arrays without touching the rest of the pool.
+
+    Random positions are drawn over the concatenated arrays, so large pools cost O(count).
+    Ids in avoid (seen in earlier attempts) are only used once fresh ones run out, and ids
+    already in chosen are never drawn twice.
+    """
+    sizes = [len(pool) for pool in pools]
+    total = sum(sizes)
+    if count <= 0 or not total:
+        return []
+
+    if total <= 4 * count + len(chosen):
+        # Small pool: shuffling it is as cheap as rejection sampling and exact
+        ids = [question_id for pool in pools for question_id in pool if question_id not in chosen]
+        rng.shuffle(ids)
+        picked = ([question_id for question_id in ids if question_id not in avoid] +
+                  [question_id for question_id in ids if question_id in avoid])[:count]
+        chosen.update(picked)
+        return picked
+
+    offsets = []
+    running = 0
+    for size in sizes:
+        running += size
+        offsets.append(running)
+
+    def draw():
+        position = rng.randrange(total)
+        index = bisect_right(offsets, position)
+        return pools[index][position - (offsets[index - 1] if index else 0)]
+
+    picked = []
+    for _ in range(8 * count):
+        if len(picked) == count:
+            break
+        question_id = draw()
+        if question_id not in chosen and question_id not in avoid:
+            chosen.add(question_id)
+            picked.append(question_id)
+
+    # Mostly seen pool: allow repeats; at least three quarters of the pool is still unchosen
+    while len(picked) < count:
+        question_id = draw()
+        if question_id not in chosen:
+            chosen.add(question_id)
+            picked.append(question_id)
+    return picked
+
+def generate_paper(subject, count=None, mix=None, avoid=(), rng=random):
+    """
+    Sample a paper of count questions for a subject following a difficulty mix.
+
+    Works from the per-difficulty id arrays of the cached papers, so sampling never scans
+    the question table. Difficulties that run short are topped up from the others.
+    Returns the serialized questions in random order.
+    """
+    config = current_app.config
+    if count is None:
+        count = config['FULL_MOCK_QUESTION_COUNT'] if subject.is_full_mock else config['PAPER_QUESTION_COUNT']
+    mix = parse_difficulty_mix(mix or config['PAPER_DIFFICULTY_MIX'])
+    avoid = set(avoid)
+
+    papers = [get_paper(source) for source in source_subjects(subject)]
+    pools = {}
+    for paper in papers:
+        for difficulty, ids in paper.difficulty_ids().items():
+            pools.setdefault(difficulty, []).append(ids)
+
+    chosen = set()
+    picked = []
+    for difficulty, target in allocate(count, mix).items():
+        picked.extend(sample_ids(pools.get(difficulty, []), target, avoid, chosen, rng))
+    if len(picked) < count:
+        picked.extend(sample_ids([ids for group in pools.values() for ids in group],
+                                 count - len(picked), avoid, chosen, rng))
+
+    rng.shuffle(picked)
+    return [find_question(papers, question_id) for question_id in picked]
+
+def seen_question_ids(user_exam_id):
+    """Question ids served in earlier attempts of a purchase"""
+    seen = set()
+    for question_ids, in db.session.query(ExamAttempt.question_ids).filter(
+        ExamAttempt.user_exam_id == user_exam_id,
+        ExamAttempt.question_ids.isnot(None)
+    ):
+        seen.update(int(question_id) for question_id in question_ids.split(','))
+    return seen
+
+def find_option_ids(papers, question_id):
+    """Option ids of a question in one of the source papers, or None if it is in none of them"""
+    for paper in papers:
+        option_ids = paper.option_ids().get(question_id)
+        if option_ids is not None:
+            return option_ids
+    return None
+
+def find_question(papers, question_id):
+    """Serialized question from one of the source papers, or None if it has since been removed"""
+    for paper in papers:
+        question = paper.question(question_id)
+        if question is not None:
+            return question
+    return None
+
+def review_paper(attempt, subject, answers):
+    """
+    Pair every question of an attempt's paper with the saved answer, in paper order.
+    Question content comes from the cached papers, so a review costs no query per question.
+    """
+    papers = [get_paper(source) for source in source_subjects(subject)]
+    by_question = {answer.question_id: answer for answer in answers}
+    question_ids = attempt.paper_question_ids() or sorted(by_question)
+
+    review = []
+    for question_id in question_ids:
+        answer = by_question.get(question_id)
+        review.append({
+            'question_id': question_id,
+            'question': find_question(papers, question_id),
+            'option_id': answer.option_id if answer else None,
+            'correct': answer.correct if answer else None,
+            'time_spent': answer.time_spent if answer else None
+        })
+    return review
+
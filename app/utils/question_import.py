@@ -0,0 +1,216 @@
+import csv
+import json
+from datetime import datetime
+from flask import current_app
+from sqlalchemy.exc import SQLAlchemyError
+from app import db
+from app.models.exam import Subject, Question, Option
+from app.models.id_sequence import IdSequence
+from app.utils.paper_cache import paper_cache
+
+MAX_REPORTED_ERRORS = 1000
+
+class ImportFormatError(ValueError):
+    """Raised when an upload is not in a supported format"""
+
+def detect_format(filename=None, content_type=None, fmt=None):
+    """Pick 'jsonl' or 'csv' from an explicit format, the file extension or the content type"""
+    if fmt:
+        fmt = fmt.lower()
+    elif filename and filename.lower().endswith(('.jsonl', '.ndjson', '.json')):
+        fmt = 'jsonl'
+    elif filename and filename.lower().endswith('.csv'):
+        fmt = 'csv'
+    elif content_type and ('ndjson' in content_type or 'jsonl' in content_type):
+        fmt = 'jsonl'
+    elif content_type and 'csv' in content_type:
+        fmt = 'csv'
+
+    if fmt not in ('jsonl', 'csv'):
+        raise ImportFormatError('Unsupported import format, use JSONL or CSV')
+    return fmt
+
+def iter_jsonl(lines):
+    """Yield (row_number, record or error) for each non-blank JSON line"""
+    for row_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield row_number, f'Invalid JSON: {e}'
+            continue
+        if not isinstance(record, dict):
+            yield row_number, 'Each line must be a JSON object'
+            continue
+        yield row_number, record
+
+def iter_csv(lines):
+    """
+    Yield (row_number, record or error) for each CSV row.
+    Columns: text, subject_id, difficulty, marks, negative_marks, option_1..option_N and
+    correct, a comma-separated list of the 1-based numbers of the correct options.
+    """
+    # Records, not physical lines: a quoted text may span several lines. The header is row 0.
+    for row_number, row in enumerate(csv.DictReader(lines), start=1):
+        option_columns = sorted(
+            (column for column in row if column and column.startswith('option_')),
+            key=lambda column: int(column[len('option_'):]) if column[len('option_'):].isdigit() else 0
+        )
+        try:
+            correct = {int(n) for n in (row.get('correct') or '').replace(' ', '').split(',') if n}
+        except ValueError:
+            yield row_number, 'correct must list option numbers, e.g. "1" or "1,3"'
+            continue
+
+        options = []
+        for number, column in enumerate(option_columns, start=1):
+            if row[column]:
+                options.append({'text': row[column], 'is_correct': number in correct})
+
+        record = {'text': row.get('text'), 'subject_id': row.get('subject_id'), 'options': options}
+        for field in ('difficulty', 'marks', 'negative_marks'):
+            if row.get(field):
+                record[field] = row[field]
+        yield row_number, record
+
+def validate_record(record):
+    """Return (question_values, options) for a record, or raise ValueError with the reason"""
+    for field in ('text', 'subject_id', 'options'):
+        if not record.get(field):
+            raise ValueError(f'{field} is required')
+
+    options = record['options']
+    if not isinstance(options, list) or len(options) < 2:
+        raise ValueError('At least 2 options are required')
+    if any(not isinstance(option, dict) or not option.get('text') for option in options):
+        raise ValueError('Every option needs text')
+    if not any(option.get('is_correct', False) for option in options):
+        raise ValueError('At least one option must be correct')
+
+    try:
+        question = {
+            'text': record['text'],
+            'subject_id': int(record['subject_id']),
+            'difficulty': record.get('difficulty') or 'medium',
+            'marks': int(record.get('marks', 4)),
+            'negative_marks': int(record.get('negative_marks', 1))
+        }
+    except (TypeError, ValueError):
+        raise ValueError('subject_id, marks and negative_marks must be integers')
+
+    return question, [(option['text'], bool(option.get('is_correct', False))) for option in options]
+
+class QuestionImporter:
+    """
+    Validate and insert parsed question records in chunks.
+
+    Each chunk reserves a contiguous block of question ids from the id_sequences counter,
+    then inserts its questions and options with one executemany each and commits. A chunk
+    the database rejects is rolled back and its rows reported as failed; earlier chunks
+    stay imported.
+    """
+
+    def __init__(self, chunk_size=500):
+        self.chunk_size = chunk_size
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+        self._known_subjects = set()
+
+    def run(self, records):
+        chunk = []
+        for row_number, record in records:
+            if isinstance(record, str):
+                self._fail(row_number, record)
+                continue
+            try:
+                chunk.append((row_number,) + validate_record(record))
+            except ValueError as e:
+                self._fail(row_number, str(e))
+                continue
+            if len(chunk) >= self.chunk_size:
+                self._insert_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._insert_chunk(chunk)
+
+        return self.report()
+
+    def report(self):
+        return {
+            'imported': self.imported,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors)
+        }
+
+    def _fail(self, row_number, error):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row_number, 'error': error})
+
+    def _insert_chunk(self, chunk):
+        # Resolve unseen subject ids for the whole chunk in one query
+        subject_ids = {question['subject_id'] for _, question, _ in chunk}
+        unknown = subject_ids - self._known_subjects
+        if unknown:
+            found = db.session.query(Subject.id).filter(Subject.id.in_(unknown))
+            self._known_subjects.update(subject_id for subject_id, in found)
+
+        valid = []
+        for row_number, question, options in chunk:
+            if question['subject_id'] in self._known_subjects:
+                valid.append((row_number, question, options))
+            else:
+                self._fail(row_number, 'Subject not found')
+        if not valid:
+            return
+
+        subject_ids = {question['subject_id'] for _, question, _ in valid}
+        try:
+            # Reserve a contiguous id block; the counter row stays locked until commit
+            first_id = IdSequence.reserve(Question.__table__, len(valid))
+
+            now = datetime.utcnow()
+            question_rows = []
+            option_rows = []
+            for offset, (_, question, options) in enumerate(valid):
+                question_id = first_id + offset
+                question_rows.append(dict(question, id=question_id, created_at=now))
+                option_rows.extend(
+                    {'text': text, 'question_id': question_id, 'is_correct': is_correct, 'created_at': now}
+                    for text, is_correct in options
+                )
+
+            db.session.execute(Question.__table__.insert(), question_rows)
+            db.session.execute(Option.__table__.insert(), option_rows)
+            Subject.bump_content_version(*subject_ids)
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.exception('Importing a chunk of %d questions failed', len(valid))
+            error = f'Database error, chunk not imported: {getattr(e, "orig", None) or e}'
+            for row_number, _, _ in valid:
+                self._fail(row_number, error)
+            return
+
+        paper_cache.invalidate(*subject_ids)
+        self.imported += len(valid)
+
+def iter_lines(stream):
+    """Decode a binary stream line by line without reading it into memory"""
+    first = True
+    for line in stream:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if first:
+            line = line.lstrip('\ufeff')
+            first = False
+        yield line
+
+def import_questions(stream, fmt, chunk_size=500):
+    """Import questions from a binary stream of JSONL or CSV and return a per-row error report"""
+    lines = iter_lines(stream)
+    records = iter_jsonl(lines) if fmt == 'jsonl' else iter_csv(lines)
+    return QuestionImporter(chunk_size=chunk_size).run(records)
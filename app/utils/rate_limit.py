@@ -0,0 +1,235 @@
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from functools import lru_cache, wraps
+from flask import current_app, jsonify, request
+
+class RateLimitStore:
+    """
+    Interface for token bucket backends.
+
+    A bucket holds up to capacity tokens and refills at rate tokens per second. consume()
+    takes cost tokens if the bucket has them and returns 0, otherwise it takes nothing and
+    returns the seconds until enough tokens are back.
+    """
+
+    def consume(self, key, capacity, rate, cost=1):
+        raise NotImplementedError
+
+    def after_fork(self):
+        """Drop connections inherited from the parent process"""
+
+class MemoryRateLimitStore(RateLimitStore):
+    """
+    Per-process token buckets split over independently locked shards, so concurrent
+    requests for different keys rarely contend. Buckets that have refilled are dropped
+    when a shard is full, then the oldest ones. Only suitable for a single worker process.
+    """
+
+    def __init__(self, shards=64, max_keys=100000):
+        self._shards = [({}, threading.Lock()) for _ in range(shards)]
+        self._max_keys_per_shard = max(1, max_keys // shards)
+
+    def consume(self, key, capacity, rate, cost=1):
+        now = time.monotonic()
+        # crc32 rather than hash() so the shard does not depend on PYTHONHASHSEED
+        buckets, lock = self._shards[zlib.crc32(key.encode('utf-8')) % len(self._shards)]
+        with lock:
+            bucket = buckets.get(key)
+            if bucket is None:
+                if len(buckets) >= self._max_keys_per_shard:
+                    self._prune(buckets, now)
+                tokens = capacity
+            else:
+                tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+
+            retry_after = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                retry_after = (cost - tokens) / rate
+            buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+            return retry_after
+
+    def __len__(self):
+        return sum(len(buckets) for buckets, _ in self._shards)
+
+    def _prune(self, buckets, now):
+        for key in [key for key, bucket in buckets.items() if bucket[2] <= now]:
+            del buckets[key]
+        # Still full: forget the buckets created first
+        while len(buckets) >= self._max_keys_per_shard:
+            del buckets[next(iter(buckets))]
+
+class RedisRateLimitStore(RateLimitStore):
+    """
+    Token buckets shared across worker processes through the Redis protocol. Each bucket
+    is a hash updated by one script call, so concurrent requests cannot both take the
+    last token, and it expires once it would have refilled. Clock time comes from the
+    caller, so workers' clocks should be kept in sync.
+    """
+
+    CONSUME_SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local cost = tonumber(ARGV[4])
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+    local tokens = capacity
+    if bucket[1] then
+        tokens = math.min(capacity, tonumber(bucket[1]) + math.max(0, now - tonumber(bucket[2])) * rate)
+    end
+    local retry_after = 0
+    if tokens >= cost then
+        tokens = tokens - cost
+    else
+        retry_after = (cost - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+    redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+    return tostring(retry_after)
+    """
+
+    def __init__(self, client, prefix='ratelimit:'):
+        self.client = client
+        self.prefix = prefix
+        self._consume = client.register_script(self.CONSUME_SCRIPT)
+
+    def consume(self, key, capacity, rate, cost=1):
+        return float(self._consume(keys=[self.prefix + key], args=[capacity, rate, time.time(), cost]))
+
+class SQLiteRateLimitStore(RateLimitStore):
+    """
+    Token buckets shared across worker processes on one host through a SQLite file.
+    Each consume is one immediate transaction; buckets that have refilled are deleted
+    on roughly one write in cleanup_every.
+    """
+
+    def __init__(self, path, cleanup_every=100):
+        self.path = path
+        self.cleanup_every = cleanup_every
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute('CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, tokens REAL NOT NULL, '
+                     'updated_at REAL NOT NULL, full_at REAL NOT NULL)')
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_rate_limits_full_at ON rate_limits (full_at)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def consume(self, key, capacity, rate, cost=1):
+        now = time.time()
+        conn = self._connect()
+        # Take the write lock up front so two workers cannot read the same token count
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated_at FROM rate_limits WHERE key = ?', (key,)).fetchone()
+            tokens = capacity if row is None else min(capacity, row[0] + max(0.0, now - row[1]) * rate)
+            retry_after = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                retry_after = (cost - tokens) / rate
+            conn.execute('INSERT OR REPLACE INTO rate_limits (key, tokens, updated_at, full_at) VALUES (?, ?, ?, ?)',
+                         (key, tokens, now, now + (capacity - tokens) / rate))
+            if random.randrange(self.cleanup_every) == 0:
+                conn.execute('DELETE FROM rate_limits WHERE full_at <= ?', (now,))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return retry_after
+
+    def after_fork(self):
+        # SQLite connections must not be used across a fork; reconnect lazily
+        self._local = threading.local()
+
+def create_rate_limit_store(url, max_keys=100000):
+    """Create a rate limit store from a URL: memory://, redis://host:port/db or sqlite:///path/to/file"""
+    if url.startswith('memory://'):
+        return MemoryRateLimitStore(max_keys=max_keys)
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        import redis  # Optional dependency, only needed for the shared Redis backend
+        return RedisRateLimitStore(redis.Redis.from_url(url))
+    if url.startswith('sqlite:///'):
+        return SQLiteRateLimitStore(os.path.abspath(url[len('sqlite:///'):]))
+    raise ValueError(f'Unsupported rate limit store URL: {url}')
+
+def init_rate_limiter(app):
+    app.extensions['rate_limit_store'] = create_rate_limit_store(
+        app.config['RATE_LIMIT_STORE_URL'],
+        max_keys=app.config['RATE_LIMIT_MAX_KEYS']
+    )
+
+def get_rate_limit_store():
+    return current_app.extensions['rate_limit_store']
+
+@lru_cache(maxsize=None)
+def parse_rate(value):
+    """Parse 'N/seconds' into (capacity, tokens per second): a burst of N, refilled over the period"""
+    try:
+        count, seconds = value.split('/')
+        capacity, rate = int(count), int(count) / float(seconds)
+    except (AttributeError, ValueError, ZeroDivisionError):
+        raise ValueError(f"Invalid rate '{value}', expected requests/seconds such as '5/300'")
+    if capacity < 1 or rate <= 0:
+        raise ValueError(f"Invalid rate '{value}', expected requests/seconds such as '5/300'")
+    return capacity, rate
+
+def client_ip():
+    return request.remote_addr
+
+def json_field(name):
+    """Key function reading a field of the JSON body; requests without it are not limited by that key"""
+    def key():
+        data = request.get_json(silent=True)
+        value = data.get(name) if isinstance(data, dict) else None
+        return str(value).strip() if value not in (None, '') else None
+    return key
+
+def rate_limit(*limits):
+    """
+    Enforce token bucket limits before the view runs.
+
+    Each limit is (name, config_key, key_func): config_key holds an 'N/seconds' rate and
+    key_func returns the value to limit by, or None to skip. The first exhausted bucket
+    answers 429 with Retry-After. If the store fails, the request is let through.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            config = current_app.config
+            if not config.get('RATE_LIMIT_ENABLED', True):
+                return fn(*args, **kwargs)
+
+            store = get_rate_limit_store()
+            for name, config_key, key_func in limits:
+                key = key_func()
+                if key is None:
+                    continue
+                capacity, rate = parse_rate(config[config_key])
+                try:
+                    retry_after = store.consume(f'{name}:{key}', capacity, rate)
+                except Exception:
+                    current_app.logger.exception('Rate limit store failed; allowing the request')
+                    break
+                if retry_after > 0:
+                    response = jsonify({'error': 'Too many requests, please try again later',
+                                        'retry_after': math.ceil(retry_after)})
+                    response.status_code = 429
+                    response.headers['Retry-After'] = str(math.ceil(retry_after))
+                    return response
+            return fn(*args, **kwargs)
+
+        return wrapper
+    return decorator
@@ -0,0 +1,243 @@
+import hmac
+import random
+import threading
+import time
+from collections import Counter
+from flask import Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+# Component stats that only ever increase; the rest (sizes, depths, in-flight) are gauges
+COUNTER_STATS = {'hits', 'misses', 'evictions', 'flushes', 'flushed_rows', 'dropped_rows', 'failures',
+                 'enqueued', 'delivered', 'retried', 'failed', 'dropped', 'batches'}
+
+class Histogram:
+    """Cumulative Prometheus histogram keyed by label values"""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted(self._series.items())
+        for labels, values in series:
+            base = format_labels(self.label_names, labels)
+            for bound, count in zip(self.buckets, values):
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {values[-1]}')
+            lines.append(f'{self.name}_sum{{{base}}} {values[-2]}')
+            lines.append(f'{self.name}_count{{{base}}} {values[-1]}')
+        return lines
+
+class CounterMetric:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = Counter()
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] += amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f'{self.name}{{{format_labels(self.label_names, labels)}}} {value}')
+        return lines
+
+def format_labels(names, values):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+
+class SQLStats:
+    """SQL statements executed while serving one sampled request"""
+
+    __slots__ = ('count', 'seconds', 'slowest_seconds', 'slowest_statement', 'statements')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement = None
+        self.statements = Counter()
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement] += 1
+        if seconds > self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+
+    def most_repeated(self):
+        return self.statements.most_common(1)[0] if self.statements else (None, 0)
+
+def _current_stats():
+    return g.get('sql_stats') if has_request_context() else None
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats() is not None:
+        conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats()
+    if stats is not None and conn.info.get('query_start_time'):
+        stats.record(statement, time.perf_counter() - conn.info['query_start_time'].pop())
+
+class RequestMetrics:
+    """
+    Per-request latency histograms for every request, plus SQL query count, DB time,
+    slowest statement and repeated-statement (N+1) detection for a sampled fraction.
+
+    Requests over REQUEST_TIME_BUDGET_MS or REQUEST_QUERY_BUDGET are logged, and all
+    metrics are served from /metrics in Prometheus text format. Metrics are per worker
+    process; Prometheus should scrape every worker or aggregate them.
+    """
+
+    _listening = False
+
+    def __init__(self):
+        self.request_duration = Histogram(
+            'http_request_duration_seconds', 'Request latency by endpoint',
+            ('method', 'endpoint'), DURATION_BUCKETS)
+        self.requests = CounterMetric(
+            'http_requests_total', 'Requests by endpoint and status', ('method', 'endpoint', 'status'))
+        self.db_queries = Histogram(
+            'db_queries_per_request', 'SQL statements per sampled request',
+            ('method', 'endpoint'), QUERY_COUNT_BUCKETS)
+        self.db_duration = Histogram(
+            'db_duration_seconds_per_request', 'Time spent in SQL per sampled request',
+            ('method', 'endpoint'), DURATION_BUCKETS)
+        self.over_budget = CounterMetric(
+            'http_requests_over_budget_total', 'Requests that exceeded a time or query budget',
+            ('method', 'endpoint', 'budget'))
+        self.repeated_statements = CounterMetric(
+            'db_repeated_statement_requests_total', 'Sampled requests that repeated one statement (likely N+1)',
+            ('method', 'endpoint'))
+
+    def init_app(self, app):
+        app.extensions['request_metrics'] = self
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+
+        if not RequestMetrics._listening:
+            # Class-level listeners cover the primary and replica engines, which are created lazily
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            RequestMetrics._listening = True
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        if app.config.get('METRICS_TOKEN') or app.config.get('METRICS_PUBLIC'):
+            app.add_url_rule('/metrics', 'metrics', self._metrics_view)
+        else:
+            app.logger.warning('/metrics is not served: set METRICS_TOKEN, or METRICS_PUBLIC=true to serve it openly')
+
+    def _before_request(self):
+        g.request_started = time.perf_counter()
+        # Reset explicitly: g outlives the request when the caller pushed the app context
+        sampled = random.random() < current_app.config.get('METRICS_SQL_SAMPLE_RATE', 0.1)
+        g.sql_stats = SQLStats() if sampled else None
+
+    def _after_request(self, response):
+        started = g.get('request_started')
+        if started is None or request.endpoint == 'metrics':
+            return response
+
+        rule = request.url_rule.rule if request.url_rule else 'unmatched'
+        labels = (request.method, rule)
+        status = response.status_code
+        stats = g.get('sql_stats')
+        config = current_app.config
+        logger = current_app.logger
+
+        # Streamed bodies keep querying after this hook, so finish once the response is closed
+        def finish():
+            elapsed = time.perf_counter() - started
+            self.request_duration.observe(labels, elapsed)
+            self.requests.inc(labels + (status,))
+
+            problems = []
+            if elapsed * 1000 > config.get('REQUEST_TIME_BUDGET_MS', 500):
+                self.over_budget.inc(labels + ('time',))
+                problems.append(f'took {elapsed * 1000:.1f} ms')
+
+            if stats is not None:
+                self.db_queries.observe(labels, stats.count)
+                self.db_duration.observe(labels, stats.seconds)
+                if stats.count > config.get('REQUEST_QUERY_BUDGET', 20):
+                    self.over_budget.inc(labels + ('queries',))
+                    problems.append(f'ran {stats.count} queries')
+                statement, repeats = stats.most_repeated()
+                if repeats >= config.get('REPEATED_STATEMENT_THRESHOLD', 5):
+                    self.repeated_statements.inc(labels)
+                    problems.append(f'repeated a statement {repeats} times (possible N+1): {statement[:200]}')
+
+            if problems:
+                message = f'{request_line}: ' + ', '.join(problems)
+                if stats is not None:
+                    message += (f'; {stats.count} queries, {stats.seconds * 1000:.1f} ms in DB, slowest '
+                                f'{stats.slowest_seconds * 1000:.1f} ms: {(stats.slowest_statement or "")[:200]}')
+                logger.warning(message)
+
+        request_line = f'{request.method} {request.path}'
+        if response.is_streamed:
+            response.call_on_close(finish)
+        else:
+            finish()
+        return response
+
+    def _metrics_view(self):
+        token = current_app.config.get('METRICS_TOKEN')
+        if token and not hmac.compare_digest(request.headers.get('Authorization', '').encode(),
+                                             f'Bearer {token}'.encode()):
+            return Response('Unauthorized\n', status=401, mimetype='text/plain')
+
+        lines = []
+        for metric in (self.request_duration, self.requests, self.db_queries, self.db_duration,
+                       self.over_budget, self.repeated_statements):
+            lines.extend(metric.render())
+
+        from app.utils.paper_cache import paper_cache
+        from app.utils.answer_buffer import answer_buffer
+        from app.utils.sms import sms_queue
+        lines.extend(sms_queue.delivery_latency.render())
+        for prefix, stats in (('paper_cache', paper_cache.stats()), ('answer_buffer', answer_buffer.stats()),
+                              ('sms_queue', sms_queue.stats())):
+            for key, value in stats.items():
+                if value is None:
+                    continue
+                if key in COUNTER_STATS:
+                    lines.append(f'# TYPE {prefix}_{key}_total counter')
+                    lines.append(f'{prefix}_{key}_total {value}')
+                else:
+                    lines.append(f'# TYPE {prefix}_{key} gauge')
+                    lines.append(f'{prefix}_{key} {value}')
+
+        return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+request_metrics = RequestMetrics()
@@ -0,0 +1,185 @@
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from flask import current_app
+from app import db
+from app.models.score_histogram import ScoreHistogram
+from app.models.user_progress import UserExam, ExamAttempt
+from app.utils.pagination import iter_keyset
+
+class Distribution:
+    """Score distribution of one subject with prefix sums for O(log n) rank lookups"""
+
+    __slots__ = ('subject_id', 'scores', 'cumulative', 'total', 'loaded_at')
+
+    def __init__(self, subject_id, rows):
+        self.subject_id = subject_id
+        self.scores = [score for score, _ in rows]
+        self.cumulative = []  # cumulative[i] = attempts scoring <= scores[i]
+        running = 0
+        for _, count in rows:
+            running += count
+            self.cumulative.append(running)
+        self.total = running
+        self.loaded_at = time.monotonic()
+
+    def count_below(self, score):
+        index = bisect_left(self.scores, score)
+        return self.cumulative[index - 1] if index else 0
+
+    def count_at_or_below(self, score):
+        index = bisect_right(self.scores, score)
+        return self.cumulative[index - 1] if index else 0
+
+    def percentile(self, score):
+        """Percentile rank of a score: share of attempts below it, counting ties as half"""
+        if not self.total:
+            return None
+        below = self.count_below(score)
+        equal = self.count_at_or_below(score) - below
+        return round((below + equal / 2) / self.total * 100, 2)
+
+    def rank(self, score):
+        """1-based rank of a score; ties share the best rank"""
+        return self.total - self.count_at_or_below(score) + 1
+
+    def quantile(self, q):
+        """Lowest score with at least q of the attempts at or below it"""
+        if not self.total:
+            return None
+        index = bisect_left(self.cumulative, max(1, q * self.total))
+        return self.scores[min(index, len(self.scores) - 1)]
+
+    def threshold_for_top(self, n):
+        """Score of the n-th best attempt, so that attempts scoring at least it include the top n"""
+        if not self.total:
+            return None
+        if n >= self.total:
+            return self.scores[0]
+        return self.scores[bisect_right(self.cumulative, self.total - n)]
+
+    def summary(self):
+        return {
+            'subject_id': self.subject_id,
+            'total_attempts': self.total,
+            'min_score': self.scores[0] if self.scores else None,
+            'max_score': self.scores[-1] if self.scores else None,
+            'percentiles': {
+                f'p{int(q * 100)}': self.quantile(q) for q in (0.25, 0.5, 0.75, 0.9, 0.99)
+            }
+        }
+
+    def histogram(self):
+        previous = 0
+        buckets = []
+        for score, cumulative in zip(self.scores, self.cumulative):
+            buckets.append({'score': score, 'count': cumulative - previous})
+            previous = cumulative
+        return buckets
+
+class ScoreDistributions:
+    """
+    Per-process cache of subject score distributions.
+
+    A distribution is read from score_histograms (one row per distinct score) at most
+    once every SCORE_DISTRIBUTION_TTL_SECONDS, so percentile and rank lookups are a
+    binary search over cached prefix sums. Submits count their score in the histogram
+    in their transaction and expire the local copy after committing.
+    """
+
+    def __init__(self):
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def get(self, subject_id):
+        ttl = current_app.config['SCORE_DISTRIBUTION_TTL_SECONDS']
+        with self._lock:
+            distribution = self._cache.get(subject_id)
+        if distribution is not None and time.monotonic() - distribution.loaded_at < ttl:
+            return distribution
+
+        distribution = Distribution(subject_id, ScoreHistogram.distribution(subject_id))
+        with self._lock:
+            self._cache[subject_id] = distribution
+        return distribution
+
+    def record(self, subject_id, score):
+        """Count a completed attempt's score in the current transaction"""
+        ScoreHistogram.record(subject_id, score)
+
+    def expire(self, *subject_ids):
+        with self._lock:
+            if not subject_ids:
+                self._cache.clear()
+            for subject_id in subject_ids:
+                self._cache.pop(subject_id, None)
+
+    def standing(self, subject_id, score):
+        """Percentile, rank and number of attempts for a score within its subject"""
+        distribution = self.get(subject_id)
+        return {
+            'percentile': distribution.percentile(score),
+            'rank': distribution.rank(score) if distribution.total else None,
+            'total_attempts': distribution.total
+        }
+
+score_distributions = ScoreDistributions()
+
+def histogram_drift(subject_ids=None):
+    """
+    Compare each subject's histogram total with its number of completed attempts.
+    Returns {subject_id: (histogram total, completed attempts)} for the subjects where they differ.
+    """
+    attempts = db.session.query(UserExam.subject_id, db.func.count(ExamAttempt.id)).join(
+        UserExam, UserExam.id == ExamAttempt.user_exam_id
+    ).filter(ExamAttempt.completed_at.isnot(None)).group_by(UserExam.subject_id)
+    histograms = db.session.query(ScoreHistogram.subject_id, db.func.sum(ScoreHistogram.count)).group_by(
+        ScoreHistogram.subject_id)
+    if subject_ids:
+        attempts = attempts.filter(UserExam.subject_id.in_(subject_ids))
+        histograms = histograms.filter(ScoreHistogram.subject_id.in_(subject_ids))
+
+    completed = dict(attempts.all())
+    counted = {subject_id: int(total or 0) for subject_id, total in histograms}
+    return {
+        subject_id: (counted.get(subject_id, 0), completed.get(subject_id, 0))
+        for subject_id in set(completed) | set(counted)
+        if counted.get(subject_id, 0) != completed.get(subject_id, 0)
+    }
+
+def rebuild_histograms(subject_ids=None, chunk_size=5000):
+    """
+    Recompute score_histograms from completed exam_attempts, reading attempts in keyset chunks.
+    Replaces the histogram rows of the given subjects (all subjects by default) in one transaction.
+    """
+    attempts = db.session.query(ExamAttempt.id, ExamAttempt.score, UserExam.subject_id).join(
+        UserExam, UserExam.id == ExamAttempt.user_exam_id
+    ).filter(ExamAttempt.completed_at.isnot(None))
+    if subject_ids:
+        attempts = attempts.filter(UserExam.subject_id.in_(subject_ids))
+
+    counts = Counter()
+    scanned = 0
+    for batch in iter_keyset(attempts, ExamAttempt.id, chunk_size):
+        counts.update((row.subject_id, row.score or 0) for row in batch)
+        scanned += len(batch)
+
+    table = ScoreHistogram.__table__
+    delete = table.delete()
+    if subject_ids:
+        delete = delete.where(table.c.subject_id.in_(subject_ids))
+    try:
+        db.session.execute(delete)
+        rows = [{'subject_id': subject_id, 'score': score, 'count': count}
+                for (subject_id, score), count in counts.items()]
+        for start in range(0, len(rows), chunk_size):
+            db.session.execute(table.insert(), rows[start:start + chunk_size])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    score_distributions.expire(*(subject_ids or ()))
+    return {'attempts': scanned, 'subjects': len({subject_id for subject_id, _ in counts}), 'rows': len(rows)}
+
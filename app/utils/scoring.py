@@ -0,0 +1,125 @@
+from sqlalchemy import and_
+from app import db
+from app.models.exam import Question, Option
+
+MAX_TIME_SPENT_SECONDS = 32767  # attempt_answers.time_spent is a SMALLINT
+
+class ScoringError(ValueError):
+    """Raised when a submission cannot be scored against the attempt"""
+
+    def __init__(self, message, question_ids=None):
+        super().__init__(message)
+        self.question_ids = question_ids or []
+
+def parse_answers(answers):
+    """
+    Normalize a submitted {question_id: option_id} map to integer keys and values.
+    Blank answers (None or empty string) are dropped and count as unattempted.
+    """
+    if not isinstance(answers, dict):
+        raise ScoringError('Answers must be a mapping of question_id to option_id')
+
+    parsed = {}
+    for question_id, option_id in answers.items():
+        if option_id is None or option_id == '':
+            continue
+        try:
+            parsed[int(question_id)] = int(option_id)
+        except (TypeError, ValueError):
+            raise ScoringError(f'Invalid answer for question {question_id}')
+
+    return parsed
+
+def parse_answer_updates(answers, time_spent=None):
+    """
+    Normalize an incremental save: {question_id: option_id or None} plus an optional
+    {question_id: seconds} map. Unlike parse_answers, None is kept so an answer can be cleared.
+    """
+    if not isinstance(answers, dict) or (time_spent is not None and not isinstance(time_spent, dict)):
+        raise ScoringError('Answers and time_spent must be mappings keyed by question_id')
+
+    parsed = {}
+    for question_id, option_id in answers.items():
+        try:
+            parsed[int(question_id)] = None if option_id is None or option_id == '' else int(option_id)
+        except (TypeError, ValueError):
+            raise ScoringError(f'Invalid answer for question {question_id}')
+
+    seconds = {}
+    for question_id, value in (time_spent or {}).items():
+        try:
+            seconds[int(question_id)] = min(max(int(value), 0), MAX_TIME_SPENT_SECONDS)
+        except (TypeError, ValueError):
+            raise ScoringError(f'Invalid time_spent for question {question_id}')
+
+    return parsed, seconds
+
+def score_answers(answers, subject_ids=None, question_ids=None, skip_missing=False):
+    """
+    Score submitted answers against the answer key with a single query.
+
+    Every (question_id, option_id) pair is resolved in one round-trip and scored with
+    the question's own marks and negative_marks. Questions that do not belong to one of
+    subject_ids or are not in question_ids (the attempt's paper) raise ScoringError, as
+    do questions that do not exist unless skip_missing is set, in which case they are
+    left unscored and listed in result['missing']. Options that do not belong to their
+    question are ignored, so the question counts as unattempted.
+    """
+    parsed = parse_answers(answers)
+    result = {
+        'score': 0,
+        'correct_answers': 0,
+        'wrong_answers': 0,
+        'answered': 0,
+        'results': {},
+        'missing': []
+    }
+    if not parsed:
+        return result
+
+    # Outer join so that questions are returned even when the submitted option is not theirs
+    rows = db.session.query(
+        Question.id,
+        Question.subject_id,
+        Question.marks,
+        Question.negative_marks,
+        Option.id,
+        Option.is_correct
+    ).outerjoin(
+        Option,
+        and_(Option.question_id == Question.id, Option.id.in_(set(parsed.values())))
+    ).filter(
+        Question.id.in_(parsed.keys())
+    ).all()
+
+    subject_ids = set(subject_ids) if subject_ids is not None else None
+    question_ids = set(question_ids) if question_ids is not None else None
+    found = set()
+    invalid = set()
+    for question_id, subject_id, marks, negative_marks, option_id, is_correct in rows:
+        found.add(question_id)
+        if ((subject_ids is not None and subject_id not in subject_ids)
+                or (question_ids is not None and question_id not in question_ids)):
+            invalid.add(question_id)
+            continue
+        if option_id is None or option_id != parsed[question_id]:
+            continue
+
+        if is_correct:
+            result['correct_answers'] += 1
+            result['score'] += marks or 0
+        else:
+            result['wrong_answers'] += 1
+            result['score'] -= negative_marks or 0
+        result['results'][question_id] = bool(is_correct)
+
+    missing = set(parsed) - found
+    if skip_missing:
+        result['missing'] = sorted(missing)
+    else:
+        invalid.update(missing)
+    if invalid:
+        raise ScoringError('Answers contain questions that are not part of this exam', sorted(invalid))
+
+    result['answered'] = result['correct_answers'] + result['wrong_answers']
+    return result
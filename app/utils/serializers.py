@@ -0,0 +1,126 @@
+import json
+from collections import defaultdict
+from functools import lru_cache
+from operator import attrgetter
+from flask.json import JSONEncoder
+from app import db
+from app.models.exam import Question, Option
+from app.models.user_progress import ExamAttempt
+
+def isoformat(value):
+    return value.isoformat() if value is not None else None
+
+class Schema:
+    """
+    Explicit list of the fields a model is serialized to.
+
+    query() selects just those columns, so list endpoints can serialize plain row tuples
+    instead of hydrating ORM objects; dump_many() serializes ORM objects to the same
+    dicts. formatters maps a field name to a function applied to its value.
+    """
+
+    def __init__(self, model, fields, formatters=None):
+        self.model = model
+        self.fields = tuple(fields)
+        self.formatters = formatters or {}
+        self._getter = attrgetter(*self.fields)
+
+    def columns(self):
+        return [getattr(self.model, field) for field in self.fields]
+
+    def query(self, *extra_columns):
+        """Column query for the schema's fields, followed by any extra columns"""
+        return db.session.query(*self.columns(), *extra_columns)
+
+    def dump_rows(self, rows):
+        """Serialize row tuples from query(); extra trailing columns are ignored"""
+        fields = self.fields
+        if not self.formatters:
+            return [dict(zip(fields, row)) for row in rows]
+        return [self._format(dict(zip(fields, row))) for row in rows]
+
+    def dump_many(self, objects):
+        """Serialize ORM objects"""
+        return self.dump_rows(self._getter(obj) if len(self.fields) > 1 else (self._getter(obj),)
+                              for obj in objects)
+
+    def dump(self, obj):
+        return self.dump_many([obj])[0]
+
+    def _format(self, item):
+        for field, formatter in self.formatters.items():
+            item[field] = formatter(item[field])
+        return item
+
+OPTION_SCHEMA = Schema(Option, ('id', 'text', 'is_correct'))
+QUESTION_SCHEMA = Schema(Question, ('id', 'text', 'subject_id', 'difficulty', 'marks', 'negative_marks'))
+EXAM_ATTEMPT_SCHEMA = Schema(
+    ExamAttempt,
+    ('id', 'user_id', 'user_exam_id', 'attempt_number', 'score', 'total_questions', 'correct_answers',
+     'wrong_answers', 'unattempted', 'time_taken_seconds', 'started_at', 'completed_at'),
+    formatters={'started_at': isoformat, 'completed_at': isoformat}
+)
+
+def question_query():
+    """Column query for questions in the shape serialize_questions() expects"""
+    return QUESTION_SCHEMA.query()
+
+def serialize_questions(rows, chunk_size=1000):
+    """
+    Serialize question rows from question_query() with their options, the same dicts as
+    Question.to_dict(), using one column query for the options of each chunk.
+    """
+    questions = QUESTION_SCHEMA.dump_rows(rows)
+    options_by_question = defaultdict(list)
+    question_ids = [question['id'] for question in questions]
+    fields = OPTION_SCHEMA.fields
+    for start in range(0, len(question_ids), chunk_size):
+        chunk = question_ids[start:start + chunk_size]
+        options = OPTION_SCHEMA.query(Option.question_id).filter(Option.question_id.in_(chunk)).order_by(Option.id)
+        for row in options:
+            options_by_question[row[-1]].append(dict(zip(fields, row)))
+
+    for question in questions:
+        question['options'] = options_by_question[question['id']]
+    return questions
+
+@lru_cache(maxsize=None)
+def orjson_module():
+    """The orjson module, or None when it is not installed"""
+    try:
+        import orjson  # Optional dependency: pip install orjson
+    except ImportError:
+        return None
+    return orjson
+
+def dumps(obj):
+    """Encode obj as compact UTF-8 JSON bytes"""
+    orjson = orjson_module()
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+class FastJSONEncoder(JSONEncoder):
+    """
+    Flask JSON encoder that encodes with orjson when it is installed.
+
+    Types orjson does not handle natively, and datetimes, still go through Flask's
+    default() so the output matches the stdlib encoder apart from whitespace. Settings
+    orjson cannot honour (ASCII escaping, indents other than 2) use the stdlib encoder.
+    """
+
+    def encode(self, o):
+        orjson = orjson_module()
+        if orjson is None or self.ensure_ascii or self.indent not in (None, 2):
+            return super().encode(o)
+
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if self.indent == 2:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(o, default=self.default, option=option).decode('utf-8')
+        except orjson.JSONEncodeError:
+            # Out-of-range integers and the like; let the stdlib encoder handle or report them
+            return super().encode(o)
@@ -0,0 +1,253 @@
+import atexit
+import heapq
+import importlib
+import itertools
+import os
+import random
+import threading
+import time
+from collections import deque
+from urllib.parse import parse_qs, urlparse
+from app.utils.request_metrics import Histogram
+
+DELIVERY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+class Message:
+    __slots__ = ('to', 'body', 'enqueued_at', 'attempts')
+
+    def __init__(self, to, body):
+        self.to = to
+        self.body = body
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+
+class SMSGateway:
+    """
+    Interface for SMS gateways.
+
+    send_batch() delivers up to max_batch_size messages in one call and returns the
+    messages that failed temporarily and should be retried. Raising retries the whole
+    batch.
+    """
+
+    name = 'gateway'
+    max_batch_size = 100
+
+    def send_batch(self, messages):
+        raise NotImplementedError
+
+class ConsoleGateway(SMSGateway):
+    """Prints messages instead of sending them, for development"""
+
+    name = 'console'
+
+    def send_batch(self, messages):
+        for message in messages:
+            print(f"SMS to {message.to}: {message.body}")
+        return []
+
+class StubGateway(SMSGateway):
+    """
+    Local stand-in for a remote gateway: every batch takes latency seconds (plus up to
+    jitter), and each message fails temporarily with probability failure_rate.
+    The last max_sent delivered messages are kept in sent for inspection.
+    """
+
+    name = 'stub'
+
+    def __init__(self, latency=0.2, jitter=0.0, failure_rate=0.0, max_batch_size=100, max_sent=10000):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.max_batch_size = max_batch_size
+        self.sent = deque(maxlen=max_sent)
+
+    def send_batch(self, messages):
+        time.sleep(self.latency + random.uniform(0, self.jitter))
+        failed = [message for message in messages if random.random() < self.failure_rate]
+        if failed:
+            failed_ids = {id(message) for message in failed}
+            self.sent.extend(message for message in messages if id(message) not in failed_ids)
+        else:
+            self.sent.extend(messages)
+        return failed
+
+def create_sms_gateway(url):
+    """
+    Create a gateway from a URL: console://, stub://?latency_ms=200&jitter_ms=50&failure_rate=0.05
+    or package.module:GatewayClass for any SMSGateway implementation.
+    """
+    if url.startswith('console://'):
+        return ConsoleGateway()
+    if url.startswith('stub://'):
+        params = {key: values[-1] for key, values in parse_qs(urlparse(url).query).items()}
+        return StubGateway(
+            latency=float(params.get('latency_ms', 200)) / 1000,
+            jitter=float(params.get('jitter_ms', 0)) / 1000,
+            failure_rate=float(params.get('failure_rate', 0)),
+            max_batch_size=int(params.get('batch_size', 100))
+        )
+    if ':' in url and '/' not in url:
+        module_name, class_name = url.split(':', 1)
+        return getattr(importlib.import_module(module_name), class_name)()
+    raise ValueError(f'Unsupported SMS gateway: {url}')
+
+class SMSQueue:
+    """
+    Outbound SMS queue delivered by a pool of background threads.
+
+    enqueue() only appends to an in-memory queue, so requests never wait on the gateway.
+    Each worker takes up to batch_size ready messages (lingering briefly for a batch to
+    fill), hands them to the gateway in one call and schedules failed messages for retry
+    with exponential backoff and jitter until max_attempts. When max_size messages are
+    waiting, enqueue() refuses new ones.
+
+    Messages live in one worker process and are lost if it crashes; an OTP that never
+    arrives can simply be requested again.
+    """
+
+    def __init__(self, gateway=None, workers=4, batch_size=50, linger=0.02, max_attempts=5,
+                 backoff=1.0, max_backoff=60.0, max_size=100000):
+        self.gateway = gateway or ConsoleGateway()
+        self.workers = workers
+        self.batch_size = batch_size
+        self.linger = linger
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_size = max_size
+        self.app = None
+        self._ready = deque()
+        self._delayed = []  # (due, sequence, message)
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._threads = []
+        self._pid = None
+        self.delivery_latency = Histogram(
+            'sms_delivery_latency_seconds', 'Time from enqueue to gateway acceptance, including retries',
+            ('gateway',), DELIVERY_BUCKETS)
+        self.enqueued = 0
+        self.delivered = 0
+        self.retried = 0
+        self.failed = 0
+        self.dropped = 0
+        self.batches = 0
+
+    def init_app(self, app):
+        self.app = app
+        self.gateway = create_sms_gateway(app.config.get('SMS_GATEWAY_URL', 'console://'))
+        self.workers = app.config.get('SMS_WORKERS', self.workers)
+        self.batch_size = min(app.config.get('SMS_BATCH_SIZE', self.batch_size), self.gateway.max_batch_size)
+        self.linger = app.config.get('SMS_BATCH_LINGER_MS', self.linger * 1000) / 1000
+        self.max_attempts = app.config.get('SMS_MAX_ATTEMPTS', self.max_attempts)
+        self.backoff = app.config.get('SMS_RETRY_BACKOFF_SECONDS', self.backoff)
+        self.max_backoff = app.config.get('SMS_RETRY_BACKOFF_MAX_SECONDS', self.max_backoff)
+        self.max_size = app.config.get('SMS_QUEUE_MAX_SIZE', self.max_size)
+        app.extensions['sms_queue'] = self
+        atexit.register(self.drain)
+
+    def enqueue(self, to, body):
+        """Queue a message for delivery; return False if the queue is full"""
+        with self._cond:
+            if len(self._ready) + len(self._delayed) >= self.max_size:
+                self.dropped += 1
+                return False
+            self._ready.append(Message(to, body))
+            self.enqueued += 1
+            self._cond.notify()
+        self._ensure_threads()
+        return True
+
+    def drain(self, timeout=10.0):
+        """Wait up to timeout seconds for queued messages to be sent or given up; True if none are left"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._ready or self._delayed or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._threads_alive():
+                    return False
+                self._cond.wait(min(remaining, 0.1))
+        return True
+
+    def stats(self):
+        with self._cond:
+            return {
+                'depth': len(self._ready),
+                'retry_pending': len(self._delayed),
+                'in_flight': self._in_flight,
+                'enqueued': self.enqueued,
+                'delivered': self.delivered,
+                'retried': self.retried,
+                'failed': self.failed,
+                'dropped': self.dropped,
+                'batches': self.batches
+            }
+
+    def _next_batch(self):
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                while self._delayed and self._delayed[0][0] <= now:
+                    self._ready.append(heapq.heappop(self._delayed)[2])
+                if self._ready:
+                    if len(self._ready) < self.batch_size and self.linger:
+                        # Give a burst a moment to fill the batch
+                        self._cond.wait(self.linger)
+                    batch = [self._ready.popleft() for _ in range(min(self.batch_size, len(self._ready)))]
+                    if batch:
+                        self._in_flight += len(batch)
+                        return batch
+                    continue
+                self._cond.wait(self._delayed[0][0] - now if self._delayed else None)
+
+    def _deliver(self, batch):
+        try:
+            failed = self.gateway.send_batch(batch)
+        except Exception:
+            self.app.logger.exception('SMS gateway %s failed a batch of %d', self.gateway.name, len(batch))
+            failed = batch
+
+        now = time.monotonic()
+        failed_ids = {id(message) for message in failed}
+        labels = (self.gateway.name,)
+        for message in batch:
+            if id(message) not in failed_ids:
+                self.delivery_latency.observe(labels, now - message.enqueued_at)
+
+        with self._cond:
+            self.batches += 1
+            self.delivered += len(batch) - len(failed)
+            self._in_flight -= len(batch)
+            for message in failed:
+                message.attempts += 1
+                if message.attempts >= self.max_attempts:
+                    self.failed += 1
+                    self.app.logger.error('Giving up on SMS to %s after %d attempts', message.to, message.attempts)
+                    continue
+                delay = min(self.backoff * 2 ** (message.attempts - 1), self.max_backoff) * random.uniform(0.5, 1)
+                heapq.heappush(self._delayed, (now + delay, next(self._sequence), message))
+                self.retried += 1
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            self._deliver(self._next_batch())
+
+    def _threads_alive(self):
+        return self._pid == os.getpid() and any(thread.is_alive() for thread in self._threads)
+
+    def _ensure_threads(self):
+        # Started lazily so every forked worker gets its own pool
+        if self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._threads = [
+                    threading.Thread(target=self._run, name=f'sms-{i}', daemon=True) for i in range(self.workers)
+                ]
+                for thread in self._threads:
+                    thread.start()
+
+sms_queue = SMSQueue()
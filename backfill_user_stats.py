@@ -0,0 +1,84 @@
+"""
+Script to rebuild the user_subject_stats summary table from exam_attempts.
+
+Users are processed in chunks: each chunk's completed attempts are folded into
+per-subject stats and the chunk's rows are replaced in one short transaction.
+Submits that complete while a chunk is being rebuilt may be missed; run it at a quiet time.
+
+Usage: python backfill_user_stats.py [--chunk-size 500]
+"""
+
+import argparse
+import os
+import sys
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from app import create_app, db
+from app.models import User, UserExam, ExamAttempt, UserSubjectStats
+from app.utils.pagination import iter_keyset
+
+SUMS = ('attempts', 'total_score', 'correct_answers', 'wrong_answers', 'total_questions', 'total_time_seconds')
+
+def fold(stats, row):
+    """Add one attempt's stats row to the accumulated stats of its user and subject"""
+    if stats is None:
+        return dict(row)
+    for column in SUMS:
+        stats[column] += row[column]
+    scores = [score for score in (stats['best_score'], row['best_score']) if score is not None]
+    stats['best_score'] = max(scores) if scores else None
+    if stats['last_attempt_at'] is None or row['last_attempt_at'] >= stats['last_attempt_at']:
+        stats['last_score'] = row['last_score']
+        stats['last_attempt_at'] = row['last_attempt_at']
+    return stats
+
+def backfill(chunk_size=500):
+    users = db.session.query(User.id)
+    table = UserSubjectStats.__table__
+    total_users = total_rows = 0
+
+    for batch in iter_keyset(users, User.id, chunk_size):
+        user_ids = [row.id for row in batch]
+        attempts = db.session.query(ExamAttempt, UserExam.subject_id).join(
+            UserExam, UserExam.id == ExamAttempt.user_exam_id
+        ).filter(
+            ExamAttempt.user_id.in_(user_ids),
+            ExamAttempt.completed_at.isnot(None)
+        )
+
+        stats = {}
+        for attempt, subject_id in attempts:
+            key = (attempt.user_id, subject_id)
+            stats[key] = fold(stats.get(key), UserSubjectStats.row_for(attempt, subject_id))
+
+        try:
+            db.session.execute(table.delete().where(table.c.user_id.in_(user_ids)))
+            if stats:
+                db.session.execute(table.insert(), list(stats.values()))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        db.session.expunge_all()
+
+        total_users += len(user_ids)
+        total_rows += len(stats)
+        print(f"Processed {total_users} users, {total_rows} stats rows")
+
+    return total_rows
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild user_subject_stats from exam attempts')
+    parser.add_argument('--chunk-size', type=int, default=500, help='Users rebuilt per transaction')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        rows = backfill(chunk_size=max(args.chunk_size, 1))
+
+    print(f"Backfill completed: {rows} stats rows")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Response compression benchmark for the large exam payloads.
+
+Measures the full question list of a subject (GET /api/questions?subject_id=, served
+from the paper cache with precompressed bodies) and a sampled exam paper (POST
+/api/user/exams/<id>/start, compressed per request):
+
+- payload size and compression CPU time for gzip and brotli at the dynamic and the
+  cached levels
+- server time and bytes sent per request for each Accept-Encoding
+- the transfer time those bytes take at slow mobile bandwidths
+
+Usage:
+    python benchmarks/compression.py --seed --questions 500 --rounds 20
+    python benchmarks/compression.py --bandwidth-kbps 128 384 1000
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models import User, Subject, UserExam
+from app.utils.compression import brotli_available, compress
+from benchmarks.seed import bench_config, add_scale_arguments, scale_from_args, seed_database
+
+def encoding_levels(app):
+    """(label, encoding, level) for the dynamic and paper cache level of each available encoding"""
+    config = app.config
+    levels = [('gzip-dynamic', 'gzip', config['COMPRESS_GZIP_LEVEL']),
+              ('gzip-cached', 'gzip', config['PAPER_CACHE_GZIP_LEVEL'])]
+    if brotli_available():
+        levels += [('br-dynamic', 'br', config['COMPRESS_BROTLI_QUALITY']),
+                   ('br-cached', 'br', config['PAPER_CACHE_BROTLI_QUALITY']),
+                   ('br-max', 'br', 11)]
+    return levels
+
+def measure_payload(app, body, repeats):
+    """Compressed size and mean compression time of one body at each level"""
+    results = {'identity': {'bytes': len(body)}}
+    for label, encoding, level in encoding_levels(app):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            data = compress(body, encoding, level)
+        seconds = (time.perf_counter() - start) / repeats
+        results[label] = {
+            'bytes': len(data),
+            'ratio': round(len(body) / len(data), 2),
+            'compress_ms': round(seconds * 1000, 3)
+        }
+    return results
+
+def measure_requests(client, method, path, token, accept_encoding, rounds):
+    """Mean server time and bytes on the wire for one Accept-Encoding"""
+    headers = {'Authorization': f'Bearer {token}', 'Accept-Encoding': accept_encoding}
+    samples = []
+    size = 0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        response = client.open(path, method=method, headers=headers)
+        size = len(response.get_data())
+        samples.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise RuntimeError(f'{method} {path} returned {response.status_code}')
+    samples.sort()
+    return {
+        'content_encoding': response.content_encoding or 'identity',
+        'bytes': size,
+        'server_p50_ms': round(samples[len(samples) // 2] * 1000, 3),
+        'server_mean_ms': round(sum(samples) / len(samples) * 1000, 3)
+    }
+
+def transfer_ms(size, kbps):
+    return round(size * 8 / kbps, 1)
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure compression of the exam payloads')
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL', 'sqlite:////tmp/jishu_compression.db'))
+    parser.add_argument('--seed', action='store_true', help='Drop and reseed the database first')
+    parser.add_argument('--yes', action='store_true', help='Allow reseeding a non-SQLite database')
+    parser.add_argument('--rounds', type=int, default=20, help='Requests per endpoint and encoding')
+    parser.add_argument('--bandwidth-kbps', type=int, nargs='+', default=[256, 1000, 4000],
+                        help='Link speeds to estimate transfer time at')
+    parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+    add_scale_arguments(parser)
+    args = parser.parse_args()
+
+    app = create_app(bench_config(args.database_url))
+    with app.app_context():
+        if args.seed:
+            if not args.database_url.startswith('sqlite') and not args.yes:
+                print("Refusing to drop and reseed a non-SQLite database without --yes", file=sys.stderr)
+                return 1
+            with contextlib.redirect_stdout(sys.stderr):
+                seed_database(**scale_from_args(args))
+        user = User.query.filter_by(role='student').order_by(User.id).first()
+        token = create_access_token(identity=user.id, additional_claims=user.token_claims())
+        subject_id = db.session.query(Subject.id).filter_by(is_full_mock=False).order_by(Subject.id).first().id
+        user_exam = UserExam.purchase(user.id, subject_id)
+        # Enough retakes for every measured start
+        UserExam.query.filter_by(id=user_exam.id).update({'max_retakes': user_exam.retakes_used + 4 * args.rounds})
+        db.session.commit()
+        user_exam_id = user_exam.id
+        db.session.remove()
+
+    client = app.test_client()
+    encodings = ['identity', 'gzip'] + (['br'] if brotli_available() else [])
+    endpoints = {
+        'questions': ('GET', f'/api/questions?subject_id={subject_id}'),
+        'start_exam_attempt': ('POST', f'/api/user/exams/{user_exam_id}/start')
+    }
+
+    report = {
+        'target': args.database_url,
+        'scale': scale_from_args(args),
+        'rounds': args.rounds,
+        'brotli': brotli_available(),
+        'endpoints': {}
+    }
+    # Views print debug output; keep stdout for the report
+    with contextlib.redirect_stdout(sys.stderr):
+        for name, (method, path) in endpoints.items():
+            body = client.open(path, method=method, headers={'Authorization': f'Bearer {token}'}).get_data()
+            served = {}
+            for encoding in encodings:
+                result = measure_requests(client, method, path, token, encoding, args.rounds)
+                result['transfer_ms'] = {f'{kbps}kbps': transfer_ms(result['bytes'], kbps)
+                                         for kbps in args.bandwidth_kbps}
+                served[encoding] = result
+            report['endpoints'][name] = {
+                'path': path,
+                'payload': measure_payload(app, body, repeats=5),
+                'served': served
+            }
+
+    with app.app_context():
+        UserExam.query.filter_by(id=user_exam_id).update({'max_retakes': 3})
+        db.session.commit()
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,337 @@
+"""
+Concurrency stress test for the purchase and retake counters.
+
+Fires parallel purchases, then parallel exam starts, at a few purchases from a pool of
+threads against a local database and checks that the counters stay exact:
+
+- purchases: one user_exams row per user and subject, with purchase_count equal to
+  the number of purchases made
+- starts: exactly max_retakes starts succeed per purchase, retakes_used matches and
+  the attempts are numbered 1..n without gaps or repeats
+- submits (endpoints only): every attempt is submitted by many threads at once;
+  exactly one submit per attempt succeeds, and score_histograms and user_subject_stats
+  count each completed attempt once
+
+The same load runs through the read-modify-write code the endpoints used before
+("legacy"), through the conditional UPDATE and upsert model methods ("atomic") and
+through the HTTP endpoints via the test client ("endpoints"), reporting throughput,
+errors and counter drift for each.
+
+Usage:
+    python benchmarks/contention.py --seed --threads 16 --operations 40
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models import User, Subject, UserExam, ExamAttempt, AttemptAnswer, ScoreHistogram, UserSubjectStats
+from benchmarks.endpoints import TestClientTransport
+from benchmarks.seed import bench_config, add_scale_arguments, scale_from_args, seed_database
+
+MODES = ['legacy', 'atomic', 'endpoints']
+
+def legacy_purchase(user_id, subject_id):
+    """Purchase as the endpoint used to: read the row, increment in Python, commit"""
+    existing = UserExam.query.filter_by(user_id=user_id, subject_id=subject_id).first()
+    if existing:
+        existing.purchase_count += 1
+        existing.last_purchased_at = datetime.utcnow()
+        existing.retakes_used = 0
+    else:
+        db.session.add(UserExam(user_id=user_id, subject_id=subject_id, purchase_count=1,
+                                purchased_at=datetime.utcnow(), last_purchased_at=datetime.utcnow(),
+                                max_retakes=3, retakes_used=0))
+    db.session.commit()
+    return True
+
+def legacy_start(user_exam_id, user_id):
+    """Start as the endpoint used to: check and bump retakes_used in Python, number from a count"""
+    user_exam = UserExam.query.get(user_exam_id)
+    if user_exam.retakes_used >= user_exam.max_retakes:
+        return False
+    attempt_number = user_exam.attempts.count() + 1
+    user_exam.retakes_used += 1
+    db.session.add(ExamAttempt(user_id=user_id, user_exam_id=user_exam_id, attempt_number=attempt_number,
+                               started_at=datetime.utcnow()))
+    db.session.commit()
+    return True
+
+def atomic_purchase(user_id, subject_id):
+    UserExam.purchase(user_id, subject_id)
+    db.session.commit()
+    return True
+
+def atomic_start(user_exam_id, user_id):
+    attempt_number = UserExam.use_retake(user_exam_id, user_id)
+    if attempt_number is None:
+        db.session.rollback()
+        return False
+    db.session.add(ExamAttempt(user_id=user_id, user_exam_id=user_exam_id, attempt_number=attempt_number,
+                               started_at=datetime.utcnow()))
+    db.session.commit()
+    return True
+
+class EndpointClient:
+    """Purchases and starts through the API with each user's token"""
+
+    def __init__(self, app, tokens):
+        self.transport = TestClientTransport(app)
+        self.tokens = tokens
+
+    def purchase(self, user_id, subject_id):
+        response = self.transport.request('POST', f'/api/user/exams/{subject_id}/purchase', token=self.tokens[user_id])
+        if response.status not in (200, 201):
+            raise RuntimeError(f'purchase returned {response.status}')
+        return True
+
+    def start(self, user_exam_id, user_id):
+        response = self.transport.request('POST', f'/api/user/exams/{user_exam_id}/start', token=self.tokens[user_id])
+        if response.status not in (200, 400):
+            raise RuntimeError(f'start returned {response.status}')
+        return response.status == 200
+
+    def start_attempt(self, user_exam_id, user_id):
+        response = self.transport.request('POST', f'/api/user/exams/{user_exam_id}/start', token=self.tokens[user_id])
+        if response.status != 200:
+            raise RuntimeError(f'start returned {response.status}')
+        return response.json()['attempt']['id']
+
+    def submit(self, attempt_id, user_id):
+        response = self.transport.request('POST', f'/api/user/attempts/{attempt_id}/submit', token=self.tokens[user_id],
+                                          json_body={})
+        if response.status not in (200, 400):
+            raise RuntimeError(f'submit returned {response.status}')
+        return response.status == 200
+
+def reset(user_ids):
+    """Remove the purchases and attempts of the test users"""
+    attempt_ids = db.session.query(ExamAttempt.id).filter(ExamAttempt.user_id.in_(user_ids))
+    AttemptAnswer.query.filter(AttemptAnswer.attempt_id.in_(attempt_ids.subquery())).delete(synchronize_session=False)
+    ExamAttempt.query.filter(ExamAttempt.user_id.in_(user_ids)).delete(synchronize_session=False)
+    UserExam.query.filter(UserExam.user_id.in_(user_ids)).delete(synchronize_session=False)
+    db.session.commit()
+
+def hammer(app, targets, threads, operations, operation):
+    """Run operations calls per thread over the targets round-robin; return (results per target, errors, seconds)"""
+    def worker(worker_id):
+        results = Counter()
+        errors = 0
+        with app.app_context():
+            for i in range(operations):
+                target = targets[(worker_id + i) % len(targets)]
+                try:
+                    if operation(*target):
+                        results[target] += 1
+                except Exception:
+                    db.session.rollback()
+                    errors += 1
+            db.session.remove()
+        return results, errors
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        outcomes = list(pool.map(worker, range(threads)))
+    seconds = time.perf_counter() - start
+
+    results = Counter()
+    for counts, _ in outcomes:
+        results.update(counts)
+    return results, sum(errors for _, errors in outcomes), seconds
+
+def check_purchases(app, user_ids, subject_id, threads, operations, purchase):
+    targets = [(user_id, subject_id) for user_id in user_ids]
+    results, errors, seconds = hammer(app, targets, threads, operations, purchase)
+
+    drift = 0
+    with app.app_context():
+        rows = UserExam.query.filter(UserExam.user_id.in_(user_ids), UserExam.subject_id == subject_id).all()
+        purchases = Counter()
+        for row in rows:
+            purchases[(row.user_id, row.subject_id)] += row.purchase_count
+        duplicate_rows = len(rows) - len({(row.user_id, row.subject_id) for row in rows})
+        for target in targets:
+            drift += abs(purchases[target] - results[target])
+        db.session.remove()
+
+    total = threads * operations
+    return {
+        'operations': total,
+        'errors': errors,
+        'seconds': round(seconds, 3),
+        'ops_per_second': round(total / seconds, 2),
+        'duplicate_rows': duplicate_rows,
+        'purchase_count_drift': drift
+    }
+
+def check_starts(app, user_ids, subject_id, threads, operations, start, max_retakes):
+    with app.app_context():
+        for user_id in user_ids:
+            UserExam.purchase(user_id, subject_id, max_retakes=max_retakes)
+        db.session.commit()
+        targets = [(row.id, row.user_id) for row in
+                   UserExam.query.filter(UserExam.user_id.in_(user_ids), UserExam.subject_id == subject_id)]
+        db.session.remove()
+
+    results, errors, seconds = hammer(app, targets, threads, operations, start)
+
+    over_limit = retakes_drift = numbering_errors = 0
+    with app.app_context():
+        for user_exam_id, _ in targets:
+            user_exam = UserExam.query.get(user_exam_id)
+            numbers = sorted(number for number, in db.session.query(ExamAttempt.attempt_number).filter_by(
+                user_exam_id=user_exam_id))
+            over_limit += max(0, len(numbers) - user_exam.max_retakes)
+            retakes_drift += abs(user_exam.retakes_used - len(numbers))
+            if numbers != list(range(1, len(numbers) + 1)):
+                numbering_errors += 1
+            # Every target gets far more starts than retakes, so all retakes should be used
+            retakes_drift += abs(results[(user_exam_id, user_exam.user_id)] - len(numbers))
+        db.session.remove()
+
+    total = threads * operations
+    return {
+        'operations': total,
+        'errors': errors,
+        'seconds': round(seconds, 3),
+        'ops_per_second': round(total / seconds, 2),
+        'attempts_over_limit': over_limit,
+        'retakes_used_drift': retakes_drift,
+        'purchases_misnumbered': numbering_errors
+    }
+
+def completed_counts(user_ids, subject_id):
+    """Return (histogram total, stats attempts of the users) for the subject"""
+    histogram = db.session.query(db.func.sum(ScoreHistogram.count)).filter_by(subject_id=subject_id).scalar()
+    stats = db.session.query(db.func.sum(UserSubjectStats.attempts)).filter(
+        UserSubjectStats.user_id.in_(user_ids), UserSubjectStats.subject_id == subject_id).scalar()
+    return int(histogram or 0), int(stats or 0)
+
+def check_submits(app, client, user_ids, subject_id, threads, operations, attempts_per_user=5):
+    with app.app_context():
+        for user_id in user_ids:
+            UserExam.purchase(user_id, subject_id, max_retakes=attempts_per_user)
+        db.session.commit()
+        user_exams = [(row.id, row.user_id) for row in
+                      UserExam.query.filter(UserExam.user_id.in_(user_ids), UserExam.subject_id == subject_id)]
+        histogram_before, stats_before = completed_counts(user_ids, subject_id)
+        db.session.remove()
+    targets = [(client.start_attempt(user_exam_id, user_id), user_id)
+               for user_exam_id, user_id in user_exams for _ in range(attempts_per_user)]
+
+    results, errors, seconds = hammer(app, targets, threads, operations, client.submit)
+
+    with app.app_context():
+        histogram_after, stats_after = completed_counts(user_ids, subject_id)
+        completed = ExamAttempt.query.filter(
+            ExamAttempt.id.in_([attempt_id for attempt_id, _ in targets]), ExamAttempt.completed_at.isnot(None)
+        ).count()
+        db.session.remove()
+
+    total = threads * operations
+    return {
+        'operations': total,
+        'errors': errors,
+        'seconds': round(seconds, 3),
+        'ops_per_second': round(total / seconds, 2),
+        'attempts': len(targets),
+        'duplicate_submits': sum(max(0, count - 1) for count in results.values()),
+        'histogram_drift': histogram_after - histogram_before - completed,
+        'stats_drift': stats_after - stats_before - completed
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Stress purchase and retake counters with parallel requests')
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL', 'sqlite:////tmp/jishu_contention.db'))
+    parser.add_argument('--seed', action='store_true', help='Drop and reseed the database first')
+    parser.add_argument('--yes', action='store_true', help='Allow reseeding a non-SQLite database')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--operations', type=int, default=40, help='Calls per thread in each phase')
+    parser.add_argument('--targets', type=int, default=4, help='Purchases all threads contend on')
+    parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+    add_scale_arguments(parser)
+    args = parser.parse_args()
+
+    app = create_app(bench_config(args.database_url))
+    with app.app_context():
+        if args.seed:
+            if not args.database_url.startswith('sqlite') and not args.yes:
+                print("Refusing to drop and reseed a non-SQLite database without --yes", file=sys.stderr)
+                return 1
+            with contextlib.redirect_stdout(sys.stderr):
+                seed_database(**scale_from_args(args))
+        users = User.query.filter_by(role='student').order_by(User.id).limit(args.targets).all()
+        user_ids = [user.id for user in users]
+        tokens = {user.id: create_access_token(identity=user.id, additional_claims=user.token_claims())
+                  for user in users}
+        subject_id = db.session.query(Subject.id).filter_by(is_full_mock=False).order_by(Subject.id).first().id
+        db.session.remove()
+
+    # Half of each purchase's starts should be refused
+    max_retakes = max(1, args.threads * args.operations // len(user_ids) // 2)
+    results = {}
+    for mode in args.modes:
+        print(f"Running {mode}...", file=sys.stderr)
+        if mode == 'endpoints':
+            client = EndpointClient(app, tokens)
+            purchase, start = client.purchase, client.start
+        else:
+            purchase, start = (legacy_purchase, legacy_start) if mode == 'legacy' else (atomic_purchase, atomic_start)
+
+        with app.app_context():
+            reset(user_ids)
+        # Views print debug output; keep stdout for the report
+        with contextlib.redirect_stdout(sys.stderr):
+            purchases = check_purchases(app, user_ids, subject_id, args.threads, args.operations, purchase)
+            with app.app_context():
+                reset(user_ids)
+            starts = check_starts(app, user_ids, subject_id, args.threads, args.operations, start, max_retakes)
+            results[mode] = {'purchases': purchases, 'starts': starts}
+            if mode == 'endpoints':
+                with app.app_context():
+                    reset(user_ids)
+                results[mode]['submits'] = check_submits(app, client, user_ids, subject_id, args.threads,
+                                                         args.operations)
+
+    with app.app_context():
+        reset(user_ids)
+
+    report = {
+        'database': args.database_url,
+        'threads': args.threads,
+        'operations_per_thread': args.operations,
+        'targets': len(user_ids),
+        'max_retakes': max_retakes,
+        'modes': results
+    }
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    exact = all(
+        not results[mode]['purchases']['duplicate_rows'] and not results[mode]['purchases']['purchase_count_drift']
+        and not results[mode]['starts']['attempts_over_limit'] and not results[mode]['starts']['retakes_used_drift']
+        and not results[mode]['starts']['purchases_misnumbered']
+        and not any(results[mode].get('submits', {}).get(key) for key in
+                    ('duplicate_submits', 'histogram_drift', 'stats_drift'))
+        for mode in results if mode != 'legacy'
+    )
+    return 0 if exact else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,369 @@
+"""
+Endpoint benchmark for every route in app/api and app/auth.
+
+Seeds (optionally) a local database, then drives each endpoint through the Flask
+test client, or a running server with --base-url, from a pool of concurrent
+workers. Reports p50/p95/p99 latency, throughput and SQL queries per request for
+every endpoint as JSON so results can be compared across commits.
+
+Usage:
+    python benchmarks/endpoints.py --seed --questions 500 --concurrency 8 --rounds 20
+    python benchmarks/endpoints.py --base-url http://127.0.0.1:5000 --concurrency 32
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from app import create_app, db
+from app.models import User, Subject
+from benchmarks.seed import bench_config, add_scale_arguments, scale_from_args, seed_database
+
+class Response:
+    def __init__(self, status, body):
+        self.status = status
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body) if self.body else None
+
+class TestClientTransport:
+    """Sends requests through the Flask test client in the calling thread"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, token=None, json_body=None, data=None, content_type=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        response = self.client.open(path, method=method, headers=headers, json=json_body,
+                                    data=data, content_type=content_type)
+        return Response(response.status_code, response.get_data())
+
+class HTTPTransport:
+    """Sends requests to a running server over HTTP"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, token=None, json_body=None, data=None, content_type=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        if json_body is not None:
+            data = json.dumps(json_body).encode('utf-8')
+            content_type = 'application/json'
+        if content_type:
+            headers['Content-Type'] = content_type
+        req = urllib.request.Request(self.base_url + path, data=data, method=method, headers=headers)
+        try:
+            with urllib.request.urlopen(req) as response:
+                return Response(response.status, response.read())
+        except urllib.error.HTTPError as e:
+            return Response(e.code, e.read())
+
+class QueryCounter:
+    """Counts SQL statements per thread via SQLAlchemy engine events"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def install(self, engine):
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self._local.count = getattr(self._local, 'count', 0) + 1
+
+    def take(self):
+        count = getattr(self._local, 'count', 0)
+        self._local.count = 0
+        return count
+
+class Recorder:
+    def __init__(self, query_counter=None):
+        self.samples = defaultdict(list)
+        self.queries = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.query_counter = query_counter
+        self._lock = threading.Lock()
+
+    def call(self, transport, name, method, path, expect=(200, 201), **kwargs):
+        if self.query_counter:
+            self.query_counter.take()
+        start = time.perf_counter()
+        response = transport.request(method, path, **kwargs)
+        elapsed = time.perf_counter() - start
+        queries = self.query_counter.take() if self.query_counter else None
+
+        with self._lock:
+            self.samples[name].append(elapsed)
+            if queries is not None:
+                self.queries[name].append(queries)
+            if response.status not in expect:
+                self.errors[name] += 1
+        return response
+
+def percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return None
+    index = min(len(sorted_samples) - 1, max(0, int(round(pct / 100 * len(sorted_samples) + 0.5)) - 1))
+    return sorted_samples[index]
+
+class Bench:
+    """Holds benchmark fixtures (tokens, ids) and the scenarios that exercise each route"""
+
+    def __init__(self, app, recorder):
+        self.app = app
+        self.recorder = recorder
+        self._counter = 0
+        self._lock = threading.Lock()
+        with app.app_context():
+            admin = User.query.filter_by(role='admin').first()
+            self.admin_token = create_access_token(identity=admin.id, additional_claims=admin.token_claims())
+            self.students = [
+                (user.id, user.mobile_number, create_access_token(identity=user.id, additional_claims=user.token_claims()))
+                for user in User.query.filter_by(role='student').order_by(User.id)
+            ]
+            self.subject_ids = [row.id for row in db.session.query(Subject.id).filter_by(is_full_mock=False)]
+            self.category_ids = sorted({row.category_id for row in db.session.query(Subject.category_id)})
+
+    def unique(self):
+        with self._lock:
+            self._counter += 1
+            return f'{os.getpid()}-{self._counter}'
+
+    def scenarios(self):
+        return [
+            self.catalog,
+            self.questions,
+            self.user_reads,
+            self.exam_flow,
+            self.auth_flow,
+            self.admin_catalog_writes,
+            self.admin_question_writes
+        ]
+
+    def catalog(self, t, rng):
+        call = self.recorder.call
+        category_id = rng.choice(self.category_ids)
+        subject_id = rng.choice(self.subject_ids)
+        call(t, 'GET /health', 'GET', '/health')
+        call(t, 'GET /api/exam-categories', 'GET', '/api/exam-categories')
+        call(t, 'GET /api/exam-categories/<id>', 'GET', f'/api/exam-categories/{category_id}')
+        call(t, 'GET /api/subjects', 'GET', '/api/subjects')
+        call(t, 'GET /api/subjects?category_id=', 'GET', f'/api/subjects?category_id={category_id}')
+        call(t, 'GET /api/subjects/<id>', 'GET', f'/api/subjects/{subject_id}')
+
+    def questions(self, t, rng):
+        call = self.recorder.call
+        subject_id = rng.choice(self.subject_ids)
+        page = call(t, 'GET /api/questions?subject_id=&limit=50', 'GET',
+                    f'/api/questions?subject_id={subject_id}&limit=50', token=self.admin_token).json()
+        call(t, 'GET /api/questions?subject_id=', 'GET', f'/api/questions?subject_id={subject_id}', token=self.admin_token)
+        if page and page['items']:
+            question_id = rng.choice(page['items'])['id']
+            call(t, 'GET /api/questions/<id>', 'GET', f'/api/questions/{question_id}', token=self.admin_token)
+        call(t, 'GET /api/questions/paper-cache', 'GET', '/api/questions/paper-cache', token=self.admin_token)
+
+    def user_reads(self, t, rng):
+        call = self.recorder.call
+        _, _, token = rng.choice(self.students)
+        call(t, 'GET /api/user/exams', 'GET', '/api/user/exams', token=token)
+        call(t, 'GET /api/user/progress', 'GET', '/api/user/progress', token=token)
+        call(t, 'GET /api/subjects/<id>/leaderboard', 'GET',
+             f'/api/subjects/{rng.choice(self.subject_ids)}/leaderboard?score={rng.randint(0, 100)}', token=token)
+        call(t, 'GET /api/user/exams?include=attempts', 'GET', '/api/user/exams?include=attempts', token=token)
+        attempts = call(t, 'GET /api/user/attempts?limit=50', 'GET', '/api/user/attempts?limit=50', token=token).json()
+        call(t, 'GET /api/user/attempts', 'GET', '/api/user/attempts', token=token)
+        if attempts and attempts['items']:
+            attempt_id = rng.choice(attempts['items'])['id']
+            call(t, 'GET /api/user/attempts/<id>', 'GET', f'/api/user/attempts/{attempt_id}', token=token)
+            call(t, 'GET /api/user/attempts/<id>?include=review', 'GET',
+                 f'/api/user/attempts/{attempt_id}?include=review', token=token)
+
+    def exam_flow(self, t, rng):
+        call = self.recorder.call
+        _, _, token = rng.choice(self.students)
+        subject_id = rng.choice(self.subject_ids)
+        user_exam = call(t, 'POST /api/user/exams/<subject_id>/purchase', 'POST',
+                         f'/api/user/exams/{subject_id}/purchase', token=token).json()
+        started = call(t, 'POST /api/user/exams/<id>/start', 'POST',
+                       f"/api/user/exams/{user_exam['id']}/start", token=token).json()
+        if not started or 'attempt' not in started:
+            return
+        attempt_id = started['attempt']['id']
+        answers = {
+            str(question['id']): rng.choice(question['options'])['id']
+            for question in started['questions'] if question['options'] and rng.random() < 0.8
+        }
+        # Autosave in small batches as a client would, then send the last batch with the submit
+        items = list(answers.items())
+        saved, last = items[:-5], items[-5:]
+        for start in range(0, len(saved), 5):
+            call(t, 'PATCH /api/user/attempts/<id>/answers', 'PATCH', f'/api/user/attempts/{attempt_id}/answers',
+                 token=token, expect=(202,), json_body={'answers': dict(saved[start:start + 5])})
+        call(t, 'POST /api/user/attempts/<id>/submit', 'POST', f'/api/user/attempts/{attempt_id}/submit',
+             token=token, json_body={'answers': dict(last),
+                                     'time_taken_seconds': rng.randint(600, 3600)})
+
+    def auth_flow(self, t, rng):
+        call = self.recorder.call
+        _, mobile_number, token = rng.choice(self.students)
+        call(t, 'POST /auth/request-otp', 'POST', '/auth/request-otp', json_body={'mobile_number': mobile_number})
+        tokens = call(t, 'POST /auth/verify-otp', 'POST', '/auth/verify-otp',
+                      json_body={'mobile_number': mobile_number, 'otp': '123456'}).json()
+        if tokens and 'refresh_token' in tokens:
+            call(t, 'POST /auth/refresh', 'POST', '/auth/refresh', token=tokens['refresh_token'])
+        call(t, 'GET /auth/me', 'GET', '/auth/me', token=token)
+        call(t, 'POST /auth/update-profile', 'POST', '/auth/update-profile', token=token,
+             json_body={'name': f'Student {mobile_number}', 'avatar': 'doc.jpg'})
+        call(t, 'POST /auth/complete-profile', 'POST', '/auth/complete-profile',
+             json_body={'mobile_number': mobile_number, 'name': f'Student {mobile_number}', 'avatar': 'doc.jpg'})
+
+    def admin_catalog_writes(self, t, rng):
+        call = self.recorder.call
+        token = self.admin_token
+        name = f'Bench {self.unique()}'
+        category = call(t, 'POST /api/exam-categories', 'POST', '/api/exam-categories', token=token,
+                        json_body={'name': name}).json()
+        call(t, 'PUT /api/exam-categories/<id>', 'PUT', f"/api/exam-categories/{category['id']}", token=token,
+             json_body={'description': 'updated'})
+        subject = call(t, 'POST /api/subjects', 'POST', '/api/subjects', token=token,
+                       json_body={'name': name, 'category_id': category['id']}).json()
+        call(t, 'PUT /api/subjects/<id>', 'PUT', f"/api/subjects/{subject['id']}", token=token,
+             json_body={'duration_minutes': 90})
+        call(t, 'DELETE /api/subjects/<id>', 'DELETE', f"/api/subjects/{subject['id']}", token=token)
+        call(t, 'DELETE /api/exam-categories/<id>', 'DELETE', f"/api/exam-categories/{category['id']}", token=token)
+
+    def admin_question_writes(self, t, rng):
+        call = self.recorder.call
+        token = self.admin_token
+        subject_id = rng.choice(self.subject_ids)
+        options = [{'text': 'A', 'is_correct': True}, {'text': 'B'}, {'text': 'C'}, {'text': 'D'}]
+        question = call(t, 'POST /api/questions', 'POST', '/api/questions', token=token,
+                        json_body={'text': 'Bench question', 'subject_id': subject_id, 'options': options}).json()
+        call(t, 'PUT /api/questions/<id>', 'PUT', f"/api/questions/{question['id']}", token=token,
+             json_body={'text': 'Bench question (edited)', 'options': options})
+        call(t, 'DELETE /api/questions/<id>', 'DELETE', f"/api/questions/{question['id']}", token=token)
+        lines = '\n'.join(
+            json.dumps({'text': f'Bulk question {i}', 'subject_id': subject_id, 'options': options})
+            for i in range(20)
+        ).encode('utf-8')
+        call(t, 'POST /api/questions/bulk', 'POST', '/api/questions/bulk', token=token,
+             data=lines, content_type='application/x-ndjson')
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(bench, transport_factory, concurrency, rounds, random_seed):
+    """Run every scenario `rounds` times on each of `concurrency` workers"""
+    scenarios = bench.scenarios()
+
+    def worker(worker_id):
+        rng = random.Random(random_seed + worker_id)
+        transport = transport_factory()
+        with bench.app.app_context():
+            for _ in range(rounds):
+                for scenario in rng.sample(scenarios, len(scenarios)):
+                    scenario(transport, rng)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    return time.perf_counter() - start
+
+def summarize(recorder, wall_seconds):
+    endpoints = {}
+    for name in sorted(recorder.samples):
+        samples = sorted(recorder.samples[name])
+        queries = recorder.queries.get(name)
+        endpoints[name] = {
+            'requests': len(samples),
+            'errors': recorder.errors.get(name, 0),
+            'p50_ms': round(percentile(samples, 50) * 1000, 3),
+            'p95_ms': round(percentile(samples, 95) * 1000, 3),
+            'p99_ms': round(percentile(samples, 99) * 1000, 3),
+            'mean_ms': round(sum(samples) / len(samples) * 1000, 3),
+            'throughput_rps': round(len(samples) / wall_seconds, 2),
+            'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+            'max_queries': max(queries) if queries else None
+        }
+    total = sum(len(samples) for samples in recorder.samples.values())
+    return endpoints, total
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every API and auth endpoint')
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL', 'sqlite:////tmp/jishu_bench.db'))
+    parser.add_argument('--base-url', help='Drive a running server instead of the in-process test client')
+    parser.add_argument('--seed', action='store_true', help='Drop and reseed the database first')
+    parser.add_argument('--yes', action='store_true', help='Allow reseeding a non-SQLite database')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--rounds', type=int, default=10, help='Scenario rounds per worker')
+    parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+    add_scale_arguments(parser)
+    args = parser.parse_args()
+
+    app = create_app(bench_config(args.database_url))
+    with app.app_context():
+        if args.seed:
+            if not args.database_url.startswith('sqlite') and not args.yes:
+                print("Refusing to drop and reseed a non-SQLite database without --yes", file=sys.stderr)
+                return 1
+            seed_database(**scale_from_args(args))
+        db.session.remove()
+
+    query_counter = None
+    if args.base_url:
+        transport_factory = lambda: HTTPTransport(args.base_url)
+    else:
+        query_counter = QueryCounter()
+        with app.app_context():
+            query_counter.install(db.engine)
+        transport_factory = lambda: TestClientTransport(app)
+
+    recorder = Recorder(query_counter)
+    bench = Bench(app, recorder)
+    # Views print debug output; keep stdout clean for the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        wall_seconds = run(bench, transport_factory, args.concurrency, args.rounds, args.random_seed)
+    endpoints, total = summarize(recorder, wall_seconds)
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'target': args.base_url or args.database_url,
+        'scale': scale_from_args(args),
+        'concurrency': args.concurrency,
+        'rounds': args.rounds,
+        'wall_seconds': round(wall_seconds, 3),
+        'total_requests': total,
+        'throughput_rps': round(total / wall_seconds, 2),
+        'endpoints': endpoints
+    }
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+Rate limiter benchmark.
+
+- store: cost of one consume() per backend, from one thread and from --threads threads
+  spread over --keys keys
+- endpoint: POST /auth/request-otp through the test client with the limiter off and on
+  (with limits high enough that nothing is rejected), to show the per-request overhead
+- flood: --threads threads hammer one mobile number; exactly the bucket capacity may
+  get through, on every backend
+
+Backends are memory:// and a temporary SQLite file, plus Redis with --redis-url.
+
+Usage:
+    python benchmarks/rate_limit.py --threads 8 --calls 20000
+    python benchmarks/rate_limit.py --redis-url redis://localhost:6379/15
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.utils.rate_limit import create_rate_limit_store
+from benchmarks.seed import bench_config
+
+def per_call_us(seconds, calls):
+    return round(seconds / calls * 1e6, 2)
+
+def bench_store(store, threads, calls, keys):
+    """Mean microseconds per consume() from one thread, and per call across threads"""
+    start = time.perf_counter()
+    for i in range(calls):
+        store.consume(f'bench:{i % keys}', 1000000, 1000000)
+    single = time.perf_counter() - start
+
+    per_thread = max(1, calls // threads)
+
+    def worker(worker_id):
+        for i in range(per_thread):
+            store.consume(f'bench:{(worker_id * per_thread + i) % keys}', 1000000, 1000000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(worker, range(threads)))
+    parallel = time.perf_counter() - start
+
+    return {
+        'single_thread_us_per_call': per_call_us(single, calls),
+        'threaded_us_per_call': per_call_us(parallel, per_thread * threads),
+        'threaded_calls_per_second': round(per_thread * threads / parallel)
+    }
+
+def flood(store, threads, attempts, capacity):
+    """Count how many of threads * attempts consumes on one key get through"""
+    key = f'flood:{time.time()}'
+    rate = capacity / 3600.0
+
+    def worker(_):
+        return sum(1 for _ in range(attempts) if store.consume(key, capacity, rate) == 0)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        allowed = sum(pool.map(worker, range(threads)))
+    return {'attempts': threads * attempts, 'capacity': capacity, 'allowed': allowed, 'exact': allowed == capacity}
+
+def bench_endpoint(store_url, enabled, requests):
+    """Mean and p50 microseconds of POST /auth/request-otp"""
+    class RateLimitBenchConfig(bench_config('sqlite://')):
+        RATE_LIMIT_ENABLED = enabled
+        RATE_LIMIT_STORE_URL = store_url
+        OTP_REQUEST_RATE_PER_MOBILE = '1000000/1'
+        OTP_REQUEST_RATE_PER_IP = '1000000/1'
+        SMS_GATEWAY_URL = 'stub://?latency_ms=0'
+        METRICS_ENABLED = False
+
+    client = create_app(RateLimitBenchConfig).test_client()
+    samples = []
+    # The first fifth warms up imports, connections and the SMS workers and is not counted
+    warmup = requests // 5
+    for i in range(warmup + requests):
+        start = time.perf_counter()
+        response = client.post('/auth/request-otp', json={'mobile_number': f'9{i % 1000:09d}'})
+        if i >= warmup:
+            samples.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise RuntimeError(f'request-otp returned {response.status_code}')
+    samples.sort()
+    return {'mean_us': per_call_us(sum(samples), len(samples)), 'p50_us': round(samples[len(samples) // 2] * 1e6, 2)}
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the cost and accuracy of the OTP rate limiter')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--calls', type=int, default=20000, help='consume() calls per store measurement')
+    parser.add_argument('--keys', type=int, default=1000, help='Distinct keys the calls are spread over')
+    parser.add_argument('--requests', type=int, default=2000, help='Endpoint requests per configuration')
+    parser.add_argument('--redis-url', help='Also measure a Redis store (uses keys under ratelimit:)')
+    parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store_urls = {'memory': 'memory://', 'sqlite': f'sqlite:///{os.path.join(tmp, "ratelimit.db")}'}
+        if args.redis_url:
+            store_urls['redis'] = args.redis_url
+
+        report = {'threads': args.threads, 'calls': args.calls, 'keys': args.keys, 'stores': {}, 'endpoint': {}}
+        for name, url in store_urls.items():
+            print(f"Measuring {name} store...", file=sys.stderr)
+            store = create_rate_limit_store(url)
+            report['stores'][name] = bench_store(store, args.threads, args.calls, args.keys)
+            report['stores'][name]['flood'] = flood(store, args.threads, 200, capacity=50)
+
+        # Views print debug output; keep stdout for the report
+        with contextlib.redirect_stdout(sys.stderr):
+            baseline = bench_endpoint('memory://', False, args.requests)
+            report['endpoint']['limiter_off'] = baseline
+            for name in ('memory', 'sqlite'):
+                result = bench_endpoint(store_urls[name], True, args.requests)
+                result['overhead_us'] = round(result['p50_us'] - baseline['p50_us'], 2)
+                report['endpoint'][f'limiter_{name}'] = result
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    return 0 if all(store['flood']['exact'] for store in report['stores'].values()) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""
+Synthetic data generator for benchmarks.
+
+Creates N categories, each with sectional subjects and a full mock, questions with
+options for every sectional subject, and users with purchase and attempt histories.
+Rows are written with chunked executemany inserts so large scales seed quickly.
+
+Usage: python benchmarks/seed.py --database-url sqlite:////tmp/bench.db --questions 500
+"""
+
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models import User, ExamCategory, Subject, Question, Option, UserExam, ExamAttempt
+from config import Config
+
+DIFFICULTIES = ['easy', 'medium', 'hard']
+INSERT_CHUNK = 5000
+
+def bench_config(database_url):
+    """Config class pointing the app at the benchmark database"""
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+        SQLALCHEMY_BINDS = {}
+        # Every benchmark client shares one address; OTP limits would reject most logins
+        RATE_LIMIT_ENABLED = False
+
+    return BenchConfig
+
+def add_scale_arguments(parser):
+    parser.add_argument('--categories', type=int, default=4, help='Exam categories')
+    parser.add_argument('--subjects', type=int, default=4, help='Sectional subjects per category (plus one full mock)')
+    parser.add_argument('--questions', type=int, default=200, help='Questions per sectional subject')
+    parser.add_argument('--options', type=int, default=4, help='Options per question')
+    parser.add_argument('--users', type=int, default=100, help='Student users')
+    parser.add_argument('--attempts', type=int, default=5, help='Completed attempts per student')
+    parser.add_argument('--random-seed', type=int, default=42)
+
+def scale_from_args(args):
+    return {
+        'categories': args.categories,
+        'subjects': args.subjects,
+        'questions': args.questions,
+        'options': args.options,
+        'users': args.users,
+        'attempts': args.attempts,
+        'random_seed': args.random_seed
+    }
+
+def insert_rows(table, rows):
+    for start in range(0, len(rows), INSERT_CHUNK):
+        db.session.execute(table.insert(), rows[start:start + INSERT_CHUNK])
+
+def seed_database(categories=4, subjects=4, questions=200, options=4, users=100, attempts=5, random_seed=42):
+    """Drop and recreate every table, then fill them at the requested scale"""
+    rng = random.Random(random_seed)
+    now = datetime.utcnow()
+
+    db.drop_all()
+    db.create_all()
+
+    insert_rows(User.__table__, [
+        {'id': 1, 'mobile_number': '9000000000', 'name': 'Bench Admin', 'role': 'admin',
+         'is_profile_complete': True, 'token_version': 1, 'created_at': now}
+    ] + [
+        {'id': i + 2, 'mobile_number': str(8000000000 + i), 'name': f'Student {i}', 'role': 'student',
+         'is_profile_complete': True, 'token_version': 1, 'created_at': now}
+        for i in range(users)
+    ])
+
+    insert_rows(ExamCategory.__table__, [
+        {'id': c + 1, 'name': f'Category {c}', 'description': f'Benchmark category {c}', 'icon': 'school', 'created_at': now}
+        for c in range(categories)
+    ])
+
+    subject_rows = []
+    sectional_ids = []
+    for c in range(categories):
+        for s in range(subjects + 1):
+            subject_id = len(subject_rows) + 1
+            is_full_mock = s == subjects
+            subject_rows.append({
+                'id': subject_id, 'name': 'Full Mock Exam' if is_full_mock else f'Subject {s}',
+                'description': '', 'icon': 'atom', 'is_full_mock': is_full_mock,
+                'duration_minutes': 180 if is_full_mock else 60, 'category_id': c + 1,
+                'content_version': 1, 'created_at': now
+            })
+            if not is_full_mock:
+                sectional_ids.append(subject_id)
+    insert_rows(Subject.__table__, subject_rows)
+
+    question_rows = []
+    option_rows = []
+    for subject_id in sectional_ids:
+        for q in range(questions):
+            question_id = len(question_rows) + 1
+            question_rows.append({
+                'id': question_id, 'text': f'Question {q} of subject {subject_id}: ' + 'lorem ipsum ' * 8,
+                'subject_id': subject_id, 'difficulty': rng.choice(DIFFICULTIES),
+                'marks': 4, 'negative_marks': 1, 'created_at': now
+            })
+            correct = rng.randrange(options)
+            for o in range(options):
+                option_rows.append({
+                    'text': f'Option {o} for question {question_id}', 'question_id': question_id,
+                    'is_correct': o == correct, 'created_at': now
+                })
+    insert_rows(Question.__table__, question_rows)
+    insert_rows(Option.__table__, option_rows)
+
+    user_exam_rows = []
+    attempt_rows = []
+    for i in range(users):
+        user_id = i + 2
+        for subject_id in rng.sample(sectional_ids, min(len(sectional_ids), 3)):
+            user_exam_id = len(user_exam_rows) + 1
+            purchased_at = now - timedelta(days=rng.randint(10, 60))
+            user_exam_rows.append({
+                'id': user_exam_id, 'user_id': user_id, 'subject_id': subject_id,
+                'purchased_at': purchased_at, 'last_purchased_at': purchased_at,
+                'purchase_count': 1 + attempts // 3, 'max_retakes': 3, 'retakes_used': attempts % 3,
+                'attempts_started': attempts
+            })
+            for a in range(attempts):
+                correct_answers = rng.randint(0, questions)
+                wrong_answers = rng.randint(0, questions - correct_answers)
+                started_at = purchased_at + timedelta(days=a, hours=rng.randint(0, 12))
+                attempt_rows.append({
+                    'user_id': user_id, 'user_exam_id': user_exam_id, 'attempt_number': a + 1,
+                    'score': correct_answers * 4 - wrong_answers, 'total_questions': questions,
+                    'correct_answers': correct_answers, 'wrong_answers': wrong_answers,
+                    'unattempted': questions - correct_answers - wrong_answers,
+                    'time_taken_seconds': rng.randint(600, 3600), 'started_at': started_at,
+                    'completed_at': started_at + timedelta(minutes=rng.randint(10, 60))
+                })
+    insert_rows(UserExam.__table__, user_exam_rows)
+    insert_rows(ExamAttempt.__table__, attempt_rows)
+
+    db.session.commit()
+
+    return {
+        'categories': categories,
+        'subjects': len(subject_rows),
+        'questions': len(question_rows),
+        'options': len(option_rows),
+        'users': users + 1,
+        'user_exams': len(user_exam_rows),
+        'attempts': len(attempt_rows)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed a benchmark database with synthetic data')
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL', 'sqlite:////tmp/jishu_bench.db'))
+    parser.add_argument('--yes', action='store_true', help='Allow dropping tables in a non-SQLite database')
+    add_scale_arguments(parser)
+    args = parser.parse_args()
+
+    if not args.database_url.startswith('sqlite') and not args.yes:
+        print("Refusing to drop and reseed a non-SQLite database without --yes")
+        return 1
+
+    app = create_app(bench_config(args.database_url))
+    with app.app_context():
+        counts = seed_database(**scale_from_args(args))
+
+    print(f"Seeded {args.database_url}: {counts}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Serialization microbenchmark on a large question list.
+
+Seeds (optionally) one subject with --questions questions, then times building and
+encoding the full list three ways:
+
+- orm: ORM objects with options loaded per chunk, to_dict() and the stdlib encoder
+  (the path list endpoints used before the serializer module)
+- schema: column-tuple queries through the schemas, stdlib encoder
+- schema-orjson: the same rows encoded by FastJSONEncoder with orjson
+
+Encoding goes through flask.json.dumps as jsonify does, with the app's JSON settings.
+Reports the best and median time of the fetch, serialize and encode steps.
+
+Usage:
+    python benchmarks/serialization.py --seed --questions 10000 --repeats 5
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import json as flask_json
+from flask.json import JSONEncoder
+from app import create_app, db
+from app.models import Question, Option
+from app.utils.serializers import FastJSONEncoder, orjson_module, question_query, serialize_questions
+from benchmarks.seed import bench_config, seed_database
+
+def orm_questions(subject_id, chunk_size=1000):
+    """Hydrate questions and options as ORM objects and serialize them with to_dict()"""
+    questions = Question.query.filter_by(subject_id=subject_id).order_by(Question.id).all()
+    options_by_question = defaultdict(list)
+    question_ids = [question.id for question in questions]
+    for start in range(0, len(question_ids), chunk_size):
+        chunk = question_ids[start:start + chunk_size]
+        for option in Option.query.filter(Option.question_id.in_(chunk)).order_by(Option.id):
+            options_by_question[option.question_id].append(option)
+    return [question.to_dict(options=options_by_question[question.id]) for question in questions]
+
+def schema_questions(subject_id):
+    rows = question_query().filter(Question.subject_id == subject_id).order_by(Question.id).all()
+    return serialize_questions(rows)
+
+def run_path(app, build, encoder, subject_id, repeats):
+    """Time build(subject_id) and its encoding; return (build samples, encode samples, bytes)"""
+    app.json_encoder = encoder
+    build_samples, encode_samples = [], []
+    for _ in range(repeats):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        data = build(subject_id)
+        built = time.perf_counter()
+        body = flask_json.dumps(data)
+        build_samples.append(built - start)
+        encode_samples.append(time.perf_counter() - built)
+    return build_samples, encode_samples, len(body.encode('utf-8')), data
+
+def summary(samples):
+    samples = sorted(samples)
+    return {'best_ms': round(samples[0] * 1000, 2), 'median_ms': round(samples[len(samples) // 2] * 1000, 2)}
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare to_dict + stdlib JSON with the serializer module')
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL', 'sqlite:////tmp/jishu_serialization.db'))
+    parser.add_argument('--seed', action='store_true', help='Drop and reseed the database first')
+    parser.add_argument('--yes', action='store_true', help='Allow reseeding a non-SQLite database')
+    parser.add_argument('--questions', type=int, default=10000, help='Questions in the measured subject')
+    parser.add_argument('--options', type=int, default=4, help='Options per question')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+    args = parser.parse_args()
+
+    app = create_app(bench_config(args.database_url))
+    paths = [('orm', orm_questions, JSONEncoder), ('schema', schema_questions, JSONEncoder)]
+    if orjson_module() is not None:
+        paths.append(('schema-orjson', schema_questions, FastJSONEncoder))
+    else:
+        print("orjson is not installed; skipping the schema-orjson path", file=sys.stderr)
+
+    report = {'target': args.database_url, 'repeats': args.repeats, 'paths': {}}
+    with app.app_context(), app.test_request_context():
+        if args.seed:
+            if not args.database_url.startswith('sqlite') and not args.yes:
+                print("Refusing to drop and reseed a non-SQLite database without --yes", file=sys.stderr)
+                return 1
+            with contextlib.redirect_stdout(sys.stderr):
+                seed_database(categories=1, subjects=1, questions=args.questions, options=args.options,
+                              users=1, attempts=0)
+        subject_id = db.session.query(Question.subject_id).group_by(Question.subject_id).order_by(
+            db.func.count().desc()).first().subject_id
+
+        reference = None
+        for name, build, encoder in paths:
+            build_samples, encode_samples, size, data = run_path(app, build, encoder, subject_id, args.repeats)
+            if reference is None:
+                reference = data
+            total = [b + e for b, e in zip(build_samples, encode_samples)]
+            report['paths'][name] = {
+                'questions': len(data),
+                'bytes': size,
+                'matches_orm': data == reference,
+                'fetch_and_serialize': summary(build_samples),
+                'encode': summary(encode_samples),
+                'total': summary(total)
+            }
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    return 0 if all(path['matches_orm'] for path in report['paths'].values()) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""
+OTP burst benchmark for the SMS dispatch queue.
+
+Simulates a login burst: --threads request threads each request --requests OTPs for
+distinct mobile numbers against a stub gateway that takes --latency-ms per call and
+fails --failure-rate of messages. Two modes are compared:
+
+- sync: the request thread stores the OTP and calls the gateway itself, one message
+  per call (how a gateway call inside send_otp would behave)
+- queued: send_otp() enqueues and returns; the SMS worker pool delivers in batches
+
+Reports request latency percentiles and throughput, plus for every mode the delivery
+latency from request to gateway acceptance, gateway calls and retries.
+
+Usage:
+    python benchmarks/sms_queue.py --threads 32 --requests 20 --latency-ms 200 --failure-rate 0.02
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.utils.otp import get_otp_store, send_otp
+from app.utils.sms import Message, StubGateway, sms_queue
+from benchmarks.seed import bench_config
+
+MODES = ['sync', 'queued']
+
+class TimedGateway(StubGateway):
+    """Stub gateway that records how long each delivered message waited since it was created"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+        self.delays = []
+        self._lock = threading.Lock()
+
+    def send_batch(self, messages):
+        failed = super().send_batch(messages)
+        now = time.monotonic()
+        failed_ids = {id(message) for message in failed}
+        with self._lock:
+            self.calls += 1
+            self.delays.extend(now - message.enqueued_at for message in messages if id(message) not in failed_ids)
+        return failed
+
+def sync_send(app, gateway, mobile_number, otp):
+    """Store the OTP and deliver it from the request thread, retrying inline"""
+    get_otp_store().set(mobile_number, otp, app.config['OTP_EXPIRY_MINUTES'] * 60)
+    message = Message(mobile_number, f'{otp} is your Jishu verification code.')
+    for attempt in range(app.config['SMS_MAX_ATTEMPTS']):
+        if not gateway.send_batch([message]):
+            return True
+        time.sleep(app.config['SMS_RETRY_BACKOFF_SECONDS'] * 2 ** attempt)
+    return False
+
+def percentiles(samples):
+    if not samples:
+        return None
+    samples = sorted(samples)
+    pick = lambda pct: round(samples[min(len(samples) - 1, int(len(samples) * pct / 100))] * 1000, 2)
+    return {'p50_ms': pick(50), 'p95_ms': pick(95), 'p99_ms': pick(99), 'max_ms': round(samples[-1] * 1000, 2)}
+
+def run_mode(app, mode, gateway, threads, requests):
+    def worker(worker_id):
+        samples = []
+        with app.app_context():
+            for i in range(requests):
+                mobile_number = f'7{worker_id:04d}{i:05d}'
+                start = time.perf_counter()
+                if mode == 'sync':
+                    sync_send(app, gateway, mobile_number, '123456')
+                else:
+                    send_otp(mobile_number, '123456')
+                samples.append(time.perf_counter() - start)
+        return samples
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        samples = [sample for result in pool.map(worker, range(threads)) for sample in result]
+    request_seconds = time.perf_counter() - start
+
+    drained = True
+    if mode == 'queued':
+        drained = sms_queue.drain(timeout=300)
+    total_seconds = time.perf_counter() - start
+
+    total = threads * requests
+    result = {
+        'requests': total,
+        'request_latency': percentiles(samples),
+        'requests_per_second': round(total / request_seconds, 2),
+        'seconds_until_all_delivered': round(total_seconds, 3),
+        'delivered': len(gateway.delays),
+        'delivery_latency': percentiles(gateway.delays),
+        'gateway_calls': gateway.calls,
+        'drained': drained
+    }
+    if mode == 'queued':
+        result['queue'] = sms_queue.stats()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare synchronous and queued OTP delivery under a burst')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--threads', type=int, default=32, help='Concurrent request threads')
+    parser.add_argument('--requests', type=int, default=20, help='OTP requests per thread')
+    parser.add_argument('--latency-ms', type=float, default=200, help='Stub gateway latency per call')
+    parser.add_argument('--failure-rate', type=float, default=0.02, help='Share of messages the stub fails')
+    parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+    args = parser.parse_args()
+
+    class SMSBenchConfig(bench_config('sqlite://')):
+        OTP_STORE_URL = 'memory://'
+        SMS_RETRY_BACKOFF_SECONDS = 0.1
+
+    app = create_app(SMSBenchConfig)
+    results = {}
+    for mode in args.modes:
+        print(f"Running {mode}...", file=sys.stderr)
+        gateway = TimedGateway(latency=args.latency_ms / 1000, failure_rate=args.failure_rate)
+        if mode == 'queued':
+            sms_queue.gateway = gateway
+        with contextlib.redirect_stdout(sys.stderr):
+            results[mode] = run_mode(app, mode, gateway, args.threads, args.requests)
+
+    report = {
+        'threads': args.threads,
+        'requests_per_thread': args.requests,
+        'gateway_latency_ms': args.latency_ms,
+        'failure_rate': args.failure_rate,
+        'sms_workers': sms_queue.workers,
+        'sms_batch_size': sms_queue.batch_size,
+        'modes': results
+    }
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    return 0 if all(result['drained'] for result in results.values()) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+Compare gunicorn worker classes on the exam endpoints.
+
+Seeds a database once, then for each worker class starts gunicorn with
+gunicorn.conf.py, drives the catalog, question, user progress and exam
+start/submit scenarios over HTTP, and reports throughput and latency per class.
+
+Usage:
+    python benchmarks/workers.py --worker-classes sync gthread gevent --concurrency 32 --rounds 10
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from benchmarks.endpoints import Bench, HTTPTransport, Recorder, run, summarize
+from benchmarks.seed import bench_config, add_scale_arguments, scale_from_args, seed_database
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def wait_until_healthy(base_url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('gunicorn exited during startup')
+        try:
+            with urllib.request.urlopen(base_url + '/health', timeout=1):
+                return
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.2)
+    raise RuntimeError('gunicorn did not become healthy in time')
+
+def benchmark_worker_class(app, args, worker_class, store_dir):
+    port = free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    env = dict(os.environ,
+               DATABASE_URL=args.database_url,
+               # gunicorn.conf.py refuses per-process stores with several workers
+               OTP_STORE_URL=f'sqlite:///{os.path.join(store_dir, "otp.db")}',
+               RATE_LIMIT_STORE_URL=f'sqlite:///{os.path.join(store_dir, "ratelimit.db")}',
+               ANSWER_BUFFER_URL=f'sqlite:///{os.path.join(store_dir, "answers.db")}',
+               GUNICORN_BIND=f'127.0.0.1:{port}',
+               GUNICORN_WORKER_CLASS=worker_class,
+               GUNICORN_ACCESS_LOG='/dev/null',
+               METRICS_SQL_SAMPLE_RATE='0')
+    if args.workers:
+        env['WEB_CONCURRENCY'] = str(args.workers)
+    if args.threads:
+        env['GUNICORN_THREADS'] = str(args.threads)
+
+    process = subprocess.Popen(['gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_healthy(base_url, process)
+        recorder = Recorder()
+        bench = Bench(app, recorder)
+        bench.scenarios = lambda: [bench.catalog, bench.questions, bench.user_reads, bench.exam_flow]
+        wall_seconds = run(bench, lambda: HTTPTransport(base_url), args.concurrency, args.rounds, args.random_seed)
+    finally:
+        # SIGTERM exercises the graceful shutdown path
+        process.terminate()
+        process.wait(timeout=60)
+
+    endpoints, total = summarize(recorder, wall_seconds)
+    latencies = sorted(sample for samples in recorder.samples.values() for sample in samples)
+    return {
+        'requests': total,
+        'errors': sum(recorder.errors.values()),
+        'wall_seconds': round(wall_seconds, 3),
+        'throughput_rps': round(total / wall_seconds, 2),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 3),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95)] * 1000, 3),
+        'endpoints': endpoints
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare gunicorn worker classes on the exam endpoints')
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL', 'sqlite:////tmp/jishu_bench.db'))
+    parser.add_argument('--seed', action='store_true', help='Drop and reseed the database first')
+    parser.add_argument('--yes', action='store_true', help='Allow reseeding a non-SQLite database')
+    parser.add_argument('--worker-classes', nargs='+', default=['sync', 'gthread', 'gevent'])
+    parser.add_argument('--workers', type=int, help='Worker processes (default from gunicorn.conf.py)')
+    parser.add_argument('--threads', type=int, help='Threads per gthread worker')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+    add_scale_arguments(parser)
+    args = parser.parse_args()
+
+    app = create_app(bench_config(args.database_url))
+    if args.seed:
+        if not args.database_url.startswith('sqlite') and not args.yes:
+            print("Refusing to drop and reseed a non-SQLite database without --yes", file=sys.stderr)
+            return 1
+        with app.app_context(), contextlib.redirect_stdout(sys.stderr):
+            seed_database(**scale_from_args(args))
+
+    results = {}
+    with tempfile.TemporaryDirectory() as store_dir:
+        for worker_class in args.worker_classes:
+            print(f"Benchmarking {worker_class} workers...", file=sys.stderr)
+            results[worker_class] = benchmark_worker_class(app, args, worker_class, store_dir)
+
+    report = {
+        'database': args.database_url,
+        'concurrency': args.concurrency,
+        'rounds': args.rounds,
+        'cpu_count': os.cpu_count(),
+        'worker_classes': results
+    }
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""
+Script to calibrate questions from the answers stored with submitted attempts.
+
+For every question with enough responses it computes the p-value (share of correct
+answers) and the point-biserial discrimination (correlation between answering it
+correctly and the rest of the attempt's score), and writes them to the questions table.
+Attempts are streamed in keyset chunks, so memory stays bounded on large tables.
+Requires numpy (pip install numpy).
+
+Usage: python calibrate_items.py [--chunk-size 2000] [--min-responses 30] [--relabel] [--dry-run]
+"""
+
+import argparse
+import os
+import sys
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from app import create_app
+from app.utils.item_calibration import calibrate
+
+def main():
+    parser = argparse.ArgumentParser(description='Calibrate question difficulty and discrimination from submitted answers')
+    parser.add_argument('--chunk-size', type=int, default=2000, help='Attempts read per query')
+    parser.add_argument('--min-responses', type=int, default=30, help='Skip questions with fewer responses')
+    parser.add_argument('--relabel', action='store_true', help='Reset question difficulty from the p-value')
+    parser.add_argument('--easy', type=float, default=0.7, help='p-value at or above which a question is easy')
+    parser.add_argument('--hard', type=float, default=0.4, help='p-value below which a question is hard')
+    parser.add_argument('--dry-run', action='store_true', help='Compute without writing anything')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        report = calibrate(chunk_size=max(args.chunk_size, 1), min_responses=args.min_responses,
+                           relabel=args.relabel, easy=args.easy, hard=args.hard, dry_run=args.dry_run)
+
+    action = 'Would calibrate' if args.dry_run else 'Calibrated'
+    print(f"{action} {report['calibrated']} questions from {report['responses']} responses")
+    if args.relabel:
+        print(f"{report['relabeled']} questions changed difficulty")
+
+if __name__ == "__main__":
+    main()
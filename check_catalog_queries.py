@@ -0,0 +1,87 @@
+"""
+Script to check that the catalog endpoints issue a constant number of SQL queries.
+Seeds an in-memory SQLite database with a growing number of categories and
+fails if the query count of any catalog endpoint grows with it.
+"""
+
+import os
+import sys
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sqlalchemy import event
+from app import create_app, db
+from app.models.exam import ExamCategory, Subject
+from config import Config
+
+CATEGORY_COUNTS = [1, 5, 25]
+SUBJECTS_PER_CATEGORY = 4
+
+ENDPOINTS = [
+    '/api/exam-categories',
+    '/api/exam-categories/1',
+    '/api/subjects',
+    '/api/subjects?category_id=1',
+    '/api/subjects/1',
+]
+
+class CheckConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    TESTING = True
+    # Read the catalog version on every request, so it counts the same in each round
+    CATALOG_VERSION_TTL_SECONDS = 0
+
+def seed(category_count):
+    """Recreate the catalog tables with the given number of categories"""
+    db.drop_all()
+    db.create_all()
+    for i in range(category_count):
+        category = ExamCategory(name=f'Category {i}', description='', icon='')
+        db.session.add(category)
+        db.session.flush()
+        for j in range(SUBJECTS_PER_CATEGORY):
+            db.session.add(Subject(name=f'Subject {j}', category_id=category.id))
+    db.session.commit()
+    db.session.remove()
+
+def count_queries(client, url):
+    """Return the number of SQL statements executed while serving url"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+    if response.status_code != 200:
+        raise RuntimeError(f'{url} returned {response.status_code}')
+    return len(statements)
+
+def check_catalog_queries():
+    """Check that catalog query counts do not depend on catalog size"""
+    app = create_app(CheckConfig)
+    client = app.test_client()
+    results = {url: [] for url in ENDPOINTS}
+
+    with app.app_context():
+        for category_count in CATEGORY_COUNTS:
+            seed(category_count)
+            for url in ENDPOINTS:
+                results[url].append(count_queries(client, url))
+
+    ok = True
+    print(f"Categories: {CATEGORY_COUNTS}")
+    for url, counts in results.items():
+        constant = len(set(counts)) == 1
+        ok = ok and constant
+        print(f"{'✓' if constant else '✗'} {url}: {counts}")
+
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if check_catalog_queries() else 1)
@@ -0,0 +1,182 @@
+"""
+Script to check the database schema and the query plan of every SQL statement the API issues.
+
+Compares the database with the models and the latest migration, then drives every
+/api and /auth endpoint through the Flask test client (the scenarios of
+benchmarks/endpoints.py), runs EXPLAIN on each distinct SELECT, UPDATE and DELETE it
+recorded and flags full table scans. Scans of the small catalog tables, which are
+listed in full by design, and unfiltered scans in index order that a LIMIT stops
+early are reported but not flagged.
+
+Endpoints write to the database, so point it at a scratch database and seed it:
+
+Usage: python check_query_plans.py --seed [--database-url sqlite:////tmp/jishu_explain.db] [--rounds 2]
+"""
+
+import argparse
+import contextlib
+import os
+import random
+import re
+import sys
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import event
+from app import create_app, db
+from benchmarks.endpoints import Bench, Recorder, TestClientTransport, run
+from benchmarks.seed import bench_config, add_scale_arguments, scale_from_args, seed_database
+
+# Read whole on purpose: catalog listings return every row
+ALLOWED_SCANS = {'exam_categories', 'subjects', 'content_versions'}
+
+AUDITED = ('SELECT', 'UPDATE', 'DELETE')
+
+class StatementLog:
+    """Records each distinct statement with the parameters it first ran with and the endpoints issuing it"""
+
+    def __init__(self):
+        self.endpoint = None
+        self.statements = {}
+
+    def install(self, engine):
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith(AUDITED):
+            return
+        entry = self.statements.setdefault(statement, {
+            'parameters': parameters[0] if executemany else parameters,
+            'endpoints': set()
+        })
+        entry['endpoints'].add(self.endpoint or '(outside a request)')
+
+class AuditRecorder(Recorder):
+    def __init__(self, statement_log):
+        super().__init__()
+        self.statement_log = statement_log
+
+    def call(self, transport, name, method, path, expect=(200, 201), **kwargs):
+        self.statement_log.endpoint = name
+        try:
+            return super().call(transport, name, method, path, expect=expect, **kwargs)
+        finally:
+            self.statement_log.endpoint = None
+
+def is_bounded(statement):
+    statement = ' '.join(statement.upper().split())
+    return ' LIMIT ' in statement and ' WHERE ' not in statement
+
+def explain(conn, statement, parameters):
+    """Return (plan lines, tables read by a full scan, whether a LIMIT stops the scan early) for a statement"""
+    tables = set(db.metadata.tables)
+    if conn.dialect.name == 'sqlite':
+        rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+        plan = [row[-1] for row in rows]
+        scans = set()
+        for detail in plan:
+            # "SCAN questions" reads the table; "SCAN questions USING INDEX ..." walks an index
+            match = re.match(r'SCAN (?:TABLE )?(\w+)(?: AS \w+)?$', detail)
+            if match and match.group(1) in tables:
+                scans.add(match.group(1))
+        # An unfiltered scan in the requested order (no temporary sort) stops once LIMIT rows are read
+        bounded = is_bounded(statement) and not any('TEMP B-TREE' in detail for detail in plan)
+        return plan, scans, bounded
+
+    rows = conn.exec_driver_sql('EXPLAIN ' + statement, parameters).mappings().all()
+    plan = [f"{row['table']}: type={row['type']} key={row['key']} rows={row['rows']} {row['Extra'] or ''}".strip()
+            for row in rows]
+    scans = {row['table'] for row in rows if row['type'] == 'ALL' and row['table'] in tables}
+    bounded = is_bounded(statement) and not any('filesort' in (row['Extra'] or '') for row in rows)
+    return plan, scans, bounded
+
+def check_schema(app):
+    """Compare the database with the models and the latest migration; return True if they match"""
+    script = ScriptDirectory.from_config(app.extensions['migrate'].migrate.get_config())
+    head = script.get_current_head()
+    with db.engine.connect() as conn:
+        context = MigrationContext.configure(conn)
+        current = context.get_current_revision()
+        differences = compare_metadata(context, db.metadata)
+
+    print("Checking schema...")
+    if current == head:
+        print(f"✓ Database is at the latest migration ({head})")
+    else:
+        print(f"- Database is at migration {current}, latest is {head} (run 'flask db upgrade' on managed databases)")
+    for difference in differences:
+        print(f"✗ {difference}")
+    if not differences:
+        print("✓ Tables, columns and indexes match the models")
+    return not differences
+
+def check_query_plans(app, rounds, random_seed):
+    """EXPLAIN every statement the endpoints issue; return True if none does an unexpected full scan"""
+    statement_log = StatementLog()
+    bench = Bench(app, AuditRecorder(statement_log))
+    with app.app_context():
+        statement_log.install(db.engine)
+
+    # Views print debug output; keep stdout for the report
+    with contextlib.redirect_stdout(sys.stderr):
+        run(bench, lambda: TestClientTransport(app), 1, rounds, random_seed)
+
+    ok = True
+    flagged = allowed = 0
+    with app.app_context(), db.engine.connect() as conn:
+        for statement, entry in statement_log.statements.items():
+            plan, scans, bounded = explain(conn, statement, entry['parameters'])
+            if not scans:
+                continue
+            unexpected = set() if bounded else scans - ALLOWED_SCANS
+            if unexpected:
+                ok = False
+                flagged += 1
+            else:
+                allowed += 1
+            print(f"\n{'✗' if unexpected else '-'} Full scan of {', '.join(sorted(scans))}"
+                  f"{' (stopped by LIMIT)' if bounded else ''} from {', '.join(sorted(entry['endpoints']))}")
+            print('  ' + ' '.join(statement.split()))
+            for line in plan:
+                print(f'    {line}')
+
+    print(f"\nExplained {len(statement_log.statements)} distinct statements: "
+          f"{flagged} with unexpected full scans, {allowed} expected (catalog tables or stopped by LIMIT)")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the schema and EXPLAIN every query the API issues')
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL', 'sqlite:////tmp/jishu_explain.db'))
+    parser.add_argument('--seed', action='store_true', help='Drop and reseed the database first')
+    parser.add_argument('--yes', action='store_true', help='Allow reseeding a non-SQLite database')
+    parser.add_argument('--rounds', type=int, default=2, help='Times every scenario is run')
+    add_scale_arguments(parser)
+    args = parser.parse_args()
+
+    class AuditConfig(bench_config(args.database_url)):
+        # Keep autosave flushes inside the submit request that triggers them
+        ANSWER_FLUSH_INTERVAL_SECONDS = 3600
+        # console:// prints OTPs from the queue's thread, outside the redirect, into the report
+        SMS_GATEWAY_URL = 'stub://?latency_ms=0'
+
+    app = create_app(AuditConfig)
+    with app.app_context():
+        if args.seed:
+            if not args.database_url.startswith('sqlite') and not args.yes:
+                print("Refusing to drop and reseed a non-SQLite database without --yes", file=sys.stderr)
+                return 1
+            with contextlib.redirect_stdout(sys.stderr):
+                seed_database(**scale_from_args(args))
+        schema_ok = check_schema(app)
+        db.session.remove()
+
+    random.seed(args.random_seed)
+    plans_ok = check_query_plans(app, max(args.rounds, 1), args.random_seed)
+    return 0 if schema_ok and plans_ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
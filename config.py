@@ -12,13 +12,31 @@ class Config:
     DB_PASSWORD = os.environ.get('DB_PASSWORD', 'password')
     DB_NAME = os.environ.get('DB_NAME', 'jishu_db')
 
-    SQLALCHEMY_DATABASE_URI = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Optional read replica used by read-only GET handlers
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+    SQLALCHEMY_BINDS = {'replica': DATABASE_REPLICA_URL} if DATABASE_REPLICA_URL else {}
+
+    # Connection pool configuration (pool sizing is ignored for SQLite)
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+    }
+    DB_CONNECT_TIMEOUT = int(os.environ.get('DB_CONNECT_TIMEOUT', 10))
+    DB_READ_TIMEOUT = int(os.environ.get('DB_READ_TIMEOUT', 30))
+    DB_WRITE_TIMEOUT = int(os.environ.get('DB_WRITE_TIMEOUT', 30))
+
     # JWT configuration
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'dev-secret-key-change-in-production')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+    # How long a verified token version is trusted before admin checks consult the database again
+    JWT_TOKEN_VERSION_TTL_SECONDS = int(os.environ.get('JWT_TOKEN_VERSION_TTL_SECONDS', 60))
 
     # Application configuration
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
@@ -29,3 +47,77 @@ class Config:
 
     # OTP configuration
     OTP_EXPIRY_MINUTES = 10
+    # memory:// (single process), redis://host:port/db or sqlite:///path/to/otp.db (shared by workers)
+    OTP_STORE_URL = os.environ.get('OTP_STORE_URL', 'memory://')
+    OTP_STORE_MAX_ENTRIES = int(os.environ.get('OTP_STORE_MAX_ENTRIES', 100000))
+
+    # OTP rate limits as 'requests/seconds' token buckets, checked before any DB or SMS work
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    # memory:// (single process), redis://host:port/db or sqlite:///path/to/ratelimit.db (shared by workers)
+    RATE_LIMIT_STORE_URL = os.environ.get('RATE_LIMIT_STORE_URL', 'memory://')
+    RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', 100000))
+    OTP_REQUEST_RATE_PER_MOBILE = os.environ.get('OTP_REQUEST_RATE_PER_MOBILE', '3/300')
+    OTP_REQUEST_RATE_PER_IP = os.environ.get('OTP_REQUEST_RATE_PER_IP', '60/60')
+    OTP_VERIFY_RATE_PER_MOBILE = os.environ.get('OTP_VERIFY_RATE_PER_MOBILE', '5/300')
+    OTP_VERIFY_RATE_PER_IP = os.environ.get('OTP_VERIFY_RATE_PER_IP', '120/60')
+    # Reverse proxies in front of the app whose X-Forwarded-For is trusted for the client IP
+    TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))
+
+    # JSON responses are UTF-8 rather than ASCII-escaped so the orjson encoder can produce them
+    JSON_AS_ASCII = False
+
+    # Outbound SMS: console:// (print), stub://?latency_ms=200&failure_rate=0.05 or package.module:GatewayClass
+    SMS_GATEWAY_URL = os.environ.get('SMS_GATEWAY_URL', 'console://')
+    SMS_WORKERS = int(os.environ.get('SMS_WORKERS', 4))
+    SMS_BATCH_SIZE = int(os.environ.get('SMS_BATCH_SIZE', 50))
+    SMS_BATCH_LINGER_MS = int(os.environ.get('SMS_BATCH_LINGER_MS', 20))
+    SMS_MAX_ATTEMPTS = int(os.environ.get('SMS_MAX_ATTEMPTS', 5))
+    SMS_RETRY_BACKOFF_SECONDS = float(os.environ.get('SMS_RETRY_BACKOFF_SECONDS', 1))
+    SMS_RETRY_BACKOFF_MAX_SECONDS = float(os.environ.get('SMS_RETRY_BACKOFF_MAX_SECONDS', 60))
+    SMS_QUEUE_MAX_SIZE = int(os.environ.get('SMS_QUEUE_MAX_SIZE', 100000))
+
+    # List endpoint pagination
+    PAGE_SIZE_DEFAULT = int(os.environ.get('PAGE_SIZE_DEFAULT', 50))
+    PAGE_SIZE_MAX = int(os.environ.get('PAGE_SIZE_MAX', 500))
+    STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', 500))
+
+    # Catalog ETags: how long a worker trusts its cached catalog version
+    CATALOG_VERSION_TTL_SECONDS = int(os.environ.get('CATALOG_VERSION_TTL_SECONDS', 5))
+
+    # Response compression (gzip, and brotli when the brotli package is installed)
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 5))
+    COMPRESS_MIMETYPES = ['application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript']
+
+    # Exam paper cache configuration
+    PAPER_CACHE_MAX_BYTES = int(os.environ.get('PAPER_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    # Cached papers are compressed once per content version; brotli 10-11 is far slower for a few percent
+    PAPER_CACHE_GZIP_LEVEL = int(os.environ.get('PAPER_CACHE_GZIP_LEVEL', 9))
+    PAPER_CACHE_BROTLI_QUALITY = int(os.environ.get('PAPER_CACHE_BROTLI_QUALITY', 9))
+
+    # Sampled papers: questions per attempt and the share of each Question.difficulty
+    PAPER_QUESTION_COUNT = int(os.environ.get('PAPER_QUESTION_COUNT', 50))
+    FULL_MOCK_QUESTION_COUNT = int(os.environ.get('FULL_MOCK_QUESTION_COUNT', 180))
+    PAPER_DIFFICULTY_MIX = os.environ.get('PAPER_DIFFICULTY_MIX', 'easy:0.3,medium:0.5,hard:0.2')
+
+    # How long a worker trusts its cached subject score distributions for percentiles and leaderboards
+    SCORE_DISTRIBUTION_TTL_SECONDS = int(os.environ.get('SCORE_DISTRIBUTION_TTL_SECONDS', 30))
+
+    # Incremental answer saves are written behind in batches every interval or once this many are pending
+    # memory:// (single process), redis://host:port/db or sqlite:///path/to/answers.db (shared by workers)
+    ANSWER_BUFFER_URL = os.environ.get('ANSWER_BUFFER_URL', 'memory://')
+    ANSWER_FLUSH_INTERVAL_SECONDS = float(os.environ.get('ANSWER_FLUSH_INTERVAL_SECONDS', 2))
+    ANSWER_FLUSH_MAX_ROWS = int(os.environ.get('ANSWER_FLUSH_MAX_ROWS', 1000))
+
+    # Request metrics served from /metrics; SQL statements are profiled for a sampled fraction of requests
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_SQL_SAMPLE_RATE = float(os.environ.get('METRICS_SQL_SAMPLE_RATE', 0.1))
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # Require "Authorization: Bearer <token>" when set
+    # Without a token /metrics is only served when explicitly made public, e.g. for local development
+    METRICS_PUBLIC = os.environ.get('METRICS_PUBLIC', 'false').lower() == 'true'
+    # Requests over these budgets are logged as warnings
+    REQUEST_TIME_BUDGET_MS = int(os.environ.get('REQUEST_TIME_BUDGET_MS', 500))
+    REQUEST_QUERY_BUDGET = int(os.environ.get('REQUEST_QUERY_BUDGET', 20))
+    REPEATED_STATEMENT_THRESHOLD = int(os.environ.get('REPEATED_STATEMENT_THRESHOLD', 5))
@@ -0,0 +1,82 @@
+"""
+Gunicorn settings for production.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Every setting can be overridden from the environment:
+    GUNICORN_WORKER_CLASS  gthread (default), sync or gevent
+    WEB_CONCURRENCY        worker processes, default 2 * CPUs + 1
+    GUNICORN_THREADS       threads per gthread worker, default 4
+    GUNICORN_WORKER_CONNECTIONS  concurrent greenlets per gevent worker, default 100
+    GUNICORN_TIMEOUT / GUNICORN_GRACEFUL_TIMEOUT  seconds
+"""
+
+import multiprocessing
+import os
+import sys
+
+cpu_count = multiprocessing.cpu_count()
+
+bind = os.environ.get('GUNICORN_BIND', f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', 5000)}")
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('WEB_CONCURRENCY', cpu_count * 2 + 1))
+# Threads (gthread) and greenlets (gevent) per worker should stay within the worker's
+# DB pool (DB_POOL_SIZE + DB_MAX_OVERFLOW), otherwise requests queue on pool_timeout
+threads = int(os.environ.get('GUNICORN_THREADS', 4 if worker_class == 'gthread' else 1))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 100))
+
+# Import the app once in the master so workers share its memory copy-on-write
+preload_app = True
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+# On SIGTERM workers stop accepting and get this long to finish in-flight requests
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+# Recycle workers periodically, staggered so they do not all restart at once
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 5000))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+# Stores that memory:// keeps inside each worker: with several workers an OTP issued by
+# one would not verify on another, every worker would enforce its own rate limits, and
+# a submit could not see answers saved through another worker
+SHARED_STORE_SETTINGS = ('OTP_STORE_URL', 'RATE_LIMIT_STORE_URL', 'ANSWER_BUFFER_URL')
+
+def _dispose(app):
+    from app.utils.db_routing import dispose_engines
+    with app.app_context():
+        dispose_engines(app)
+    for name in ('otp_store', 'rate_limit_store', 'answer_buffer'):
+        store = app.extensions.get(name)
+        if store is not None:
+            store.after_fork()
+
+def on_starting(server):
+    # Refuse to start several workers on per-process stores
+    config = server.app.wsgi().config
+    local = [name for name in SHARED_STORE_SETTINGS if config[name].startswith('memory://')]
+    if workers > 1 and local:
+        server.log.error('%s use memory://, which is not shared by the %d workers; point them at '
+                         'redis:// or sqlite:/// or set WEB_CONCURRENCY=1', ', '.join(local), workers)
+        sys.exit(1)
+
+def pre_fork(server, worker):
+    # Close anything the master opened while preloading so no socket is inherited by a worker
+    _dispose(server.app.wsgi())
+
+def post_fork(server, worker):
+    # Each worker starts with empty pools and opens its own connections
+    _dispose(server.app.wsgi())
+    server.log.info('Worker %s ready (%s, %s threads)', worker.pid, worker_class, threads)
+
+def worker_exit(server, worker):
+    # Write buffered answer saves and send queued SMS, then return connections to the database cleanly
+    from app.utils.answer_buffer import answer_buffer
+    from app.utils.sms import sms_queue
+    answer_buffer.flush()
+    sms_queue.drain()
+    _dispose(worker.wsgi)
@@ -0,0 +1,48 @@
+"""
+Script to bulk import questions from local JSONL or CSV files.
+
+JSONL lines use the same fields as POST /api/questions. CSV files need the columns
+text, subject_id, option_1..option_N and correct (e.g. "1" or "1,3"), and may add
+difficulty, marks and negative_marks.
+
+Usage: python import_questions.py questions.jsonl [more.csv ...] [--chunk-size 500]
+"""
+
+import argparse
+import os
+import sys
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from app import create_app
+from app.utils.question_import import import_questions, detect_format
+
+def main():
+    """Import every file given on the command line"""
+    parser = argparse.ArgumentParser(description='Bulk import questions from JSONL or CSV files')
+    parser.add_argument('files', nargs='+', help='JSONL or CSV files to import')
+    parser.add_argument('--format', choices=['jsonl', 'csv'], help='Override format detection')
+    parser.add_argument('--chunk-size', type=int, default=500, help='Questions inserted per transaction')
+    args = parser.parse_args()
+
+    app = create_app()
+    failed = False
+    with app.app_context():
+        for path in args.files:
+            fmt = detect_format(filename=path, fmt=args.format)
+            print(f"Importing {path} ({fmt})...")
+            with open(path, 'rb') as stream:
+                report = import_questions(stream, fmt, chunk_size=args.chunk_size)
+
+            print(f"Imported {report['imported']} questions, {report['failed']} rows failed")
+            for error in report['errors']:
+                print(f"  row {error['row']}: {error['error']}")
+            if report['errors_truncated']:
+                print("  (further errors omitted)")
+            failed = failed or report['failed'] > 0
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
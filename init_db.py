@@ -1,3 +1,4 @@
+from flask_migrate import upgrade
 from app import create_app, db
 from app.models import User, ExamCategory, Subject, Question, Option, UserExam, ExamAttempt
 from datetime import datetime, timedelta
@@ -6,8 +7,8 @@ def init_db():
     """Initialize the database with sample data"""
     app = create_app()
     with app.app_context():
-        # Create tables
-        db.create_all()
+        # Create tables, or bring an existing database up to the latest migration
+        upgrade()
 
         # Check if data already exists
         if User.query.count() > 0:
@@ -128,7 +129,8 @@ def init_db():
             purchased_at=now - timedelta(days=3),
             last_purchased_at=now - timedelta(days=3),
             max_retakes=3,
-            retakes_used=2  # Used 2 out of 3 retakes
+            retakes_used=2,  # Used 2 out of 3 retakes
+            attempts_started=2
         )
         db.session.add(user_exam)
         db.session.flush()
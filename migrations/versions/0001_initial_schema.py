@@ -0,0 +1,139 @@
+"""Initial schema
+
+Tables as created by init_db.py before migrations were introduced. Tables that
+already exist are left alone, so databases set up with init_db.py can simply be
+upgraded.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'users' not in tables:
+        op.create_table(
+            'users',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('mobile_number', sa.String(length=15), nullable=False),
+            sa.Column('name', sa.String(length=100), nullable=True),
+            sa.Column('avatar', sa.String(length=255), nullable=True),
+            sa.Column('role', sa.String(length=20), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('last_login', sa.DateTime(), nullable=True),
+            sa.Column('is_profile_complete', sa.Boolean(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_users_mobile_number', 'users', ['mobile_number'], unique=True)
+
+    if 'exam_categories' not in tables:
+        op.create_table(
+            'exam_categories',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=50), nullable=False),
+            sa.Column('description', sa.String(length=255), nullable=True),
+            sa.Column('icon', sa.String(length=50), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('name')
+        )
+
+    if 'subjects' not in tables:
+        op.create_table(
+            'subjects',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=50), nullable=False),
+            sa.Column('description', sa.String(length=255), nullable=True),
+            sa.Column('icon', sa.String(length=50), nullable=True),
+            sa.Column('is_full_mock', sa.Boolean(), nullable=True),
+            sa.Column('duration_minutes', sa.Integer(), nullable=True),
+            sa.Column('category_id', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['category_id'], ['exam_categories.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'questions' not in tables:
+        op.create_table(
+            'questions',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('text', sa.Text(), nullable=False),
+            sa.Column('subject_id', sa.Integer(), nullable=False),
+            sa.Column('difficulty', sa.String(length=20), nullable=True),
+            sa.Column('marks', sa.Integer(), nullable=True),
+            sa.Column('negative_marks', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['subject_id'], ['subjects.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'options' not in tables:
+        op.create_table(
+            'options',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('text', sa.Text(), nullable=False),
+            sa.Column('question_id', sa.Integer(), nullable=False),
+            sa.Column('is_correct', sa.Boolean(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['question_id'], ['questions.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'user_exams' not in tables:
+        op.create_table(
+            'user_exams',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('subject_id', sa.Integer(), nullable=False),
+            sa.Column('purchased_at', sa.DateTime(), nullable=True),
+            sa.Column('purchase_count', sa.Integer(), nullable=True),
+            sa.Column('last_purchased_at', sa.DateTime(), nullable=True),
+            sa.Column('max_retakes', sa.Integer(), nullable=True),
+            sa.Column('retakes_used', sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(['subject_id'], ['subjects.id']),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'exam_attempts' not in tables:
+        op.create_table(
+            'exam_attempts',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('user_exam_id', sa.Integer(), nullable=False),
+            sa.Column('attempt_number', sa.Integer(), nullable=True),
+            sa.Column('score', sa.Integer(), nullable=True),
+            sa.Column('total_questions', sa.Integer(), nullable=True),
+            sa.Column('correct_answers', sa.Integer(), nullable=True),
+            sa.Column('wrong_answers', sa.Integer(), nullable=True),
+            sa.Column('unattempted', sa.Integer(), nullable=True),
+            sa.Column('time_taken_seconds', sa.Integer(), nullable=True),
+            sa.Column('started_at', sa.DateTime(), nullable=True),
+            sa.Column('completed_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_exam_id'], ['user_exams.id']),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('exam_attempts')
+    op.drop_table('user_exams')
+    op.drop_table('options')
+    op.drop_table('questions')
+    op.drop_table('subjects')
+    op.drop_table('exam_categories')
+    op.drop_index('ix_users_mobile_number', table_name='users')
+    op.drop_table('users')
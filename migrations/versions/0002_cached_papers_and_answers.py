@@ -0,0 +1,119 @@
+"""Columns and tables for cached papers, token revocation, answers and statistics
+
+Replaces the scripts that used to live in migrations/ (add_subject_content_version,
+add_user_token_version, add_attempt_question_ids, add_attempt_answer_correct and
+add_question_calibration) and the tables init_db.py created for them. Anything a
+database already has from those scripts is skipped.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+NEW_COLUMNS = {
+    'users': [
+        sa.Column('token_version', sa.Integer(), nullable=False, server_default='1')
+    ],
+    'subjects': [
+        sa.Column('content_version', sa.Integer(), nullable=False, server_default='1')
+    ],
+    'questions': [
+        sa.Column('p_value', sa.Float(), nullable=True),
+        sa.Column('discrimination', sa.Float(), nullable=True),
+        sa.Column('response_count', sa.Integer(), nullable=True),
+        sa.Column('calibrated_at', sa.DateTime(), nullable=True)
+    ],
+    'exam_attempts': [
+        sa.Column('question_ids', sa.Text(), nullable=True)
+    ],
+}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    for table, columns in NEW_COLUMNS.items():
+        existing = {column['name'] for column in inspector.get_columns(table)}
+        for column in columns:
+            if column.name not in existing:
+                op.add_column(table, column)
+
+    if 'content_versions' not in tables:
+        op.create_table(
+            'content_versions',
+            sa.Column('name', sa.String(length=50), nullable=False),
+            sa.Column('version', sa.Integer(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('name')
+        )
+
+    if 'attempt_answers' not in tables:
+        op.create_table(
+            'attempt_answers',
+            sa.Column('attempt_id', sa.Integer(), nullable=False),
+            sa.Column('question_id', sa.Integer(), autoincrement=False, nullable=False),
+            sa.Column('option_id', sa.Integer(), nullable=True),
+            sa.Column('correct', sa.Boolean(), nullable=True),
+            sa.Column('time_spent', sa.SmallInteger(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['attempt_id'], ['exam_attempts.id']),
+            sa.PrimaryKeyConstraint('attempt_id', 'question_id')
+        )
+        op.create_index('ix_attempt_answers_question', 'attempt_answers', ['question_id', 'correct', 'option_id'])
+    else:
+        if 'correct' not in {column['name'] for column in inspector.get_columns('attempt_answers')}:
+            op.add_column('attempt_answers', sa.Column('correct', sa.Boolean(), nullable=True))
+        if 'ix_attempt_answers_question' not in {index['name'] for index in inspector.get_indexes('attempt_answers')}:
+            op.create_index('ix_attempt_answers_question', 'attempt_answers', ['question_id', 'correct', 'option_id'])
+
+    if 'score_histograms' not in tables:
+        op.create_table(
+            'score_histograms',
+            sa.Column('subject_id', sa.Integer(), nullable=False),
+            sa.Column('score', sa.Integer(), autoincrement=False, nullable=False),
+            sa.Column('count', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['subject_id'], ['subjects.id']),
+            sa.PrimaryKeyConstraint('subject_id', 'score')
+        )
+
+    if 'user_subject_stats' not in tables:
+        op.create_table(
+            'user_subject_stats',
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('subject_id', sa.Integer(), nullable=False),
+            sa.Column('attempts', sa.Integer(), nullable=False),
+            sa.Column('best_score', sa.Integer(), nullable=True),
+            sa.Column('total_score', sa.Integer(), nullable=False),
+            sa.Column('last_score', sa.Integer(), nullable=True),
+            sa.Column('correct_answers', sa.Integer(), nullable=False),
+            sa.Column('wrong_answers', sa.Integer(), nullable=False),
+            sa.Column('total_questions', sa.Integer(), nullable=False),
+            sa.Column('total_time_seconds', sa.Integer(), nullable=False),
+            sa.Column('last_attempt_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['subject_id'], ['subjects.id']),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('user_id', 'subject_id')
+        )
+
+
+def downgrade():
+    op.drop_table('user_subject_stats')
+    op.drop_table('score_histograms')
+    op.drop_index('ix_attempt_answers_question', table_name='attempt_answers')
+    op.drop_table('attempt_answers')
+    op.drop_table('content_versions')
+    for table, columns in NEW_COLUMNS.items():
+        with op.batch_alter_table(table) as batch_op:
+            for column in columns:
+                batch_op.drop_column(column.name)
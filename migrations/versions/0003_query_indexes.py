@@ -0,0 +1,52 @@
+"""Indexes for the API's query patterns
+
+Foreign keys had no deliberate indexes: MySQL only adds single-column ones, and
+SQLite none at all. Each index below serves a lookup the API makes on every
+request of an endpoint; check_query_plans.py verifies them with EXPLAIN.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    # Subject listings per category and the duplicate name check on create/update
+    ('ix_subjects_category_name', 'subjects', ['category_id', 'name']),
+    # Paper loading and question pages, both in id order within a subject
+    ('ix_questions_subject_id', 'questions', ['subject_id', 'id']),
+    # Options of a page of questions, and scoring's join on submitted option ids
+    ('ix_options_question_id', 'options', ['question_id', 'id']),
+    # Purchase lookup of a user's exam for a subject
+    ('ix_user_exams_user_subject', 'user_exams', ['user_id', 'subject_id']),
+    # Leaderboards join attempts to the purchases of one subject
+    ('ix_user_exams_subject', 'user_exams', ['subject_id']),
+    # Per-user attempt aggregates grouped by purchase
+    ('ix_exam_attempts_user_exam', 'exam_attempts', ['user_id', 'user_exam_id']),
+    # Attempts of a purchase: retake numbering, seen questions, attempts listed with exams
+    ('ix_exam_attempts_user_exam_id', 'exam_attempts', ['user_exam_id', 'id']),
+    # Leaderboard top N above the histogram's score cut-off
+    ('ix_exam_attempts_score', 'exam_attempts', ['score', 'completed_at']),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns in INDEXES:
+        # Databases built with db.create_all() from the current models already have them
+        if name not in {index['name'] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
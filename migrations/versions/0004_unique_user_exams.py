@@ -0,0 +1,72 @@
+"""One purchase row per user and subject, and a started-attempts counter
+
+Purchases become an upsert on a unique (user_id, subject_id) index and starts a
+conditional UPDATE that also numbers the attempt from user_exams.attempts_started.
+Duplicate purchase rows left by concurrent purchases are merged into the oldest
+one first, moving their attempts along.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def merge_duplicate_purchases(conn):
+    duplicates = conn.execute(sa.text(
+        'SELECT user_id, subject_id, MIN(id) AS keep_id, SUM(purchase_count) AS purchase_count, '
+        'MAX(last_purchased_at) AS last_purchased_at '
+        'FROM user_exams GROUP BY user_id, subject_id HAVING COUNT(*) > 1'
+    )).fetchall()
+
+    for row in duplicates:
+        params = {'user_id': row.user_id, 'subject_id': row.subject_id, 'keep_id': row.keep_id}
+        merged = [other_id for other_id, in conn.execute(sa.text(
+            'SELECT id FROM user_exams WHERE user_id = :user_id AND subject_id = :subject_id AND id <> :keep_id'
+        ), params)]
+        conn.execute(sa.text('UPDATE exam_attempts SET user_exam_id = :keep_id WHERE user_exam_id IN :merged')
+                     .bindparams(sa.bindparam('merged', expanding=True)), {**params, 'merged': merged})
+        conn.execute(sa.text('DELETE FROM user_exams WHERE id IN :merged')
+                     .bindparams(sa.bindparam('merged', expanding=True)), {'merged': merged})
+        conn.execute(sa.text(
+            'UPDATE user_exams SET purchase_count = :purchase_count, last_purchased_at = :last_purchased_at '
+            'WHERE id = :keep_id'
+        ), {'keep_id': row.keep_id, 'purchase_count': row.purchase_count,
+            'last_purchased_at': row.last_purchased_at})
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    if 'attempts_started' not in {column['name'] for column in inspector.get_columns('user_exams')}:
+        op.add_column('user_exams', sa.Column('attempts_started', sa.Integer(), nullable=False, server_default='0'))
+
+    indexes = {index['name'] for index in inspector.get_indexes('user_exams')}
+    if 'uq_user_exams_user_subject' not in indexes:
+        merge_duplicate_purchases(conn)
+        # Create the unique index before dropping the old one; MySQL needs an index for the user_id foreign key
+        op.create_index('uq_user_exams_user_subject', 'user_exams', ['user_id', 'subject_id'], unique=True)
+    if 'ix_user_exams_user_subject' in indexes:
+        op.drop_index('ix_user_exams_user_subject', table_name='user_exams')
+
+    conn.execute(sa.text(
+        'UPDATE user_exams SET attempts_started = '
+        '(SELECT COUNT(*) FROM exam_attempts WHERE exam_attempts.user_exam_id = user_exams.id)'
+    ))
+
+
+def downgrade():
+    op.create_index('ix_user_exams_user_subject', 'user_exams', ['user_id', 'subject_id'])
+    op.drop_index('uq_user_exams_user_subject', table_name='user_exams')
+    with op.batch_alter_table('user_exams') as batch_op:
+        batch_op.drop_column('attempts_started')
@@ -0,0 +1,35 @@
+"""Counter rows for ids handed out in blocks
+
+Bulk question imports reserve a block of question ids per chunk by bumping
+id_sequences.next_id, instead of reading MAX(id) with a locking read that SQLite
+ignores and MySQL does not hold against concurrent inserts. The counter row is
+created by the first reservation and starts above the table's largest id.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'id_sequences' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            'id_sequences',
+            sa.Column('name', sa.String(length=50), nullable=False),
+            sa.Column('next_id', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('name')
+        )
+
+
+def downgrade():
+    op.drop_table('id_sequences')
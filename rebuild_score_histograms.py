@@ -0,0 +1,44 @@
+"""
+Script to recompute the per-subject score histograms from exam_attempts.
+
+Attempts are read in keyset chunks, so it runs in constant memory on large tables.
+Submits that complete while it runs may be missed; run it at a quiet time.
+--check only compares each subject's histogram total with its completed attempts and
+exits 1 if any differ, e.g. after duplicate submits were counted twice.
+
+Usage: python rebuild_score_histograms.py [--subject-id 3 ...] [--chunk-size 5000] [--check]
+"""
+
+import argparse
+import os
+import sys
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from app import create_app
+from app.utils.score_distribution import histogram_drift, rebuild_histograms
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild subject score histograms from exam attempts')
+    parser.add_argument('--subject-id', type=int, action='append', help='Only rebuild these subjects')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='Attempts read per query')
+    parser.add_argument('--check', action='store_true', help='Only report subjects whose histogram is off')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if args.check:
+            drift = histogram_drift(args.subject_id)
+            for subject_id, (counted, completed) in sorted(drift.items()):
+                print(f"Subject {subject_id}: histogram counts {counted} attempts, {completed} are completed")
+            print(f"{len(drift)} subjects need a rebuild" if drift else "Histograms match the completed attempts")
+            return 1 if drift else 0
+        report = rebuild_histograms(args.subject_id, chunk_size=max(args.chunk_size, 1))
+
+    print(f"Rebuilt {report['rows']} histogram rows for {report['subjects']} subjects "
+          f"from {report['attempts']} attempts")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
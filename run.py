@@ -38,6 +38,7 @@ if __name__ == '__main__':
 
     print(f"\n* Running on http://{ip_address}:{port}/ (Press CTRL+C to quit)")
     print(f"* Use this IP address in your React Native app: {ip_address}")
-    print(f"* For Android emulator, use: 10.0.2.2:{port}\n")
+    print(f"* For Android emulator, use: 10.0.2.2:{port}")
+    print("* Development server only; deploy with: gunicorn -c gunicorn.conf.py wsgi:app\n")
 
     app.run(host=host, port=port, debug=True)
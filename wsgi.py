@@ -0,0 +1,10 @@
+"""
+Production WSGI entry point.
+
+Run with gunicorn using the tuned settings in gunicorn.conf.py:
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+from app import create_app
+
+app = create_app()